@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户分组阶段规模测试 - 验证 _group_missions_by_user 耗时随目标库规模线性增长
+
+每个目标平均关联固定数量的任务，用户数固定，因此每个用户的相关目标数随目标库规模增长。
+去重若退化为列表线性查找，耗时会随规模平方增长。
+"""
+
+import gc
+import math
+import random
+import sys
+import time
+
+from src.core.user_persona_algorithm import UserPersonaAlgorithm
+from src.models.mission import Mission
+from src.models.target_info import TargetInfo, Group
+
+CATALOG_SIZES = [1000, 10000, 100000]
+MISSIONS_PER_TARGET = 3
+NUM_USERS = 5
+# 耗时-规模双对数斜率上限：线性扩展为1（缓存效应会略高于1），平方扩展为2
+MAX_SCALING_EXPONENT = 1.5
+
+
+def build_dataset(num_targets: int, seed: int = 0):
+    """构造目标库与任务列表"""
+    rng = random.Random(seed)
+    targets = [
+        TargetInfo(f"TGT{i:06d}", f"目标{i}", "机场", "重要目标", 0.5, "沿海",
+                   [Group(f"技术组{i % 26}", "电子侦察", "活跃")], [])
+        for i in range(num_targets)
+    ]
+    missions = [
+        Mission(f"REQ{i:07d}", f"TP{i:07d}", f"部门{i % NUM_USERS}", "华北区组",
+                "2024-01-01 00:00:00", "2024-01-01 01:00:00", "1",
+                f"TGT{rng.randrange(num_targets):06d}", "目标国A", 0.5, "否", True,
+                "光学侦察", "陆地", 0.8, "单次", "0", 1, "自动筹划")
+        for i in range(num_targets * MISSIONS_PER_TARGET)
+    ]
+    return targets, missions
+
+
+def main():
+    algorithm = UserPersonaAlgorithm()
+    results = []
+    for num_targets in CATALOG_SIZES:
+        targets, missions = build_dataset(num_targets)
+        # 与 timeit 一致，计时期间关闭垃圾回收，取多次运行的最小值
+        gc.disable()
+        try:
+            elapsed = float('inf')
+            for _ in range(3):
+                start = time.perf_counter()
+                groups = algorithm._group_missions_by_user(missions, targets)
+                elapsed = min(elapsed, time.perf_counter() - start)
+        finally:
+            gc.enable()
+        related = sum(len(group[2]) for group in groups.values())
+        per_mission = elapsed / len(missions)
+        results.append((num_targets, len(missions), related, elapsed, per_mission))
+        print(f"目标 {num_targets:>7,} | 任务 {len(missions):>8,} | 用户相关目标 {related:>8,} | "
+              f"耗时 {elapsed:7.3f}s | 单任务 {per_mission * 1e6:6.2f}µs")
+
+    exponent = (math.log(results[-1][3] / results[0][3])
+                / math.log(results[-1][0] / results[0][0]))
+    print(f"\n耗时-规模扩展指数: {exponent:.2f}（上限 {MAX_SCALING_EXPONENT}）")
+    if exponent > MAX_SCALING_EXPONENT:
+        print("❌ 分组耗时不是线性增长")
+        return 1
+    print("✅ 分组耗时随目标库规模线性增长")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
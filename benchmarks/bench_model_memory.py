@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据模型内存基准 - 对比每条 Mission 占用的字节数
+
+- 旧版：每个实例带 __dict__ 的 Mission（与改造前的类定义一致）
+- 新版：使用 __slots__ 的 Mission
+- 参考：列式 MissionTable
+
+用法：python -m benchmarks.bench_model_memory [行数，默认1000000]
+（tracemalloc 会拖慢对象创建，100万行需要数分钟）
+"""
+
+import gc
+import sys
+import tracemalloc
+
+from src.models.mission import Mission
+from src.models.mission_table import MissionTable
+
+
+class DictMission:
+    """改造前的 Mission：字段存放在实例 __dict__ 中"""
+
+    def __init__(self, req_id, topic_id, req_unit, req_group, req_start_time, req_end_time,
+                 task_type, target_id, country_name, target_priority, is_emcon, is_precise,
+                 scout_type, task_scene, resolution, req_cycle, req_cycle_time, req_times,
+                 mission_play_type):
+        self.req_id = req_id
+        self.topic_id = topic_id
+        self.req_unit = req_unit
+        self.req_group = req_group
+        self.req_start_time = req_start_time
+        self.req_end_time = req_end_time
+        self.task_type = task_type
+        self.target_id = target_id
+        self.country_name = country_name
+        self.target_priority = target_priority
+        self.is_emcon = is_emcon
+        self.is_precise = is_precise
+        self.scout_type = scout_type
+        self.task_scene = task_scene
+        self.resolution = resolution
+        self.req_cycle = req_cycle
+        self.req_cycle_time = req_cycle_time
+        self.req_times = req_times
+        self.mission_play_type = mission_play_type
+
+
+UNITS = ["第一情报部", "第二技术部", "第三作战部", "第四指挥部", "第五后勤部"]
+GROUPS = ["华北区组", "华东区组", "华南区组", "华西区组", "东北区组", "西北区组"]
+SCOUT_TYPES = ["电子侦察", "光学侦察", "雷达侦察", "通信侦察"]
+TASK_SCENES = ["海上", "陆地", "空中", "太空", "网络"]
+
+
+def build_missions(mission_class, num_rows: int) -> list:
+    """按生成器的数据形态构造任务：ID与时间为每行独立字符串，分类字段复用同一字符串对象"""
+    missions = []
+    for i in range(num_rows):
+        day = i % 28 + 1
+        hour = i % 24
+        missions.append(mission_class(
+            f"REQ{i:07d}", f"TP{i:07d}", UNITS[i % 5], GROUPS[i % 6],
+            f"2024-03-{day:02d} {hour:02d}:{i % 60:02d}:00",
+            f"2024-03-{day:02d} {hour:02d}:{i % 60:02d}:30",
+            str(i % 5 + 1), f"TGT{i % 100:03d}", "目标国A", (i % 10 + 1) / 10,
+            "否", i % 2 == 0, SCOUT_TYPES[i % 4], TASK_SCENES[i % 5], 0.5 + (i % 50) / 100,
+            "单次", "0", 1, "自动筹划"
+        ))
+    return missions
+
+
+def measure(factory, num_rows: int):
+    """返回 (对象, 每行字节数)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = factory()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current / num_rows
+
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"=== Mission 内存基准 ({num_rows:,} 行) ===\n")
+
+    _, dict_bytes = measure(lambda: build_missions(DictMission, num_rows), num_rows)
+    print(f"改造前（__dict__）:  {dict_bytes:8.1f} 字节/条")
+
+    missions, slot_bytes = measure(lambda: build_missions(Mission, num_rows), num_rows)
+    print(f"改造后（__slots__）: {slot_bytes:8.1f} 字节/条  ({dict_bytes / slot_bytes:.2f}x)")
+
+    table, table_bytes = measure(lambda: MissionTable.from_missions(missions), num_rows)
+    print(f"列式 MissionTable:   {table_bytes:8.1f} 字节/条  ({dict_bytes / table_bytes:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
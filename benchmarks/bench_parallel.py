@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程画像生成加速比基准
+
+用法：python -m benchmarks.bench_parallel [任务数，默认2000000] [最大进程数，默认CPU核数]
+"""
+
+import logging
+import os
+import sys
+import time
+
+from benchmarks.common import dataset
+from src.core.user_persona_algorithm import UserPersonaAlgorithm
+
+
+def main():
+    num_missions = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    # 逐用户日志会干扰计时
+    logging.getLogger('UserPersonaAlgorithm').disabled = True
+
+    targets, table = dataset(num_missions, num_targets=1000, num_users=2000)
+    print(f"=== 并行画像生成加速比 ({num_missions:,} 条任务, {len(targets):,} 个目标) ===\n")
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != max_workers:
+        worker_counts.append(max_workers)
+
+    baseline_time = None
+    baseline_tags = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        personas = UserPersonaAlgorithm().generate_user_persona(
+            targets, table, algorithm={'preference_algorithm': 'auto'}, params={'workers': workers}
+        )
+        elapsed = time.perf_counter() - start
+        tags = [(persona.user_id, persona.persona_tags) for persona in personas]
+        if baseline_time is None:
+            baseline_time, baseline_tags = elapsed, tags
+        identical = "一致" if tags == baseline_tags else "不一致"
+        print(f"进程数 {workers:>3} | 用时 {elapsed:7.3f}s | 加速比 {baseline_time / elapsed:5.2f}x | "
+              f"与串行结果{identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+画像流水线规模基准
+
+按任务数、目标数、用户数三个方向扫描，每个规模点覆盖全部偏好算法，记录：
+- 各阶段用时（时间过滤、全局统计、标签计算、画像封装）与总用时
+- 峰值常驻内存（每个规模点在独立子进程中运行）
+- 每秒处理任务数
+
+结果写入 JSON 基线；指定 --baseline 时与基线比较，超出容差即以非零状态退出。
+
+用法：
+    python -m benchmarks.bench_pipeline --profile quick --save benchmarks/baseline_quick.json
+    python -m benchmarks.bench_pipeline --profile quick --baseline benchmarks/baseline_quick.json
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+PREFERENCE_ALGORITHMS = ['percentage', 'tfidf', 'bm25', 'zscore', 'auto']
+
+# 扫描方案：三个方向的取值、其余两个方向固定时的取值 (任务数, 目标数, 用户数) 与重复次数
+PROFILES = {
+    'quick': {
+        'missions': [1_000, 10_000, 100_000],
+        'targets': [10, 1_000],
+        'users': [10, 200],
+        'base': (100_000, 100, 100),
+        'repeat': 5
+    },
+    'full': {
+        'missions': [1_000, 10_000, 100_000, 1_000_000, 5_000_000],
+        'targets': [10, 100, 1_000, 10_000, 100_000],
+        'users': [10, 100, 1_000, 10_000],
+        'base': (1_000_000, 1_000, 1_000),
+        'repeat': 1
+    }
+}
+
+# 用时低于该值（秒）的差异视为噪声，不判定为退化
+MIN_SECONDS_DELTA = 0.05
+
+
+def plan_cases(profile: Dict[str, Any]) -> List[Dict[str, int]]:
+    """按三个方向展开规模点（去重）"""
+    base_missions, base_targets, base_users = profile['base']
+    points = [(missions, base_targets, base_users) for missions in profile['missions']]
+    points += [(base_missions, targets, base_users) for targets in profile['targets']]
+    points += [(base_missions, base_targets, users) for users in profile['users']]
+    points = list(dict.fromkeys(points))
+    return [{'missions': missions, 'targets': targets, 'users': users} for missions, targets, users in points]
+
+
+def case_key(case: Dict[str, Any]) -> str:
+    return f"m{case['missions']}-t{case['targets']}-u{case['users']}-{case['algorithm']}"
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以KB为单位
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_point(point: Dict[str, int], repeat: int) -> List[Dict[str, Any]]:
+    """在子进程中运行一个规模点的全部算法"""
+    from benchmarks.common import dataset
+    from src.core.persona_tag_calculator import PersonaTagCalculator
+    from src.core.user_persona_algorithm import UserPersonaAlgorithm
+    from src.core.global_stats_cache import GlobalStatsCache
+    from src.core.vectorized_tag_engine import VectorizedTagEngine
+    from src.core.windowed_persona import personas_from_tags
+
+    logging.getLogger('UserPersonaAlgorithm').disabled = True
+    targets, table = dataset(point['missions'], point['targets'], point['users'])
+    dataset_rss = peak_rss_mb()
+    # 不使用全局统计缓存，每次都测量完整计算
+    algorithm = UserPersonaAlgorithm(stats_cache=GlobalStatsCache())
+
+    results = []
+    for preference_algorithm in PREFERENCE_ALGORITHMS:
+        best = None
+        for _ in range(repeat):
+            stages = {}
+            start = time.perf_counter()
+            filtered = algorithm._filter_missions_by_time(table, '2024-01-01', '2024-12-31')
+            stages['filter'] = time.perf_counter() - start
+
+            config = {'preference_algorithm': preference_algorithm}
+            start = time.perf_counter()
+            if preference_algorithm in ['auto', 'tfidf', 'bm25']:
+                config['global_stats'] = algorithm._calculate_global_stats(filtered)
+            stages['global_stats'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            engine = VectorizedTagEngine(PersonaTagCalculator(algorithm_config=config))
+            all_persona_tags = engine.generate_all_persona_tags(filtered, targets)
+            stages['tags'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            personas = personas_from_tags(all_persona_tags)
+            stages['personas'] = time.perf_counter() - start
+
+            total = sum(stages.values())
+            if best is None or total < best['total_seconds']:
+                best = {'stages': stages, 'total_seconds': total, 'num_personas': len(personas)}
+
+        results.append({
+            **point,
+            'algorithm': preference_algorithm,
+            **best,
+            'missions_per_second': point['missions'] / best['total_seconds'] if best['total_seconds'] else 0.0,
+            'dataset_rss_mb': dataset_rss,
+            'peak_rss_mb': peak_rss_mb()
+        })
+    return results
+
+
+def run_suite(profile_name: str) -> Dict[str, Any]:
+    """运行整个扫描方案"""
+    profile = PROFILES[profile_name]
+    cases = []
+    # 每个规模点使用新的子进程，峰值内存互不影响
+    context = multiprocessing.get_context('spawn')
+    for point in plan_cases(profile):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            point_results = executor.submit(run_point, point, profile['repeat']).result()
+        for result in point_results:
+            print(f"任务 {result['missions']:>9,} | 目标 {result['targets']:>7,} | 用户 {result['users']:>6,} | "
+                  f"{result['algorithm']:<10} | 总用时 {result['total_seconds']:8.3f}s | "
+                  f"{result['missions_per_second']:>12,.0f} 条/秒 | 峰值内存 {result['peak_rss_mb']:8.1f} MB")
+        cases.extend(point_results)
+
+    return {
+        'profile': profile_name,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'cases': {case_key(case): case for case in cases}
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any],
+            time_tolerance: float, memory_tolerance: float) -> List[str]:
+    """
+    与基线比较
+    :return: 退化描述列表（为空表示通过）
+    """
+    regressions = []
+    for key, case in report['cases'].items():
+        reference = baseline['cases'].get(key)
+        if reference is None:
+            continue
+        seconds, reference_seconds = case['total_seconds'], reference['total_seconds']
+        if (seconds > reference_seconds * (1 + time_tolerance)
+                and seconds - reference_seconds > MIN_SECONDS_DELTA):
+            regressions.append(f"{key}: 用时 {reference_seconds:.3f}s -> {seconds:.3f}s")
+        if case['peak_rss_mb'] > reference['peak_rss_mb'] * (1 + memory_tolerance):
+            regressions.append(f"{key}: 峰值内存 {reference['peak_rss_mb']:.1f}MB -> {case['peak_rss_mb']:.1f}MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="画像流水线规模基准")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='quick', help="扫描方案")
+    parser.add_argument('--save', help="结果JSON输出路径")
+    parser.add_argument('--baseline', help="用于比较的基线JSON")
+    parser.add_argument('--time-tolerance', type=float, default=0.30, help="允许的用时增幅（比例）")
+    parser.add_argument('--memory-tolerance', type=float, default=0.20, help="允许的峰值内存增幅（比例）")
+    args = parser.parse_args()
+
+    print(f"=== 画像流水线规模基准 ({args.profile}) ===\n")
+    report = run_suite(args.profile)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存: {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.time_tolerance, args.memory_tolerance)
+        if regressions:
+            print(f"\n性能退化 ({len(regressions)} 项):")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print("\n与基线相比无性能退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+基准脚本公用的数据构造函数
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from src.models.mission_table import MissionTable, CATEGORICAL_FIELDS, encode_categorical
+from src.models.target_info import TargetInfo, Group
+
+BASE_EPOCH = int(np.datetime64('2024-01-01T00:00:00', 's').astype(np.int64))
+
+SCOUT_TYPES = ["电子侦察", "光学侦察", "雷达侦察", "通信侦察", "红外侦察", "多光谱侦察", "合成孔径雷达", "信号情报"]
+TASK_SCENES = ["海上", "陆地", "空中", "太空", "网络", "联合", "多域"]
+AREA_TYPES = ["城区", "郊区", "山区", "沿海", "内陆", "边境", "岛屿", "沙漠", "高原"]
+TARGET_TYPES = ["军事基地", "港口", "机场", "通信设施", "工业设施", "雷达站", "指挥中心", "导弹基地", "核设施"]
+TARGET_CATEGORIES = ["重要目标", "次要目标", "一般目标", "关键目标", "战略目标"]
+
+
+def synthetic_targets(num_targets: int, seed: int = 0) -> List[TargetInfo]:
+    """构造目标库"""
+    rng = np.random.default_rng(seed)
+    types = rng.integers(len(TARGET_TYPES), size=num_targets)
+    categories = rng.integers(len(TARGET_CATEGORIES), size=num_targets)
+    areas = rng.integers(len(AREA_TYPES), size=num_targets)
+    return [
+        TargetInfo(f"TGT{i + 1:03d}", f"目标{i + 1}", TARGET_TYPES[types[i]], TARGET_CATEGORIES[categories[i]],
+                   0.5, AREA_TYPES[areas[i]], [Group(f"技术组{chr(65 + i % 26)}", "电子侦察", "活跃")], [])
+        for i in range(num_targets)
+    ]
+
+
+def synthetic_table(num_missions: int, num_targets: int, num_users: int, seed: int = 0) -> MissionTable:
+    """
+    直接以列的形式构造任务表（不经过 Mission 对象，用于大规模基准）
+    :param num_missions: 任务数
+    :param num_targets: 目标数
+    :param num_users: 用户数（部门×区组组合数）
+    :param seed: 随机种子
+    :return: 列式任务表
+    """
+    rng = np.random.default_rng(seed)
+    num_groups = min(num_users, 8)
+    num_units = -(-num_users // num_groups)
+    user = rng.integers(num_users, size=num_missions)
+    # 用户间任务量不均衡，便于观察分片负载
+    user = np.minimum(user, rng.integers(num_users, size=num_missions))
+
+    values = {
+        'req_unit': np.array([f"部门{u:04d}" for u in range(num_units)])[user // num_groups],
+        'req_group': np.array([f"区组{g}" for g in range(num_groups)])[user % num_groups],
+        'target_id': np.char.add('TGT', np.char.zfill((rng.integers(num_targets, size=num_missions) + 1).astype(str), 3)),
+        'task_type': (rng.integers(5, size=num_missions) + 1).astype(str),
+        'scout_type': np.array(SCOUT_TYPES)[rng.integers(len(SCOUT_TYPES), size=num_missions)],
+        'task_scene': np.array(TASK_SCENES)[rng.integers(len(TASK_SCENES), size=num_missions)],
+    }
+    values['req_id'] = np.char.add('REQ', np.arange(1, num_missions + 1).astype(str))
+    values['topic_id'] = np.char.add('TP', np.arange(1, num_missions + 1).astype(str))
+
+    columns, categories = {}, {}
+    for field in CATEGORICAL_FIELDS:
+        if field in values:
+            columns[field], categories[field] = encode_categorical(values[field].tolist())
+    start = BASE_EPOCH + rng.integers(366 * 86400, size=num_missions)
+    columns['req_start_time'] = start
+    columns['req_end_time'] = start + rng.integers(1, 25, size=num_missions) * 3600
+    columns['is_precise'] = rng.integers(2, size=num_missions).astype(bool)
+    return MissionTable(columns, categories)
+
+
+def dataset(num_missions: int, num_targets: int, num_users: int, seed: int = 0) -> Tuple[List[TargetInfo], MissionTable]:
+    """构造 (目标库, 任务表)"""
+    return synthetic_targets(num_targets, seed), synthetic_table(num_missions, num_targets, num_users, seed)
@@ -116,6 +116,7 @@ OUTPUT_CONFIG = {
 PERFORMANCE_CONFIG = {
     "enable_caching": True,  # 是否启用全局统计缓存
     "cache_ttl": 3600,  # 缓存生存时间（秒）
+    "cache_max_entries": 32,  # 缓存最多保留的条目数（LRU淘汰）
     "max_users_for_tfidf": 10000,  # TF-IDF最大用户数限制
     "max_targets_for_calculation": 1000  # 单次计算最大目标数
 }
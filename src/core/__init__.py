@@ -4,8 +4,31 @@
 
 from .user_persona_algorithm import UserPersonaAlgorithm
 from .persona_tag_calculator import PersonaTagCalculator
+from .vectorized_tag_engine import VectorizedTagEngine
+from .incremental_persona_store import IncrementalPersonaStore
+from .global_stats_cache import GlobalStatsCache
+from .windowed_persona import WindowedPersonaIndex
+from .instrumentation import Instrumentation, PersonaResult
+from .persona_similarity import PersonaSimilarityIndex
+from .async_persona import AsyncPersonaService, user_persona_algorithm_api_async
+from .persona_server import PersonaQueryEngine, make_server
+from .out_of_core_persona import OutOfCorePersonaGenerator
+from .space_saving import SpaceSavingSketch
 
 __all__ = [
     'UserPersonaAlgorithm',
-    'PersonaTagCalculator'
+    'PersonaTagCalculator',
+    'VectorizedTagEngine',
+    'IncrementalPersonaStore',
+    'GlobalStatsCache',
+    'WindowedPersonaIndex',
+    'Instrumentation',
+    'PersonaResult',
+    'PersonaSimilarityIndex',
+    'AsyncPersonaService',
+    'user_persona_algorithm_api_async',
+    'PersonaQueryEngine',
+    'make_server',
+    'OutOfCorePersonaGenerator',
+    'SpaceSavingSketch'
 ]
@@ -0,0 +1,213 @@
+"""
+异步画像接口
+
+供 asyncio 服务调用，画像计算放到执行器中进行，不阻塞事件循环：
+- 执行器可配置：默认为单线程池，也可传入任意 concurrent.futures 执行器（进程池时在子进程中计算）
+- 支持超时（timeout 秒）与取消；调用方放弃等待后，若已没有其他调用方在等待同一计算，
+  线程池中的计算会在下一个画像生成前停止，尚未开始的计算直接取消
+- 数据集、目标、时间范围、算法配置与扩充参数都相同的并发请求合并为一次计算，
+  所有调用方得到相同的结果（各自持有独立的列表）
+"""
+
+import asyncio
+from concurrent.futures import CancelledError, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import hashlib
+import json
+import threading
+import weakref
+from typing import Any, Dict, List, Optional, Union
+
+from src.models.mission import Mission
+from src.models.mission_table import MissionTable
+from src.models.target_info import TargetInfo
+from src.models.user_persona import UserPersona
+from src.core.global_stats_cache import dataset_fingerprint
+from src.core.user_persona_algorithm import UserPersonaAlgorithm
+from src.core.vectorized_tag_engine import TAG_FIELDS
+
+
+def request_key(target_info: List[TargetInfo],
+                mission: Union[List[Mission], MissionTable],
+                start_time: str = None,
+                end_time: str = None,
+                algorithm: Dict[str, Any] = None,
+                params: Dict[str, Any] = None) -> Optional[str]:
+    """
+    计算用于合并并发请求的键
+    :return: 十六进制键；开启埋点的请求各自需要独立报告，返回None表示不合并
+    """
+    params = params or {}
+    if params.get('instrumentation'):
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(dataset_fingerprint(mission, TAG_FIELDS).encode())
+    for target in target_info:
+        groups = [getattr(group, 'group_name', group) for group in target.group_list or []]
+        digest.update(repr((target.target_id, target.target_type, target.target_category,
+                            target.target_area_type, groups)).encode())
+    digest.update(json.dumps([start_time, end_time, algorithm or {}, params],
+                             sort_keys=True, default=str, ensure_ascii=False).encode())
+    return digest.hexdigest()
+
+
+def _generate(persona_algorithm: UserPersonaAlgorithm,
+              target_info: List[TargetInfo],
+              mission: Union[List[Mission], MissionTable],
+              start_time: str,
+              end_time: str,
+              algorithm: Dict[str, Any],
+              params: Dict[str, Any],
+              cancel_event: threading.Event) -> List[UserPersona]:
+    """在执行器线程中逐个生成画像，每个画像生成前检查取消标志"""
+    user_personas = []
+    for user_persona in persona_algorithm.iter_user_persona(target_info, mission, start_time, end_time,
+                                                            algorithm, params):
+        if cancel_event.is_set():
+            raise CancelledError()
+        user_personas.append(user_persona)
+    return user_personas
+
+
+def _generate_in_process(target_info: List[TargetInfo],
+                         mission: Union[List[Mission], MissionTable],
+                         start_time: str,
+                         end_time: str,
+                         algorithm: Dict[str, Any],
+                         params: Dict[str, Any]) -> List[UserPersona]:
+    """在子进程中生成画像（进程池执行器）"""
+    return UserPersonaAlgorithm().generate_user_persona(target_info, mission, start_time, end_time,
+                                                        algorithm, params)
+
+
+class _Flight:
+    """一次进行中的计算及其等待者"""
+
+    def __init__(self, future: asyncio.Future, cancel_event: threading.Event):
+        self.future = future
+        self.cancel_event = cancel_event
+        self.waiters = 0
+
+
+class AsyncPersonaService:
+    """异步画像服务"""
+
+    def __init__(self,
+                 executor: Executor = None,
+                 persona_algorithm: UserPersonaAlgorithm = None,
+                 timeout: float = None):
+        """
+        :param executor: 执行器（默认为单线程池）；进程池执行器时每次计算在子进程中新建算法实例
+        :param persona_algorithm: 线程池中使用的算法实例（默认新建）
+        :param timeout: 默认超时秒数，None 表示不限制
+        """
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='persona')
+        self.persona_algorithm = persona_algorithm or UserPersonaAlgorithm()
+        self.timeout = timeout
+        self.coalesced = 0
+        self._flights: Dict[str, _Flight] = {}
+
+    async def generate_user_persona(self,
+                                    target_info: List[TargetInfo],
+                                    mission: Union[List[Mission], MissionTable],
+                                    start_time: str = None,
+                                    end_time: str = None,
+                                    algorithm: Dict[str, Any] = None,
+                                    params: Dict[str, Any] = None,
+                                    timeout: float = None) -> List[UserPersona]:
+        """
+        异步生成用户画像（参数与 UserPersonaAlgorithm.generate_user_persona 相同）
+        :param timeout: 超时秒数（默认使用服务的 timeout），超时抛出 asyncio.TimeoutError
+        :return: 用户画像结果列表
+        """
+        if timeout is None:
+            timeout = self.timeout
+        key = request_key(target_info, mission, start_time, end_time, algorithm, params)
+        flight = self._flights.get(key) if key is not None else None
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            flight = self._start(target_info, mission, start_time, end_time, algorithm, params)
+            if key is not None:
+                self._flights[key] = flight
+                flight.future.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        try:
+            # shield：单个调用方超时或被取消不影响其他等待同一计算的调用方
+            user_personas = await asyncio.wait_for(asyncio.shield(flight.future), timeout)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.future.done():
+                self._abandon(key, flight)
+        return list(user_personas)
+
+    def _start(self, target_info, mission, start_time, end_time, algorithm, params) -> _Flight:
+        """在执行器中开始一次计算"""
+        loop = asyncio.get_running_loop()
+        # 算法配置会被写入全局统计，每次计算使用独立副本
+        algorithm = dict(algorithm or {})
+        params = dict(params or {})
+        cancel_event = threading.Event()
+        if isinstance(self.executor, ProcessPoolExecutor):
+            future = loop.run_in_executor(self.executor, _generate_in_process,
+                                          target_info, mission, start_time, end_time, algorithm, params)
+        else:
+            future = loop.run_in_executor(self.executor, _generate, self.persona_algorithm,
+                                          target_info, mission, start_time, end_time, algorithm, params,
+                                          cancel_event)
+        return _Flight(future, cancel_event)
+
+    def _abandon(self, key: Optional[str], flight: _Flight):
+        """没有调用方继续等待时停止计算"""
+        flight.cancel_event.set()
+        flight.future.cancel()
+        self._forget(key, flight)
+
+    def _forget(self, key: Optional[str], flight: _Flight):
+        """移除进行中的计算（同一键可能已开始新的计算）"""
+        if key is not None and self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def shutdown(self, wait: bool = True):
+        """关闭服务（只关闭服务自行创建的执行器）"""
+        if self._owns_executor:
+            self.executor.shutdown(wait=wait)
+
+
+async def user_persona_algorithm_api_async(target_info: List[TargetInfo],
+                                           mission: Union[List[Mission], MissionTable],
+                                           start_time: str = None,
+                                           end_time: str = None,
+                                           algorithm: Dict[str, Any] = None,
+                                           params: Dict[str, Any] = None,
+                                           executor: Executor = None,
+                                           timeout: float = None) -> List[UserPersona]:
+    """
+    用户画像算法异步API入口函数（参数同 user_persona_algorithm_api）
+
+    :param executor: 执行器（可选，默认使用共享的单线程池）；同一执行器上的并发请求会被合并
+    :param timeout: 超时秒数（可选）
+    :return: 用户画像结果列表
+    """
+    return await _shared_service(executor).generate_user_persona(
+        target_info, mission, start_time, end_time, algorithm, params, timeout
+    )
+
+
+_DEFAULT_SERVICE: Optional[AsyncPersonaService] = None
+# 执行器 -> 服务（合并并发请求需要共享同一服务）
+_SERVICES: 'weakref.WeakKeyDictionary[Executor, AsyncPersonaService]' = weakref.WeakKeyDictionary()
+
+
+def _shared_service(executor: Executor = None) -> AsyncPersonaService:
+    """按执行器共享的异步画像服务"""
+    global _DEFAULT_SERVICE
+    if executor is None:
+        if _DEFAULT_SERVICE is None:
+            _DEFAULT_SERVICE = AsyncPersonaService()
+        return _DEFAULT_SERVICE
+    service = _SERVICES.get(executor)
+    if service is None:
+        service = _SERVICES[executor] = AsyncPersonaService(executor)
+    return service
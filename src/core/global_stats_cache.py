@@ -0,0 +1,196 @@
+"""
+全局统计缓存
+
+TF-IDF/BM25/auto 每次调用都要扫描全部任务计算全局统计。缓存以
+（数据集指纹, 时间范围）为键保存计算结果：
+- 数据集指纹只对全局统计依赖的用户、目标、时间列做完整哈希，比全量统计便宜；
+  列式数据与其缓存的时间、用户索引一样视为不可变，指纹按表对象缓存，对象列表每次重新计算
+- 条目超过 cache_ttl 秒后失效，超过 cache_max_entries 时淘汰最久未使用的条目
+- 由 config.algorithm_config.PERFORMANCE_CONFIG 控制是否启用
+"""
+
+from collections import OrderedDict
+import hashlib
+from operator import attrgetter
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Union
+
+from config.algorithm_config import PERFORMANCE_CONFIG
+from src.models.mission import Mission
+from src.models.mission_table import MissionTable
+
+# 指纹涉及的字段（全局统计只依赖用户与目标，时间字段决定过滤结果）
+FINGERPRINT_FIELDS = ('req_unit', 'req_group', 'target_id', 'req_start_time')
+# 列式数据表 -> {指纹字段: 指纹}
+_TABLE_FINGERPRINTS: 'weakref.WeakKeyDictionary[MissionTable, Dict[tuple, str]]' = weakref.WeakKeyDictionary()
+
+
+def dataset_fingerprint(missions: Union[List[Mission], MissionTable],
+                        fields: Sequence[str] = FINGERPRINT_FIELDS) -> str:
+    """
+    计算数据集指纹
+    列式数据对指纹字段的编码与字典做完整哈希，结果按表对象缓存（原地修改列数组后需调用
+    GlobalStatsCache.clear()）；对象列表对每个指纹字段的全部取值做哈希，任一任务变化都会改变指纹
+    :param missions: 任务列表或列式数据表
+    :param fields: 参与指纹的字段（默认为全局统计依赖的字段）
+    :return: 十六进制指纹
+    """
+    if isinstance(missions, MissionTable):
+        fingerprints = _TABLE_FINGERPRINTS.setdefault(missions, {})
+        fields = tuple(fields)
+        if fields not in fingerprints:
+            fingerprints[fields] = _table_fingerprint(missions, fields)
+        return fingerprints[fields]
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(len(missions)).encode())
+    for field in fields:
+        values = list(map(attrgetter(field), missions))
+        try:
+            joined = '\x1f'.join(values)
+        except TypeError:
+            # 非字符串取值（如 None）按 repr 区分
+            joined = '\x1f'.join(value if isinstance(value, str) else repr(value) for value in values)
+        digest.update(field.encode())
+        digest.update(joined.encode('utf-8', 'surrogatepass'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def _table_fingerprint(table: MissionTable, fields: Sequence[str]) -> str:
+    """对列式数据指纹字段的编码与字典做完整哈希"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(len(table)).encode())
+    for field in fields:
+        if field not in table.columns:
+            continue
+        digest.update(field.encode())
+        digest.update(table.columns[field].tobytes())
+        if field in table.categories:
+            values = table.categories[field]
+            if values.dtype.hasobject:
+                # object字典的 tobytes 是对象地址，按取值的 repr 哈希
+                digest.update('\x1f'.join(map(repr, values.tolist())).encode('utf-8', 'surrogatepass'))
+            else:
+                digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+class GlobalStatsCache:
+    """带TTL与LRU淘汰的全局统计缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = 32, ttl: float = 3600, clock: Callable[[], float] = time.monotonic):
+        """
+        :param max_entries: 最多保留的条目数
+        :param ttl: 条目生存时间（秒），None 表示永不过期
+        :param clock: 时钟函数（秒）
+        """
+        if max_entries < 1:
+            raise ValueError("缓存条目数必须大于0")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 键 -> (写入时间, 全局统计)，顺序即最近使用顺序
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(missions: Union[List[Mission], MissionTable],
+                 start_time: str = None, end_time: str = None) -> tuple:
+        """
+        生成缓存键
+        :param missions: 时间过滤前的任务数据
+        :param start_time: 开始时间
+        :param end_time: 结束时间
+        :return: (数据集指纹, 开始时间, 结束时间)
+        """
+        return dataset_fingerprint(missions), start_time or None, end_time or None
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        查询缓存
+        :param key: 缓存键
+        :return: 全局统计，未命中或已过期返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and self.clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, global_stats: Dict[str, Any]):
+        """
+        写入缓存，超过容量时淘汰最久未使用的条目
+        :param key: 缓存键
+        :param global_stats: 全局统计
+        """
+        with self._lock:
+            self._entries[key] = (self.clock(), global_stats)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        查询缓存，未命中时计算并写入
+        :param key: 缓存键
+        :param compute: 计算全局统计的函数
+        :return: 全局统计
+        """
+        global_stats = self.get(key)
+        if global_stats is None:
+            global_stats = compute()
+            self.put(key, global_stats)
+        return global_stats
+
+    def clear(self):
+        """清空缓存（计数器保留）"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+_default_cache: Optional[GlobalStatsCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_global_stats_cache() -> Optional[GlobalStatsCache]:
+    """
+    进程内共享的全局统计缓存（按 PERFORMANCE_CONFIG 创建）
+    :return: 缓存实例，enable_caching 关闭时返回None
+    """
+    global _default_cache
+    if not PERFORMANCE_CONFIG.get('enable_caching', False):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = GlobalStatsCache(
+                max_entries=PERFORMANCE_CONFIG.get('cache_max_entries', 32),
+                ttl=PERFORMANCE_CONFIG.get('cache_ttl', 3600)
+            )
+        return _default_cache
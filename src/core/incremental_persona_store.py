@@ -0,0 +1,316 @@
+"""
+增量用户画像存储
+
+持续接收新增/撤销的需求批次，维护每个用户各标签的计数器和全局统计：
+- 新增任务只更新受影响用户的计数器，并只对这些用户重新排序Top-N
+- 撤销任务时按该用户剩余任务重建计数器（保证并列顺序与全量计算一致）
+- 批次先整体校验（需求标识号重复/不存在）并完成计数，出错时存储保持不变
+- TF-IDF/BM25 依赖的全局统计变化时不立即重算，查询时按版本号惰性刷新
+- 输出与对同一批任务调用 generate_user_persona 的结果一致
+
+设置 sketch_capacity 时为近似模式：键空间无界的目标、专题×分组、侦察场景计数改用
+Space-Saving 草图，不再保留任务对象，每个用户的内存与历史长度无关；画像中附带各标签的误差界，
+不支持撤销任务。TF-IDF/BM25 依赖的目标用户数不受草图淘汰影响，按每个目标的用户集合精确维护
+（每个不同的 用户×目标 组合一项，与历史长度无关）
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.models.mission import Mission
+from src.models.target_info import TargetInfo
+from src.models.user_persona import UserPersona
+from src.core.persona_tag_calculator import PersonaTagCalculator
+from src.core.target_index import TargetIndex
+from src.core.space_saving import SpaceSavingSketch
+
+# 依赖全局统计的偏好算法
+_STATS_DEPENDENT_ALGORITHMS = ('auto', 'tfidf', 'bm25')
+
+
+class _UserState:
+    """单个用户的任务与标签计数器"""
+
+    def __init__(self, user_id: Dict[str, str], first_seq: int, sketch_capacity: int = None):
+        """
+        :param user_id: 用户身份信息
+        :param first_seq: 首条任务序号
+        :param sketch_capacity: 草图容量，None 表示精确计数
+        """
+        self.user_id = user_id
+        # 序号 -> 任务，序号单调递增，字典顺序即任务提交顺序（近似模式不保留任务）
+        self.missions: Dict[int, Mission] = {}
+        self.mission_count = 0
+        self._first_seq = first_seq
+        self.target_counts = _make_counts(sketch_capacity)
+        self.region_counts = Counter()
+        self.category_counts = Counter()
+        self.topic_group_counts = _make_counts(sketch_capacity)
+        self.scenario_counts = _make_counts(sketch_capacity)
+        # 提报时间分布与需求时长（PersonaTagCalculator._count_request_times 的结构）
+        self.request_times: Optional[Dict[str, Any]] = None
+        # 缓存的画像标签及计算时的全局统计版本
+        self.persona_tags: Optional[Dict[str, Any]] = None
+        self.stats_version = -1
+
+    @property
+    def first_seq(self) -> int:
+        """首条任务序号，决定用户在输出中的顺序"""
+        return next(iter(self.missions)) if self.missions else self._first_seq
+
+
+def _make_counts(sketch_capacity: Optional[int]):
+    """键空间无界的标签计数器：精确模式为 Counter，近似模式为 Space-Saving 草图"""
+    return Counter() if sketch_capacity is None else SpaceSavingSketch(sketch_capacity)
+
+
+def _as_counter(counts) -> Counter:
+    """草图转换为估计计数的 Counter"""
+    return counts.to_counter() if isinstance(counts, SpaceSavingSketch) else counts
+
+
+class IncrementalPersonaStore:
+    """增量用户画像存储"""
+
+    def __init__(self, target_info: List[TargetInfo], algorithm: Dict[str, Any] = None,
+                 sketch_capacity: int = None):
+        """
+        :param target_info: 目标信息数据列表
+        :param algorithm: 算法配置参数（与 generate_user_persona 相同：preference_algorithm、top_n）
+        :param sketch_capacity: 近似模式下每个用户每个标签草图监视的键数（应不小于 top_n），
+                                默认 None 为精确模式
+        """
+        if sketch_capacity is not None and sketch_capacity < 1:
+            raise ValueError("草图容量必须大于0")
+        self.sketch_capacity = sketch_capacity
+        self.algorithm = dict(algorithm or {})
+        self.preference_algorithm = self.algorithm.get('preference_algorithm', 'auto')
+        self.target_index = TargetIndex(target_info)
+        self.tag_calculator = PersonaTagCalculator(algorithm_config=self.algorithm)
+
+        self._users: Dict[Tuple[str, str], _UserState] = {}
+        # 需求标识号 -> (用户键, 序号)
+        self._mission_locations: Dict[str, Tuple[Tuple[str, str], int]] = {}
+        self._next_seq = 0
+        self._total_missions = 0
+
+        # 全局统计：每个目标被多少用户使用
+        self._target_user_count: Dict[str, int] = {}
+        # 近似模式下每个目标的用户集合（草图会淘汰目标键，不能由草图推出目标用户数）
+        self._target_users: Dict[str, Set[Tuple[str, str]]] = {}
+        # 全局统计版本号，每次变化递增，用于惰性刷新
+        self._stats_version = 0
+
+    def __len__(self) -> int:
+        return self._total_missions
+
+    @property
+    def global_stats(self) -> Dict[str, Any]:
+        """当前全局统计（与 UserPersonaAlgorithm._calculate_global_stats 结构一致）"""
+        total_users = len(self._users)
+        return {
+            'target_user_count': self._target_user_count,
+            'total_users': total_users,
+            'avg_mission_count': self._total_missions / total_users if total_users > 0 else 0
+        }
+
+    def add_missions(self, missions: Iterable[Mission]) -> Set[Tuple[str, str]]:
+        """
+        新增一批任务（任一任务无效时整批不生效）
+        :param missions: 任务列表（需求标识号 req_id 需唯一）
+        :return: 受影响的用户键集合
+        """
+        approximate = self.sketch_capacity is not None
+        missions = list(missions)
+        if not approximate:
+            req_ids = set()
+            for mission in missions:
+                if mission.req_id in self._mission_locations or mission.req_id in req_ids:
+                    raise ValueError(f"需求 {mission.req_id} 已存在")
+                req_ids.add(mission.req_id)
+
+        batches: Dict[Tuple[str, str], List[Mission]] = {}
+        for mission in missions:
+            batches.setdefault((mission.req_unit, mission.req_group), []).append(mission)
+        # 先完成计数再修改存储，计数出错（如时间格式无效）时存储保持不变
+        batch_counts = {user_key: self._count(user_missions) for user_key, user_missions in batches.items()}
+
+        for mission in missions:
+            user_key = (mission.req_unit, mission.req_group)
+            user = self._users.get(user_key)
+            if user is None:
+                user = self._users[user_key] = _UserState(
+                    {'req_unit': mission.req_unit, 'req_group': mission.req_group},
+                    self._next_seq, self.sketch_capacity
+                )
+            user.mission_count += 1
+            # 近似模式不保留任务与需求标识号（不检查重复、不支持撤销）
+            if not approximate:
+                user.missions[self._next_seq] = mission
+                self._mission_locations[mission.req_id] = (user_key, self._next_seq)
+            self._next_seq += 1
+            self._total_missions += 1
+
+        for user_key, counts in batch_counts.items():
+            user = self._users[user_key]
+            before = set(user.target_counts)
+            # 新任务序号大于已有任务，新出现的键追加在末尾，计数器顺序仍是首次出现顺序
+            self._apply_counts(user, counts)
+            if approximate:
+                self._add_target_users(user_key, counts[0])
+            else:
+                self._update_target_user_count(before, set(user.target_counts))
+
+        self._finish_batch(batches)
+        return set(batches)
+
+    def remove_missions(self, missions: Iterable[Any]) -> Set[Tuple[str, str]]:
+        """
+        撤销一批任务（任一需求不存在时整批不生效）
+        :param missions: 任务或需求标识号列表
+        :return: 受影响的用户键集合
+        """
+        if self.sketch_capacity is not None:
+            raise ValueError("近似模式不保留任务，不支持撤销")
+        req_ids = {}
+        for mission in missions:
+            req_id = mission if isinstance(mission, str) else mission.req_id
+            # 同一批次内重复撤销同样视为不存在
+            if req_id not in self._mission_locations or req_id in req_ids:
+                raise KeyError(f"需求 {req_id} 不存在")
+            req_ids[req_id] = None
+
+        affected: Dict[Tuple[str, str], List[Mission]] = {}
+        for req_id in req_ids:
+            user_key, seq = self._mission_locations.pop(req_id)
+            user = self._users[user_key]
+            del user.missions[seq]
+            user.mission_count -= 1
+            self._total_missions -= 1
+            affected[user_key] = []
+
+        for user_key in affected:
+            user = self._users[user_key]
+            before = set(user.target_counts)
+            if not user.missions:
+                del self._users[user_key]
+                self._update_target_user_count(before, set())
+                continue
+            # 撤销可能改变键的首次出现位置，按剩余任务重建该用户的计数器
+            user.target_counts.clear()
+            user.region_counts.clear()
+            user.category_counts.clear()
+            user.topic_group_counts.clear()
+            user.scenario_counts.clear()
+            user.request_times = None
+            self._apply_counts(user, self._count(list(user.missions.values())))
+            self._update_target_user_count(before, set(user.target_counts))
+
+        self._finish_batch({key: [] for key in affected if key in self._users})
+        return set(affected)
+
+    def get_persona(self, req_unit: str, req_group: str) -> Optional[UserPersona]:
+        """
+        查询单个用户的画像
+        :param req_unit: 提出部门
+        :param req_group: 提出区组
+        :return: 用户画像，用户不存在时返回None
+        """
+        user = self._users.get((req_unit, req_group))
+        if user is None:
+            return None
+        return self._to_persona(user)
+
+    def get_personas(self) -> List[UserPersona]:
+        """全部用户画像，顺序与全量计算一致（按用户首条任务顺序）"""
+        users = sorted(self._users.values(), key=lambda user: user.first_seq)
+        return [self._to_persona(user) for user in users]
+
+    def _count(self, missions: List[Mission]) -> tuple:
+        """
+        统计一批任务（不修改存储）
+        :return: (目标, 地区, 类别, 专题×分组, 侦察场景计数, 提报时间统计)
+        """
+        calculator = self.tag_calculator
+        target_dict = self.target_index.target_dict
+        return (Counter(m.target_id for m in missions),
+                calculator._count_regions(missions, target_dict),
+                calculator._count_target_categories(missions, target_dict),
+                calculator._count_topic_groups(missions, target_dict),
+                calculator._count_scout_scenarios(missions),
+                calculator._count_request_times(missions))
+
+    def _apply_counts(self, user: _UserState, counts: tuple):
+        """把 _count 的结果累加到用户计数器"""
+        target_counts, region_counts, category_counts, topic_group_counts, scenario_counts, request_times = counts
+        user.target_counts.update(target_counts)
+        user.region_counts.update(region_counts)
+        user.category_counts.update(category_counts)
+        user.topic_group_counts.update(topic_group_counts)
+        user.scenario_counts.update(scenario_counts)
+        if user.request_times is not None:
+            request_times = self.tag_calculator._merge_request_times(user.request_times, request_times)
+        user.request_times = request_times
+
+    def _add_target_users(self, user_key: Tuple[str, str], target_ids: Iterable[str]):
+        """近似模式：把用户加入所用目标的用户集合，并更新目标用户数"""
+        for target_id in target_ids:
+            users = self._target_users.setdefault(target_id, set())
+            if user_key not in users:
+                users.add(user_key)
+                self._target_user_count[target_id] = len(users)
+
+    def _update_target_user_count(self, before: Set[str], after: Set[str]):
+        """根据用户目标集合的变化更新目标用户数"""
+        for target_id in after - before:
+            self._target_user_count[target_id] = self._target_user_count.get(target_id, 0) + 1
+        for target_id in before - after:
+            remaining = self._target_user_count[target_id] - 1
+            if remaining:
+                self._target_user_count[target_id] = remaining
+            else:
+                del self._target_user_count[target_id]
+
+    def _finish_batch(self, affected: Dict[Tuple[str, str], Any]):
+        """批次结束：全局统计版本递增，只对受影响用户重新排序"""
+        self._stats_version += 1
+        self.tag_calculator.global_stats = self.global_stats
+        for user_key in affected:
+            self._rank_user(self._users[user_key])
+
+    def _rank_user(self, user: _UserState):
+        """重新计算用户的全部画像标签"""
+        calculator = self.tag_calculator
+        total = user.mission_count
+        user.persona_tags = {
+            'request_frequency': calculator._request_frequency_from_counts(total, user.request_times),
+            'target_proportion': calculator._target_proportion_from_counts(_as_counter(user.target_counts), total),
+            'region_proportion': calculator._region_proportion_from_counts(user.region_counts),
+            'preferred_target_category': calculator._target_category_from_counts(user.category_counts),
+            'preferred_topic_group': calculator._topic_group_from_counts(_as_counter(user.topic_group_counts)),
+            'preferred_scout_scenario': calculator._scout_scenario_from_counts(_as_counter(user.scenario_counts),
+                                                                               total)
+        }
+        if self.sketch_capacity is not None:
+            # 各标签的误差界：展示的计数最多高估 max_error
+            user.persona_tags['approximation'] = {
+                'target_proportion': user.target_counts.error_bounds(),
+                'preferred_topic_group': user.topic_group_counts.error_bounds(),
+                'preferred_scout_scenario': user.scenario_counts.error_bounds()
+            }
+        user.stats_version = self._stats_version
+
+    def _to_persona(self, user: _UserState) -> UserPersona:
+        """生成画像对象，全局统计变化后惰性刷新依赖全局统计的目标占比"""
+        if (user.stats_version != self._stats_version
+                and self.preference_algorithm in _STATS_DEPENDENT_ALGORITHMS):
+            user.persona_tags['target_proportion'] = self.tag_calculator._target_proportion_from_counts(
+                _as_counter(user.target_counts), user.mission_count
+            )
+            user.stats_version = self._stats_version
+        return UserPersona(
+            user_id=dict(user.user_id),
+            persona_tags=dict(user.persona_tags),
+            generation_time=datetime.now().isoformat()
+        )
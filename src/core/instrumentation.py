@@ -0,0 +1,233 @@
+"""
+画像生成过程的埋点
+
+- Instrumentation 记录各阶段用时、计数器与分类取值（如 auto 为每个用户选择的算法），
+  可选开启 cProfile 函数级剖析与 tracemalloc 内存追踪，最后汇总为结构化报告
+- 未开启埋点时使用 NULL_INSTRUMENTATION，所有方法都是空操作
+- 任何实现 stage/count/choice/start/stop/report 的对象都可以作为埋点传入
+- 工作进程各自记录埋点，报告由 merge_report 合并到主进程的埋点中
+"""
+
+import cProfile
+from collections import Counter
+from contextlib import contextmanager
+import io
+import pstats
+import time
+import tracemalloc
+from typing import Any, Dict, List, Union
+
+# 剖析/内存报告中保留的条目数
+_REPORT_TOP = 20
+
+
+class _NullStage:
+    """空阶段计时器"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class NullInstrumentation:
+    """空埋点：所有方法都不做任何事"""
+
+    enabled = False
+
+    def stage(self, name: str):
+        return _NULL_STAGE
+
+    def count(self, name: str, value: int = 1):
+        pass
+
+    def choice(self, name: str, value: str, count: int = 1):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def report(self) -> Dict[str, Any]:
+        return {}
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+class Instrumentation:
+    """记录阶段用时、计数器与分类取值"""
+
+    enabled = True
+
+    def __init__(self, profile: bool = False, trace_memory: bool = False):
+        """
+        :param profile: 是否开启 cProfile 函数级剖析
+        :param trace_memory: 是否开启 tracemalloc 内存追踪
+        """
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.choices: Dict[str, Counter] = {}
+        self._profiler = None
+        self._memory_snapshot = None
+        self._memory_peak = None
+        self._started_tracemalloc = False
+        self._start_time = None
+        self._total_seconds = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        阶段计时（同名阶段累加用时与调用次数）
+        :param name: 阶段名
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def add_stage(self, name: str, seconds: float, calls: int = 1):
+        """
+        累加阶段用时（用于合并其他进程记录的阶段）
+        :param name: 阶段名
+        :param seconds: 用时（秒）
+        :param calls: 调用次数
+        """
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = {'seconds': seconds, 'calls': calls}
+        else:
+            entry['seconds'] += seconds
+            entry['calls'] += calls
+
+    def count(self, name: str, value: int = 1):
+        """
+        累加计数器
+        :param name: 计数器名
+        :param value: 增量
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def choice(self, name: str, value: str, count: int = 1):
+        """
+        记录分类取值（如自动选择的算法）
+        :param name: 分类名
+        :param value: 取值
+        :param count: 次数
+        """
+        self.choices.setdefault(name, Counter())[value] += count
+
+    def start(self):
+        """开始一次运行（开启剖析与内存追踪）"""
+        self._start_time = time.perf_counter()
+        if self.trace_memory:
+            self._started_tracemalloc = not tracemalloc.is_tracing()
+            if self._started_tracemalloc:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        """结束运行（停止剖析与内存追踪）"""
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self.trace_memory and tracemalloc.is_tracing():
+            self._memory_peak = tracemalloc.get_traced_memory()[1]
+            self._memory_snapshot = tracemalloc.take_snapshot()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        if self._start_time is not None:
+            self._total_seconds = time.perf_counter() - self._start_time
+
+    def report(self) -> Dict[str, Any]:
+        """
+        生成结构化报告
+        :return: {'total_seconds', 'stages', 'counters', 'choices', 'profile'?, 'memory'?}
+        """
+        report = {
+            'total_seconds': self._total_seconds,
+            'stages': {name: dict(entry) for name, entry in self.stages.items()},
+            'counters': dict(self.counters),
+            'choices': {name: dict(values) for name, values in self.choices.items()}
+        }
+        if self._profiler is not None:
+            report['profile'] = self._profile_report()
+        if self._memory_snapshot is not None:
+            report['memory'] = {
+                'peak_bytes': self._memory_peak,
+                'top': [
+                    {'location': str(stat.traceback), 'size_bytes': stat.size, 'count': stat.count}
+                    for stat in self._memory_snapshot.statistics('lineno')[:_REPORT_TOP]
+                ]
+            }
+        return report
+
+    def _profile_report(self) -> List[Dict[str, Any]]:
+        """按累计用时排序的函数剖析结果"""
+        stats = pstats.Stats(self._profiler, stream=io.StringIO())
+        rows = []
+        for (filename, line, function), (calls, _, total, cumulative, _) in stats.stats.items():
+            rows.append({
+                'function': f"{filename}:{line}({function})",
+                'calls': calls,
+                'total_seconds': total,
+                'cumulative_seconds': cumulative
+            })
+        rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+        return rows[:_REPORT_TOP]
+
+
+def merge_report(instrumentation: Any, report: Dict[str, Any]):
+    """
+    把其他埋点（如工作进程）的报告合并到埋点中：计数器与分类取值累加；
+    阶段用时在埋点支持 add_stage 时累加（多个进程的用时之和，可能超过墙钟时间）
+    :param instrumentation: 目标埋点
+    :param report: Instrumentation.report() 的结果
+    """
+    if not getattr(instrumentation, 'enabled', True) or not report:
+        return
+    add_stage = getattr(instrumentation, 'add_stage', None)
+    if add_stage is not None:
+        for name, entry in report.get('stages', {}).items():
+            add_stage(name, entry['seconds'], entry['calls'])
+    for name, value in report.get('counters', {}).items():
+        instrumentation.count(name, value)
+    for name, values in report.get('choices', {}).items():
+        for value, count in values.items():
+            instrumentation.choice(name, value, count)
+
+
+class PersonaResult(list):
+    """画像列表，附带埋点报告（与 List[UserPersona] 用法相同）"""
+
+    def __init__(self, personas=(), report: Dict[str, Any] = None):
+        super().__init__(personas)
+        self.report = report or {}
+
+
+def resolve_instrumentation(option: Union[bool, Dict[str, Any], Any]) -> Any:
+    """
+    由 params['instrumentation'] 得到埋点对象
+    :param option: False/None 关闭；True 开启计时与计数；
+                   字典 {'profile': bool, 'trace_memory': bool}；或自定义埋点对象
+    :return: 埋点对象
+    """
+    if not option:
+        return NULL_INSTRUMENTATION
+    if option is True:
+        return Instrumentation()
+    if isinstance(option, dict):
+        return Instrumentation(profile=option.get('profile', False),
+                               trace_memory=option.get('trace_memory', False))
+    return option
@@ -0,0 +1,413 @@
+"""
+超出内存的画像计算（out-of-core）
+
+任务历史大于内存时按用户分区计算：
+1. 一次流式扫描：按时间范围过滤后，按用户键哈希把任务写入磁盘上的分区文件，
+   同时记录每条任务在过滤后数据流中的序号
+2. 分区的列式数据超过内存预算时，换一个哈希盐把该分区再拆分；单个用户的历史无法拆分，
+   超出预算时仍整体计算并记录警告
+3. 同一用户的任务只落在一个分区中，全局统计（各目标的用户数、用户数、任务数）由各分区摘要直接相加
+4. 逐个加载分区计算画像，按用户首条任务序号写入结果文件，最后多路归并，
+   输出顺序与内容与内存中一次计算一致
+
+分区与结果文件都写在 spill_dir 下的临时目录中，迭代结束（或中止）后删除。
+"""
+
+import hashlib
+import heapq
+import json
+import logging
+import math
+import os
+import pickle
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.models.mission import Mission
+from src.models.mission_table import CATEGORICAL_FIELDS, MissionTable, code_dtype, parse_time_bound
+from src.models.target_info import TargetInfo
+from src.models.user_persona import UserPersona
+from src.core.instrumentation import NULL_INSTRUMENTATION
+from src.core.persona_tag_calculator import PersonaTagCalculator
+from src.core.vectorized_tag_engine import VectorizedTagEngine, TAG_FIELDS
+
+# 分区计算的工作内存约为分区列式数据的倍数（分组计数、排序等中间数组与画像结果）
+WORKING_SET_FACTOR = 4
+# 输入为任务列表或完整数据表时每批的行数
+DEFAULT_BATCH_ROWS = 65536
+# 输入总行数未知时的初始分区数
+DEFAULT_PARTITIONS = 16
+# 超出预算的分区最多再拆分的层数
+_MAX_SPLIT_DEPTH = 8
+# 依赖全局统计的偏好算法
+_STATS_DEPENDENT_ALGORITHMS = ('auto', 'tfidf', 'bm25')
+
+
+def iter_table_batches(missions: Union[List[Mission], MissionTable, Iterable[Union[Mission, MissionTable]]],
+                       batch_rows: int = DEFAULT_BATCH_ROWS) -> Iterator[MissionTable]:
+    """
+    把任务列表、完整数据表或数据表批次流（如 iter_mission_batches）统一为数据表批次
+    :param missions: 任务数据
+    :param batch_rows: 任务对象按多少行组成一批
+    :return: 数据表批次迭代器
+    """
+    if isinstance(missions, MissionTable):
+        for start in range(0, len(missions), batch_rows):
+            yield missions.take(slice(start, start + batch_rows))
+        return
+
+    pending = []
+    for item in missions:
+        if isinstance(item, MissionTable):
+            if pending:
+                yield MissionTable.from_missions(pending, fields=TAG_FIELDS)
+                pending = []
+            yield item
+            continue
+        pending.append(item)
+        if len(pending) == batch_rows:
+            yield MissionTable.from_missions(pending, fields=TAG_FIELDS)
+            pending = []
+    if pending:
+        yield MissionTable.from_missions(pending, fields=TAG_FIELDS)
+
+
+def _user_bucket(user: Tuple[str, str], salt: int, num_partitions: int) -> int:
+    """用户键的稳定哈希分区（与进程、运行次数无关）"""
+    digest = hashlib.blake2b(f"{user[0]}\x1f{user[1]}".encode('utf-8'), digest_size=8,
+                             salt=salt.to_bytes(8, 'little'))
+    return int.from_bytes(digest.digest(), 'little') % num_partitions
+
+
+class _Partition:
+    """磁盘上的一个分区文件"""
+
+    def __init__(self, path: str, depth: int):
+        self.path = path
+        self.depth = depth
+        self.rows = 0
+        # 列数组的字节数（不含各数据块的字典，加载后字典合并去重）
+        self.nbytes = 0
+        self.users = set()
+
+
+class _PartitionWriter:
+    """按用户键哈希把数据表批次追加写入各分区文件"""
+
+    def __init__(self, directory: str, num_partitions: int, fields: List[str], depth: int = 0):
+        """
+        :param directory: 分区文件目录
+        :param num_partitions: 分区数
+        :param fields: 写入的字段
+        :param depth: 拆分层数（同时作为哈希盐）
+        """
+        self.num_partitions = num_partitions
+        self.fields = fields
+        self.depth = depth
+        self.partitions: Dict[int, _Partition] = {}
+        self._files = {}
+        self._directory = directory
+        self._prefix = tempfile.mkstemp(prefix=f'spill-{depth}-', dir=directory)
+        os.close(self._prefix[0])
+        os.remove(self._prefix[1])
+
+    def add(self, table: MissionTable, seq: np.ndarray):
+        """
+        写入一批任务
+        :param table: 数据表批次
+        :param seq: 每行在过滤后数据流中的序号
+        """
+        user_codes, users = table.user_index()
+        user_buckets = np.array([_user_bucket(user, self.depth, self.num_partitions) for user in users],
+                                dtype=np.int64)
+        buckets = user_buckets[user_codes]
+        # 稳定排序后每个分区内的行保持原有顺序
+        order = np.argsort(buckets, kind='stable')
+        bounds = np.searchsorted(buckets[order], np.arange(self.num_partitions + 1))
+        for bucket in np.flatnonzero(np.diff(bounds)).tolist():
+            rows = order[bounds[bucket]:bounds[bucket + 1]]
+            partition = self._partition(bucket)
+            partition.nbytes += _write_chunk(self._files[bucket], table.take(rows), seq[rows], self.fields)
+            partition.rows += len(rows)
+        for code, bucket in enumerate(user_buckets.tolist()):
+            self.partitions[bucket].users.add(users[code])
+
+    def close(self) -> List[_Partition]:
+        """关闭分区文件，返回非空分区"""
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        return [self.partitions[bucket] for bucket in sorted(self.partitions)]
+
+    def _partition(self, bucket: int) -> _Partition:
+        partition = self.partitions.get(bucket)
+        if partition is None:
+            path = f"{self._prefix[1]}{bucket}.bin"
+            partition = self.partitions[bucket] = _Partition(path, self.depth)
+            self._files[bucket] = open(path, 'wb')
+        return partition
+
+
+def _write_chunk(f, table: MissionTable, seq: np.ndarray, fields: List[str]):
+    """
+    写入一块数据：各字段的列（分类字段压缩为本块用到的字典），最后是序号
+    :return: 列数组的字节数
+    """
+    nbytes = 0
+    for field in fields:
+        column = table.columns[field]
+        if field in table.categories:
+            used, codes = np.unique(column, return_inverse=True)
+            codes = codes.reshape(-1).astype(code_dtype(len(used)))
+            np.save(f, codes)
+            np.save(f, table.categories[field][used])
+            nbytes += codes.nbytes
+        else:
+            np.save(f, np.ascontiguousarray(column))
+            nbytes += column.nbytes
+    np.save(f, seq)
+    return nbytes
+
+
+def _iter_chunks(path: str, fields: List[str], categorical: List[str],
+                 columns: Sequence[str] = None) -> Iterator[Tuple[MissionTable, np.ndarray]]:
+    """
+    按写入顺序读取分区文件中的数据块
+    :param columns: 只读取这些字段（默认全部），其余数组直接跳过
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        while f.tell() < size:
+            table_columns, categories = {}, {}
+            for field in fields:
+                arrays = 2 if field in categorical else 1
+                if columns is not None and field not in columns:
+                    for _ in range(arrays):
+                        _skip_array(f)
+                    continue
+                table_columns[field] = np.load(f)
+                if arrays == 2:
+                    # 非字符串取值的字典以 pickle 保存（仅读取本进程写入的溢出文件）
+                    categories[field] = np.load(f, allow_pickle=True)
+            yield MissionTable(table_columns, categories), np.load(f)
+
+
+def _skip_array(f):
+    """跳过一个 .npy 数组（只读取头部）"""
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+    if dtype.hasobject:
+        pickle.load(f)
+        return
+    f.seek(int(np.prod(shape, dtype=np.int64)) * dtype.itemsize, os.SEEK_CUR)
+
+
+class OutOfCorePersonaGenerator:
+    """按用户分区、逐分区计算的画像生成器"""
+
+    def __init__(self,
+                 memory_budget: int,
+                 spill_dir: str = None,
+                 num_partitions: int = None,
+                 batch_rows: int = DEFAULT_BATCH_ROWS):
+        """
+        :param memory_budget: 内存预算（字节），单个分区的列式数据不超过 memory_budget / WORKING_SET_FACTOR
+        :param spill_dir: 分区文件所在目录（默认系统临时目录）
+        :param num_partitions: 初始分区数（默认按输入规模与预算估算，规模未知时为 DEFAULT_PARTITIONS）
+        :param batch_rows: 任务对象按多少行组成一批写入
+        """
+        if memory_budget <= 0:
+            raise ValueError("内存预算必须大于0")
+        self.memory_budget = memory_budget
+        self.partition_bytes = max(memory_budget // WORKING_SET_FACTOR, 1)
+        self.spill_dir = spill_dir
+        self.num_partitions = num_partitions
+        self.batch_rows = batch_rows
+        self.instrumentation = NULL_INSTRUMENTATION
+        self.logger = logging.getLogger('UserPersonaAlgorithm')
+
+    def iter_user_persona(self,
+                          target_info: List[TargetInfo],
+                          missions: Union[List[Mission], MissionTable, Iterable[Union[Mission, MissionTable]]],
+                          start_time: str = None,
+                          end_time: str = None,
+                          algorithm: Dict[str, Any] = None) -> Iterator[UserPersona]:
+        """
+        逐个产出用户画像
+        :param target_info: 目标信息列表
+        :param missions: 任务列表、列式数据表或数据表批次流（只扫描一次）
+        :param start_time: 开始时间（可选，格式同 generate_user_persona）
+        :param end_time: 结束时间（可选）
+        :param algorithm: 算法配置参数（preference_algorithm、top_n）
+        :return: 用户画像迭代器，顺序与内容与 generate_user_persona 一致
+        """
+        algorithm = dict(algorithm or {})
+        stage = self.instrumentation.stage
+        workdir = tempfile.mkdtemp(prefix='persona-spill-', dir=self.spill_dir)
+        try:
+            with stage('spill'):
+                partitions, fields = self._spill(missions, start_time, end_time, workdir)
+            with stage('partition_split'):
+                partitions = self._fit_to_budget(partitions, fields, workdir)
+            self.instrumentation.count('partitions', len(partitions))
+            self.logger.info(f"分区完成: {len(partitions)} 个分区, "
+                             f"{sum(partition.rows for partition in partitions)} 条需求")
+
+            if algorithm.get('preference_algorithm', 'auto') in _STATS_DEPENDENT_ALGORITHMS:
+                with stage('global_stats'):
+                    algorithm['global_stats'] = self._merge_global_stats(partitions, fields)
+
+            result_paths = []
+            for partition in partitions:
+                with stage('partition'):
+                    result_paths.append(self._process(partition, fields, target_info, algorithm))
+                os.remove(partition.path)
+
+            with stage('merge'):
+                for user_id, persona_tags in self._merge_results(result_paths):
+                    yield UserPersona(user_id=user_id, persona_tags=persona_tags,
+                                      generation_time=datetime.now().isoformat())
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _spill(self, missions, start_time: str, end_time: str,
+               workdir: str) -> Tuple[List[_Partition], List[str]]:
+        """一次流式扫描：时间过滤后按用户哈希写入分区文件"""
+        start_epoch = parse_time_bound(start_time) if start_time else None
+        end_epoch = parse_time_bound(end_time, end=True) if end_time else None
+        total_rows = len(missions) if hasattr(missions, '__len__') else None
+
+        writer = None
+        fields = None
+        offset = 0
+        for batch in iter_table_batches(missions, self.batch_rows):
+            if fields is None:
+                fields = [field for field in TAG_FIELDS if field in batch.columns]
+            missing = [field for field in fields if field not in batch.columns]
+            if missing:
+                raise ValueError(f"任务批次缺少字段: {missing}")
+
+            epochs = batch.columns['req_start_time']
+            mask = np.ones(len(batch), dtype=bool)
+            if start_epoch is not None:
+                mask &= epochs >= start_epoch
+            if end_epoch is not None:
+                mask &= epochs <= end_epoch
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                continue
+            batch = batch.take(rows)
+
+            if writer is None:
+                writer = _PartitionWriter(workdir, self._initial_partitions(batch, total_rows), fields)
+            writer.add(batch, np.arange(offset, offset + len(batch), dtype=np.int64))
+            offset += len(batch)
+        return (writer.close() if writer is not None else []), fields or list(TAG_FIELDS)
+
+    def _initial_partitions(self, batch: MissionTable, total_rows: Optional[int]) -> int:
+        """按首批数据的每行字节数与输入总行数估算初始分区数"""
+        if self.num_partitions is not None:
+            return max(int(self.num_partitions), 1)
+        if total_rows is None:
+            return DEFAULT_PARTITIONS
+        # 批次可能与完整数据表共享字典，只按列数组估算
+        row_bytes = sum(column.nbytes for column in batch.columns.values()) / max(len(batch), 1)
+        estimated = row_bytes * total_rows
+        return max(math.ceil(estimated / self.partition_bytes), 1)
+
+    def _fit_to_budget(self, partitions: List[_Partition], fields: List[str], workdir: str) -> List[_Partition]:
+        """把超出预算的分区换哈希盐继续拆分，直到都不超出预算或只剩单个用户"""
+        categorical = [field for field in fields if field in CATEGORICAL_FIELDS]
+        fitted = []
+        pending = list(partitions)
+        while pending:
+            partition = pending.pop()
+            nbytes = partition.nbytes
+            if nbytes <= self.partition_bytes or len(partition.users) <= 1 or partition.depth >= _MAX_SPLIT_DEPTH:
+                if nbytes > self.partition_bytes:
+                    self.logger.warning(f"分区超出内存预算且无法继续拆分: {partition.rows} 条需求, "
+                                        f"{len(partition.users)} 个用户")
+                fitted.append(partition)
+                continue
+            writer = _PartitionWriter(workdir, math.ceil(nbytes / self.partition_bytes) + 1, fields,
+                                      depth=partition.depth + 1)
+            for table, seq in _iter_chunks(partition.path, fields, categorical):
+                writer.add(table, seq)
+            os.remove(partition.path)
+            pending.extend(writer.close())
+            self.instrumentation.count('partition_splits')
+        return fitted
+
+    def _load(self, partition: _Partition, fields: List[str],
+              columns: Sequence[str] = None) -> Tuple[MissionTable, np.ndarray]:
+        """加载整个分区（可只加载部分字段）"""
+        categorical = [field for field in fields if field in CATEGORICAL_FIELDS]
+        tables, seqs = [], []
+        for table, seq in _iter_chunks(partition.path, fields, categorical, columns):
+            tables.append(table)
+            seqs.append(seq)
+        return MissionTable.concat(tables), np.concatenate(seqs)
+
+    def _merge_global_stats(self, partitions: List[_Partition], fields: List[str]) -> Dict[str, Any]:
+        """
+        由各分区摘要合并全局统计（与 UserPersonaAlgorithm._calculate_global_stats 一致）
+        每个用户只在一个分区中，目标用户数、用户数与任务数都可直接相加
+        """
+        target_user_count: Dict[str, int] = {}
+        total_users = 0
+        total_missions = 0
+        for partition in partitions:
+            table, _ = self._load(partition, fields, columns=('req_unit', 'req_group', 'target_id'))
+            user_codes, users = table.user_index()
+            target_names = table.categories['target_id']
+            pairs = np.unique(user_codes * len(target_names) + table.codes('target_id').astype(np.int64))
+            users_per_target = np.bincount(pairs % len(target_names), minlength=len(target_names))
+            used = np.flatnonzero(users_per_target)
+            for target_id, count in zip(target_names[used].tolist(), users_per_target[used].tolist()):
+                target_user_count[target_id] = target_user_count.get(target_id, 0) + count
+            total_users += len(users)
+            total_missions += len(table)
+        return {
+            'target_user_count': target_user_count,
+            'total_users': total_users,
+            'avg_mission_count': total_missions / total_users if total_users > 0 else 0
+        }
+
+    def _process(self, partition: _Partition, fields: List[str],
+                 target_info: List[TargetInfo], algorithm: Dict[str, Any]) -> str:
+        """
+        计算一个分区的画像并写入结果文件
+        :return: 结果文件路径，每行为 [用户首条任务序号, 用户身份信息, 画像标签]，按序号递增
+        """
+        table, seq = self._load(partition, fields)
+        tag_calculator = PersonaTagCalculator(algorithm_config=algorithm)
+        tag_calculator.instrumentation = self.instrumentation
+        all_persona_tags = VectorizedTagEngine(tag_calculator).generate_all_persona_tags(table, target_info)
+
+        # 用户按分区内首次出现顺序排列，分区内行序与数据流一致，首条任务序号递增
+        order, bounds, _ = table.user_row_index()
+        first_seq = seq[order[bounds[:-1]]].tolist()
+        path = partition.path + '.personas'
+        with open(path, 'w', encoding='utf-8') as f:
+            for seq_value, (user_id, persona_tags) in zip(first_seq, all_persona_tags):
+                f.write(json.dumps([seq_value, user_id, persona_tags], ensure_ascii=False))
+                f.write('\n')
+        return path
+
+    @staticmethod
+    def _merge_results(paths: List[str]) -> Iterator[Tuple[Dict[str, str], Dict[str, Any]]]:
+        """按用户首条任务序号多路归并各分区的结果"""
+        def read(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
+
+        for _, user_id, persona_tags in heapq.merge(*(read(path) for path in paths), key=lambda item: item[0]):
+            yield user_id, persona_tags
@@ -0,0 +1,179 @@
+"""
+多进程并行画像生成
+
+- 按用户分片，分片间互不依赖，由 ProcessPoolExecutor 并行计算
+- 全局统计在主进程计算一次，随算法配置下发给每个工作进程
+- MissionTable 的列与字典放入同一块共享内存，工作进程直接映射，不再序列化任务数据
+- 每个分片的行号在主进程按分片排好后一并共享，工作进程直接切片取行
+- 开启埋点时工作进程各自记录阶段用时、计数器与 auto 算法选择，主进程合并
+- 结果按用户首次出现顺序合并，与串行输出一致
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from src.models.mission_table import MissionTable
+from src.models.target_info import TargetInfo
+from src.core.instrumentation import NULL_INSTRUMENTATION, Instrumentation, merge_report
+from src.core.persona_tag_calculator import PersonaTagCalculator
+from src.core.vectorized_tag_engine import VectorizedTagEngine
+
+# 共享内存中数组的对齐字节数
+_ALIGNMENT = 64
+# 每个工作进程对应的分片数，分片越细负载越均衡
+_SHARDS_PER_WORKER = 4
+
+# 工作进程内的只读状态（由 _init_worker 设置）
+_worker_state: Dict[str, Any] = {}
+
+
+class SharedTableBuffer:
+    """把 MissionTable 的列与字典复制到一块共享内存"""
+
+    def __init__(self, table: MissionTable, extra_columns: Dict[str, np.ndarray] = None):
+        """
+        :param table: 列式任务数据表
+        :param extra_columns: 需要一并共享的附加数组（如每行所属分片）
+        """
+        arrays = [('column', field, column) for field, column in table.columns.items()]
+        arrays += [('category', field, values) for field, values in table.categories.items()]
+        arrays += [('extra', name, values) for name, values in (extra_columns or {}).items()]
+
+        # object字典（非字符串取值）无法放入共享内存，随 spec 传给工作进程
+        objects = [(kind, name, array) for kind, name, array in arrays if array.dtype.hasobject]
+        arrays = [(kind, name, array) for kind, name, array in arrays if not array.dtype.hasobject]
+
+        layout = []
+        offset = 0
+        for kind, name, array in arrays:
+            array = np.ascontiguousarray(array)
+            layout.append((kind, name, array.dtype.str, array.shape, offset))
+            offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for (kind, name, array), (_, _, dtype, shape, start) in zip(arrays, layout):
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=start)
+            view[...] = array
+        self.spec = {'name': self.shm.name, 'layout': layout, 'objects': objects}
+
+    def close(self):
+        """释放共享内存"""
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach_shared_table(spec: Dict[str, Any]) -> Tuple[MissionTable, Dict[str, np.ndarray], shared_memory.SharedMemory]:
+    """
+    在工作进程中映射共享内存中的数据表（零拷贝）
+    :param spec: SharedTableBuffer.spec
+    :return: (数据表, 附加数组, 共享内存句柄)
+    """
+    shm = shared_memory.SharedMemory(name=spec['name'])
+
+    columns, categories, extra = {}, {}, {}
+    targets = {'column': columns, 'category': categories, 'extra': extra}
+    for kind, name, dtype, shape, offset in spec['layout']:
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        view.flags.writeable = False
+        targets[kind][name] = view
+    for kind, name, array in spec['objects']:
+        targets[kind][name] = array
+    return MissionTable(columns, categories), extra, shm
+
+
+def _init_worker(spec: Dict[str, Any], target_info: List[TargetInfo], algorithm_config: Dict[str, Any],
+                 instrumented: bool = False):
+    """工作进程初始化：映射共享数据，缓存目标信息与算法配置"""
+    table, extra, shm = attach_shared_table(spec)
+    _worker_state.update(
+        table=table,
+        shard_rows=extra['shard_rows'],
+        shard_bounds=extra['shard_bounds'],
+        shm=shm,
+        target_info=target_info,
+        algorithm_config=algorithm_config,
+        instrumented=instrumented
+    )
+
+
+def _generate_shard(shard: int) -> Tuple[List[Tuple[Dict[str, str], Dict[str, Any]]], Dict[str, Any]]:
+    """
+    计算一个分片内所有用户的画像标签
+    :return: (画像标签列表, 埋点报告)，未开启埋点时报告为空
+    """
+    table = _worker_state['table']
+    bounds = _worker_state['shard_bounds']
+    rows = _worker_state['shard_rows'][bounds[shard]:bounds[shard + 1]]
+    tag_calculator = PersonaTagCalculator(algorithm_config=_worker_state['algorithm_config'])
+    if _worker_state['instrumented']:
+        tag_calculator.instrumentation = Instrumentation()
+    results = VectorizedTagEngine(tag_calculator).generate_all_persona_tags(table.take(rows),
+                                                                           _worker_state['target_info'])
+    return results, tag_calculator.instrumentation.report()
+
+
+def plan_user_shards(user_codes: np.ndarray, num_users: int, num_shards: int) -> np.ndarray:
+    """
+    按任务量把用户分配到分片（最长处理时间优先的贪心分配）
+    :param user_codes: 每行的用户编码
+    :param num_users: 用户数
+    :param num_shards: 分片数
+    :return: 每个用户所属分片
+    """
+    loads = np.bincount(user_codes, minlength=num_users)
+    shard_of_user = np.zeros(num_users, dtype=np.int32)
+    heap = [(0, shard) for shard in range(num_shards)]
+    for user in np.argsort(-loads, kind='stable').tolist():
+        load, shard = heapq.heappop(heap)
+        shard_of_user[user] = shard
+        heapq.heappush(heap, (load + int(loads[user]), shard))
+    return shard_of_user
+
+
+def generate_persona_tags_parallel(table: MissionTable,
+                                   target_info: List[TargetInfo],
+                                   algorithm_config: Dict[str, Any],
+                                   workers: int,
+                                   instrumentation: Any = NULL_INSTRUMENTATION) -> List[Tuple[Dict[str, str], Dict[str, Any]]]:
+    """
+    多进程计算所有用户的画像标签
+    :param table: 列式任务数据表（已完成时间过滤）
+    :param target_info: 目标信息列表
+    :param algorithm_config: 算法配置（含全局统计）
+    :param workers: 工作进程数
+    :param instrumentation: 埋点，开启时合并各工作进程的阶段用时（各进程之和）、计数器与分类取值
+    :return: [(用户身份信息, 画像标签字典)]，顺序与串行结果一致
+    """
+    user_codes, users = table.user_index()
+    if not users:
+        return []
+
+    num_shards = min(len(users), workers * _SHARDS_PER_WORKER)
+    shard_of_user = plan_user_shards(user_codes, len(users), num_shards)
+    # 按分片稳定排序的行号：每个分片的行是连续一段，且保持原有行顺序
+    shard_of_row = shard_of_user[user_codes]
+    shard_rows = np.argsort(shard_of_row, kind='stable')
+    shard_bounds = np.searchsorted(shard_of_row[shard_rows], np.arange(num_shards + 1))
+    buffer = SharedTableBuffer(table, {'shard_rows': shard_rows, 'shard_bounds': shard_bounds})
+
+    instrumented = bool(getattr(instrumentation, 'enabled', True))
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(buffer.spec, target_info, algorithm_config, instrumented)) as executor:
+            shard_results = list(executor.map(_generate_shard, range(num_shards)))
+    finally:
+        buffer.close()
+
+    # 按用户首次出现顺序合并
+    user_position = {user: position for position, user in enumerate(users)}
+    merged = [None] * len(users)
+    for results, report in shard_results:
+        merge_report(instrumentation, report)
+        for user_id, persona_tags in results:
+            merged[user_position[(user_id['req_unit'], user_id['req_group'])]] = (user_id, persona_tags)
+    return merged
@@ -0,0 +1,310 @@
+"""
+本地画像查询服务
+
+常驻内存的画像查询 HTTP 服务（只依赖标准库）：
+- 启动时加载任务表与目标信息并构建按日计数索引（WindowedPersonaIndex），之后不再读取数据
+- 每个 (时间窗口, 算法, top_n) 的全部画像在首次查询时计算一次（含该窗口的全局统计），
+  按 LRU 保留最近的若干个，之后的单用户与批量查询都是字典查找；不同窗口的首次计算可并发进行，
+  相同窗口的并发查询只计算一次
+- 记录各接口的请求延迟，/stats 返回 p50/p90/p99
+
+接口：
+    GET  /health
+    GET  /stats
+    GET  /persona?req_unit=..&req_group=..[&start_time=..&end_time=..&preference_algorithm=..&top_n=..]
+    GET  /personas[?start_time=..&end_time=..&preference_algorithm=..&top_n=..]
+    POST /personas/batch   {"users": [{"req_unit": .., "req_group": ..}], "start_time": .., ...}
+
+用法：
+    python -m src.core.persona_server --data-dir data/binary
+    python -m src.core.persona_server --targets target_info.txt --missions mission_info.txt
+    python -m src.core.persona_server --generate 500000 --port 8765
+"""
+
+import argparse
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from src.models.mission_table import MissionTable, parse_time_bound
+from src.models.target_info import TargetInfo
+from src.core.vectorized_tag_engine import TAG_FIELDS
+from src.core.windowed_persona import WindowedPersonaIndex
+
+# 默认保留的窗口结果数
+DEFAULT_CACHED_WINDOWS = 32
+# 每个接口保留的延迟样本数
+LATENCY_SAMPLES = 10000
+
+
+class LatencyRecorder:
+    """按接口记录最近的请求延迟（线程安全）"""
+
+    def __init__(self, max_samples: int = LATENCY_SAMPLES):
+        """
+        :param max_samples: 每个接口保留的样本数
+        """
+        self.max_samples = max_samples
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float):
+        """记录一次请求延迟"""
+        with self._lock:
+            self._samples.setdefault(endpoint, deque(maxlen=self.max_samples)).append(seconds)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        各接口的延迟统计（毫秒，基于最近的样本）
+        :return: {接口: {'count', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms'}}
+        """
+        with self._lock:
+            samples = {endpoint: np.array(values) * 1000 for endpoint, values in self._samples.items()}
+            counts = dict(self._counts)
+        summary = {}
+        for endpoint, values in samples.items():
+            p50, p90, p99 = np.percentile(values, [50, 90, 99]).tolist()
+            summary[endpoint] = {
+                'count': counts[endpoint],
+                'p50_ms': round(p50, 3),
+                'p90_ms': round(p90, 3),
+                'p99_ms': round(p99, 3),
+                'max_ms': round(float(values.max()), 3)
+            }
+        return summary
+
+
+class PersonaQueryEngine:
+    """常驻内存的画像查询引擎"""
+
+    def __init__(self, target_info: List[TargetInfo], table: MissionTable,
+                 cached_windows: int = DEFAULT_CACHED_WINDOWS):
+        """
+        :param target_info: 目标信息列表
+        :param table: 列式任务数据表
+        :param cached_windows: 保留的窗口结果数
+        """
+        start = time.perf_counter()
+        self.table = MissionTable.from_missions(table, fields=TAG_FIELDS)
+        self.index = WindowedPersonaIndex(self.table, target_info)
+        self.build_seconds = time.perf_counter() - start
+        self.cached_windows = cached_windows
+        # (开始时间戳, 结束时间戳, 算法, top_n) -> {(部门, 区组): 画像字典}
+        self._windows: 'OrderedDict[tuple, Dict[Tuple[str, str], Dict[str, Any]]]' = OrderedDict()
+        # 正在计算的窗口 -> 结果 Future，相同窗口的并发查询等待同一次计算
+        self._pending: Dict[tuple, Future] = {}
+        # 只保护 _windows 的插入淘汰与 _pending，不在锁内计算
+        self._lock = threading.Lock()
+
+    def personas(self, start_time: str = None, end_time: str = None,
+                 preference_algorithm: str = 'auto', top_n: int = 3) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        时间窗口内所有用户的画像
+        :return: {(部门, 区组): 画像字典}，按窗口内首次出现顺序排列
+        """
+        # 按解析后的时间边界作键，'2024-03-01' 与 '2024-03-01 00:00:00' 共用一个窗口
+        key = (parse_time_bound(start_time) if start_time else None,
+               parse_time_bound(end_time, end=True) if end_time else None,
+               preference_algorithm, top_n)
+
+        # 命中时不加锁：OrderedDict 的单次 get / move_to_end 在 GIL 下是原子的，并发淘汰时忽略 KeyError
+        personas = self._windows.get(key)
+        if personas is not None:
+            try:
+                self._windows.move_to_end(key)
+            except KeyError:
+                pass
+            return personas
+
+        with self._lock:
+            personas = self._windows.get(key)
+            if personas is not None:
+                return personas
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = Future()
+        if not owner:
+            return pending.result()
+
+        try:
+            tags = self.index.query(start_time, end_time,
+                                    {'preference_algorithm': preference_algorithm, 'top_n': top_n})
+            generation_time = datetime.now().isoformat()
+            personas = {
+                (user_id['req_unit'], user_id['req_group']): {
+                    'user_id': user_id, 'persona_tags': persona_tags, 'generation_time': generation_time
+                }
+                for user_id, persona_tags in tags
+            }
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            self._windows[key] = personas
+            while len(self._windows) > self.cached_windows:
+                self._windows.popitem(last=False)
+            del self._pending[key]
+        pending.set_result(personas)
+        return personas
+
+    def persona(self, req_unit: str, req_group: str, **query) -> Optional[Dict[str, Any]]:
+        """单个用户的画像（窗口内没有该用户时返回None）"""
+        return self.personas(**query).get((req_unit, req_group))
+
+    def batch(self, users: List[Dict[str, str]], **query) -> List[Optional[Dict[str, Any]]]:
+        """一批用户的画像，与 users 一一对应"""
+        personas = self.personas(**query)
+        return [personas.get((user.get('req_unit'), user.get('req_group'))) for user in users]
+
+
+def _query_options(values: Dict[str, Any]) -> Dict[str, Any]:
+    """从请求参数中取出窗口与算法参数"""
+    options = {
+        'start_time': values.get('start_time') or None,
+        'end_time': values.get('end_time') or None,
+        'preference_algorithm': values.get('preference_algorithm') or values.get('algorithm') or 'auto',
+        'top_n': int(values.get('top_n') or 3)
+    }
+    if options['top_n'] < 1:
+        raise ValueError("top_n 必须大于0")
+    return options
+
+
+def make_handler(engine: PersonaQueryEngine, latencies: LatencyRecorder):
+    """创建绑定查询引擎的请求处理类"""
+
+    class PersonaRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            values = {name: items[-1] for name, items in parse_qs(url.query).items()}
+            routes = {
+                '/health': lambda: (200, {'status': 'ok', 'missions': len(engine.table),
+                                          'users': len(engine.index.users)}),
+                '/stats': lambda: (200, {'build_seconds': round(engine.build_seconds, 3),
+                                         'latency': latencies.summary()}),
+                '/persona': lambda: self._persona(values),
+                '/personas': lambda: (200, list(engine.personas(**_query_options(values)).values()))
+            }
+            self._dispatch(url.path, routes.get(url.path))
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            handler = None
+            if url.path == '/personas/batch':
+                handler = self._batch
+            self._dispatch(url.path, handler)
+
+        def _persona(self, values: Dict[str, str]):
+            if 'req_unit' not in values or 'req_group' not in values:
+                return 400, {'error': '缺少 req_unit 或 req_group'}
+            persona = engine.persona(values['req_unit'], values['req_group'], **_query_options(values))
+            if persona is None:
+                return 404, {'error': '窗口内没有该用户'}
+            return 200, persona
+
+        def _batch(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            users = body.get('users')
+            if not isinstance(users, list):
+                return 400, {'error': '请求体需要 users 列表'}
+            return 200, {'personas': engine.batch(users, **_query_options(body))}
+
+        def _dispatch(self, path: str, handler):
+            start = time.perf_counter()
+            try:
+                status, payload = handler() if handler is not None else (404, {'error': f'未知接口: {path}'})
+            except (ValueError, TypeError) as e:
+                status, payload = 400, {'error': str(e)}
+            except Exception as e:
+                logging.getLogger('PersonaServer').exception("请求处理失败")
+                status, payload = 500, {'error': str(e)}
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            if handler is not None:
+                latencies.record(f"{self.command} {path}", time.perf_counter() - start)
+
+        def log_message(self, format, *args):
+            # 压测时逐请求日志开销过大，只在DEBUG级别输出
+            logging.getLogger('PersonaServer').debug(format, *args)
+
+    return PersonaRequestHandler
+
+
+def make_server(engine: PersonaQueryEngine, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    """
+    创建画像查询服务（调用 serve_forever() 开始服务）
+    :param engine: 画像查询引擎
+    :param host: 监听地址（默认只监听本机）
+    :param port: 端口，0 表示自动选择
+    :return: HTTP 服务
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(engine, LatencyRecorder()))
+    server.daemon_threads = True
+    return server
+
+
+def _load(args) -> Tuple[List[TargetInfo], MissionTable]:
+    """按命令行参数加载数据"""
+    if args.data_dir:
+        from src.utils.binary_dataset import load_dataset_binary
+        return load_dataset_binary(args.data_dir, fields=TAG_FIELDS)
+    if args.targets and args.missions:
+        from src.utils.data_loader import load_targets_from_file, load_mission_table
+        return load_targets_from_file(args.targets), load_mission_table(args.missions)
+    from src.utils.data_generator import generate_smart_data
+    return generate_smart_data(num_targets=args.num_targets, num_missions=args.generate, bulk=True, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地画像查询服务")
+    parser.add_argument('--data-dir', help="二进制列式数据集目录")
+    parser.add_argument('--targets', help="目标信息TSV文件")
+    parser.add_argument('--missions', help="任务信息TSV文件")
+    parser.add_argument('--generate', type=int, default=100000, help="未指定数据时生成的任务数")
+    parser.add_argument('--num-targets', type=int, default=100, help="未指定数据时生成的目标数")
+    parser.add_argument('--seed', type=int, default=0, help="生成数据的随机种子")
+    parser.add_argument('--host', default='127.0.0.1', help="监听地址")
+    parser.add_argument('--port', type=int, default=8765, help="端口")
+    parser.add_argument('--cached-windows', type=int, default=DEFAULT_CACHED_WINDOWS, help="保留的窗口结果数")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('PersonaServer')
+    target_info, table = _load(args)
+    engine = PersonaQueryEngine(target_info, table, args.cached_windows)
+    logger.info(f"索引构建完成: {len(engine.table)} 条需求, {len(engine.index.users)} 个用户, "
+                f"用时 {engine.build_seconds:.3f} 秒")
+
+    server = make_server(engine, args.host, args.port)
+    logger.info(f"画像查询服务已启动: http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+用户画像近邻检索
+
+以画像标签使用的同一套 (用户, 键) 计数为每个用户构建偏好向量：
+- 默认维度为侦察目标、侦察区域与侦察场景，每个维度只保留出现过的键
+- 每个维度的计数向量先单位化，再按权重平方根缩放后拼接，最后整体单位化，
+  两个用户的内积即各维度余弦相似度的加权平均
+- 全量近邻按用户分块做矩阵乘法，每块的相似度矩阵大小受 block_bytes 限制，
+  结果只保留每个用户的 Top-K，内存与用户数成线性关系
+
+偏好向量以 float32 稠密矩阵保存，大小为 用户数 × 各维度出现过的键数之和。
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.models.mission import Mission
+from src.models.mission_table import MissionTable
+from src.models.target_info import TargetInfo
+from src.core.persona_tag_calculator import PersonaTagCalculator
+from src.core.vectorized_tag_engine import GroupCounts, TargetFeatures, VectorizedTagEngine, TAG_FIELDS
+
+# 默认参与相似度计算的维度
+SIMILARITY_DIMENSIONS = ('target_proportion', 'region_proportion', 'preferred_scout_scenario')
+# 全量近邻时每块相似度矩阵的字节数上限
+DEFAULT_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+class PersonaSimilarityIndex:
+    """基于偏好向量余弦相似度的用户近邻索引"""
+
+    def __init__(self,
+                 table: Union[List[Mission], MissionTable],
+                 target_info: List[TargetInfo],
+                 dimensions: Sequence[str] = SIMILARITY_DIMENSIONS,
+                 weights: Dict[str, float] = None,
+                 block_bytes: int = DEFAULT_BLOCK_BYTES):
+        """
+        :param table: 任务列表或列式任务数据表
+        :param target_info: 目标信息列表
+        :param dimensions: 参与计算的标签维度（target_proportion、region_proportion、
+                           preferred_target_category、preferred_topic_group、preferred_scout_scenario）
+        :param weights: 各维度权重，默认均为1
+        :param block_bytes: 全量近邻时每块相似度矩阵的字节数上限
+        """
+        table = MissionTable.from_missions(table, fields=TAG_FIELDS)
+        weights = weights or {}
+        self.dimensions = tuple(dimensions)
+        self.block_bytes = block_bytes
+
+        user_codes, self.users = table.user_index()
+        self.user_positions = {user: position for position, user in enumerate(self.users)}
+        records = VectorizedTagEngine(PersonaTagCalculator()).dimension_records(
+            table, TargetFeatures(table, target_info))
+        unknown = [dimension for dimension in self.dimensions if dimension not in records]
+        if unknown:
+            raise ValueError(f"未知的画像维度: {unknown}")
+
+        # 各维度只保留出现过的键，列区间依次排列
+        blocks = []
+        width = 0
+        for dimension in self.dimensions:
+            rows, keys, num_keys, _ = records[dimension]
+            groups = GroupCounts.count(user_codes[rows], keys, num_keys)
+            used, columns = np.unique(groups.keys, return_inverse=True)
+            blocks.append((dimension, groups, columns, width))
+            width += len(used)
+
+        self.vectors = np.zeros((len(self.users), width), dtype=np.float32)
+        for dimension, groups, columns, offset in blocks:
+            weight = float(weights.get(dimension, 1.0))
+            if weight < 0:
+                raise ValueError(f"维度权重不能为负数: {dimension}")
+            counts = groups.counts.astype(np.float64)
+            norms = np.sqrt(np.bincount(groups.users, weights=counts ** 2, minlength=len(self.users)))
+            self.vectors[groups.users, offset + columns] = counts / norms[groups.users] * np.sqrt(weight)
+
+        norms = np.linalg.norm(self.vectors, axis=1)
+        nonzero = norms > 0
+        self.vectors[nonzero] /= norms[nonzero, None]
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def neighbors(self, req_unit: str, req_group: str, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        单个用户的Top-K相似用户
+        :param req_unit: 部门
+        :param req_group: 区组
+        :param k: 返回数量
+        :return: [{'user_id': {'req_unit', 'req_group'}, 'similarity': 相似度}]，按相似度降序
+        """
+        position = self.user_positions.get((req_unit, req_group))
+        if position is None:
+            raise KeyError(f"用户不存在: {req_unit}_{req_group}")
+        similarities = self.vectors @ self.vectors[position]
+        indices, scores = self._top_k(similarities[None, :], np.array([position]), k)
+        return [
+            {'user_id': {'req_unit': self.users[index][0], 'req_group': self.users[index][1]},
+             'similarity': round(score, 6)}
+            for index, score in zip(indices[0].tolist(), scores[0].tolist())
+        ]
+
+    def all_neighbors(self, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        所有用户的Top-K相似用户（分块矩阵乘法）
+        :param k: 每个用户返回的数量
+        :return: (近邻用户下标, 相似度)，形状均为 用户数 × min(k, 用户数-1)，
+                 下标对应 self.users，每行按相似度降序
+        """
+        num_users = len(self.users)
+        k = min(k, max(num_users - 1, 0))
+        indices = np.empty((num_users, k), dtype=np.int64)
+        scores = np.empty((num_users, k), dtype=np.float32)
+        block_rows = max(1, self.block_bytes // max(num_users * self.vectors.itemsize, 1))
+        for start in range(0, num_users, block_rows):
+            stop = min(start + block_rows, num_users)
+            similarities = self.vectors[start:stop] @ self.vectors.T
+            indices[start:stop], scores[start:stop] = self._top_k(similarities, np.arange(start, stop), k)
+        return indices, scores
+
+    @staticmethod
+    def _top_k(similarities: np.ndarray, positions: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        每行取相似度最高的K个（排除自身），同分时下标小的在前
+        :param similarities: 相似度块（行对应 positions 中的用户）
+        :param positions: 每行对应的用户下标
+        :param k: 每行保留的数量
+        """
+        num_rows, num_users = similarities.shape
+        k = min(k, num_users - 1)
+        if k <= 0:
+            return np.empty((num_rows, 0), dtype=np.int64), np.empty((num_rows, 0), dtype=similarities.dtype)
+        similarities[np.arange(num_rows), positions] = -np.inf
+        if k < num_users:
+            candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(num_users), (num_rows, num_users))
+        candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+        order = np.lexsort((candidates, -candidate_scores), axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        return candidates, np.take_along_axis(candidate_scores, order, axis=1)
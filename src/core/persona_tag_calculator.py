@@ -1,6 +1,19 @@
 from typing import List, Dict, Any
 from collections import Counter
 import math
+import statistics
+
+import numpy as np
+
+from config.algorithm_config import (
+    TFIDF_CONFIG, BM25_CONFIG, ZSCORE_CONFIG, HHI_THRESHOLD, CV_THRESHOLD, ALGORITHM_AUTO_SELECTION
+)
+from src.models.mission_table import NAT_EPOCH, parse_time_column, time_parts
+from src.core.instrumentation import NULL_INSTRUMENTATION
+from src.core.target_index import target_group_names
+
+# 提报时间分布的维度与区间数
+REQUEST_TIME_BINS = (('hour_of_day', 24), ('weekday', 7), ('month', 12))
 
 
 class PersonaTagCalculator:
@@ -25,6 +38,8 @@ class PersonaTagCalculator:
         self.preference_algorithm = self.algorithm_config.get('preference_algorithm', 'auto')
         self.top_n = self.algorithm_config.get('top_n', 3)
         self.global_stats = self.algorithm_config.get('global_stats', {})
+        # 埋点（由 UserPersonaAlgorithm 按需替换）
+        self.instrumentation = NULL_INSTRUMENTATION
     
     def _calculate_concentration_index(self, counts: List[int]) -> Dict[str, Any]:
         """
@@ -45,8 +60,8 @@ class PersonaTagCalculator:
         proportions = [count / total for count in counts]
         hhi = sum(p ** 2 for p in proportions)
         
-        # 简化判断：只用0.05这个关键阈值
-        if hhi > 0.05:
+        # 简化判断：只用 HHI_THRESHOLD 这个关键阈值
+        if hhi > HHI_THRESHOLD:
             concentration_level = "集中"
             is_concentrated = True
         else:
@@ -62,11 +77,13 @@ class PersonaTagCalculator:
     
     def generate_persona_tags(self, 
                              missions: List[Any],
-                             target_info: List[Any]) -> Dict[str, Any]:
+                             target_info: List[Any],
+                             target_index: Any = None) -> Dict[str, Any]:
         """
         基于统计规则生成用户画像标签
         :param missions: 用户的历史任务列表
         :param target_info: 目标信息列表
+        :param target_index: 共享目标索引（可选，提供时直接复用，不再逐用户构建目标字典）
         :return: 画像标签字典
         """
         if not missions:
@@ -74,45 +91,112 @@ class PersonaTagCalculator:
         persona_tags = {}
         
         # 创建目标信息字典，便于查找
-        target_dict = {t.target_id: t for t in target_info}
+        if target_index is not None:
+            target_dict = target_index.target_dict
+        else:
+            target_dict = {t.target_id: t for t in target_info}
+        
+        stage = self.instrumentation.stage
         
         # 1. 提报需求频率标签
-        persona_tags['request_frequency'] = self._calculate_request_frequency(missions)
+        with stage('tag.request_frequency'):
+            persona_tags['request_frequency'] = self._calculate_request_frequency(missions)
         
         # 2. 侦察目标占比标签
-        persona_tags['target_proportion'] = self._calculate_target_proportion(missions)
+        with stage('tag.target_proportion'):
+            persona_tags['target_proportion'] = self._calculate_target_proportion(missions)
         
         # 3. 侦察区域占比标签
-        persona_tags['region_proportion'] = self._calculate_region_proportion(missions, target_dict)
+        with stage('tag.region_proportion'):
+            persona_tags['region_proportion'] = self._calculate_region_proportion(missions, target_dict)
         
         # 4. 偏爱目标类别标签
-        persona_tags['preferred_target_category'] = self._calculate_target_category(missions, target_dict)
+        with stage('tag.preferred_target_category'):
+            persona_tags['preferred_target_category'] = self._calculate_target_category(missions, target_dict)
         
         # 5. 偏爱目标专题与分组标签
-        persona_tags['preferred_topic_group'] = self._calculate_topic_group(missions, target_dict)
+        with stage('tag.preferred_topic_group'):
+            persona_tags['preferred_topic_group'] = self._calculate_topic_group(missions, target_dict)
         
         # 6. 偏爱侦察场景标签
-        persona_tags['preferred_scout_scenario'] = self._calculate_scout_scenario(missions)
+        with stage('tag.preferred_scout_scenario'):
+            persona_tags['preferred_scout_scenario'] = self._calculate_scout_scenario(missions)
         
         return persona_tags
     
     def _calculate_request_frequency(self, missions: List[Any]) -> Dict[str, Any]:
-        """计算提报需求频率标签"""
-        total_count = len(missions)
-        
-        # 统计时间分布（按时间段）
-        time_distribution = {}
-        # 这里可以根据req_start_time进行时间分组统计
-        # 简化版本：只统计总数
+        """计算提报需求频率标签 - 需求总数、提报时间分布与需求时长"""
+        return self._request_frequency_from_counts(len(missions), self._count_request_times(missions))
+    
+    def _count_request_times(self, missions: List[Any]) -> Dict[str, Any]:
+        """
+        统计提报时间（req_start_time）的小时、星期、月份分布与需求时长
+        缺失或无法解析的提报时间不计入分布，时长只统计开始、结束时间都有效的任务
+        :return: {'hour_of_day': 24个计数, 'weekday': 7个计数（周一在前）, 'month': 12个计数,
+                  'duration': (总秒数, 最短秒数, 最长秒数, 任务数)，没有有效时长时为None}
+        """
+        starts = parse_time_column([m.req_start_time for m in missions])
+        time_counts = {
+            name: np.bincount(part[part >= 0], minlength=size).tolist()
+            for (name, size), part in zip(REQUEST_TIME_BINS, time_parts(starts))
+        }
         
-        return {
-            'total_count': total_count
+        ends = parse_time_column([m.req_end_time for m in missions])
+        valid = (starts != NAT_EPOCH) & (ends != NAT_EPOCH)
+        durations = (ends - starts)[valid]
+        time_counts['duration'] = None
+        if len(durations):
+            time_counts['duration'] = (int(durations.sum()), int(durations.min()), int(durations.max()),
+                                       len(durations))
+        return time_counts
+    
+    @staticmethod
+    def _merge_request_times(time_counts: Dict[str, Any], other: Dict[str, Any]) -> Dict[str, Any]:
+        """合并两批任务的提报时间统计"""
+        merged = {
+            name: [a + b for a, b in zip(time_counts[name], other[name])]
+            for name, _ in REQUEST_TIME_BINS
+        }
+        merged['duration'] = time_counts['duration'] or other['duration']
+        if time_counts['duration'] is not None and other['duration'] is not None:
+            (total, shortest, longest, count), (other_total, other_shortest, other_longest, other_count) = (
+                time_counts['duration'], other['duration'])
+            merged['duration'] = (total + other_total, min(shortest, other_shortest), max(longest, other_longest),
+                                  count + other_count)
+        return merged
+    
+    def _request_frequency_from_counts(self, total_count: int, time_counts: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        根据提报时间统计生成需求频率标签
+        :param total_count: 用户任务总数
+        :param time_counts: _count_request_times 的结果
+        :return: 需求频率标签（时长单位为小时，均值按有效时长的任务数计算）
+        """
+        request_frequency = {
+            'total_count': total_count,
+            'time_distribution': {name: list(time_counts[name]) for name, _ in REQUEST_TIME_BINS}
         }
+        if time_counts['duration'] is not None:
+            total, shortest, longest, count = time_counts['duration']
+            request_frequency['duration_hours'] = {
+                'mean': round(total / count / 3600, 2),
+                'min': round(shortest / 3600, 2),
+                'max': round(longest / 3600, 2)
+            }
+        return request_frequency
     
     def _calculate_target_proportion(self, missions: List[Any]) -> Dict[str, Any]:
         """计算侦察目标占比标签 - 支持多种算法"""
         target_counts = Counter([m.target_id for m in missions])
-        total = len(missions)
+        return self._target_proportion_from_counts(target_counts, len(missions))
+    
+    def _target_proportion_from_counts(self, target_counts: Counter, total: int) -> Dict[str, Any]:
+        """
+        根据目标计数计算侦察目标占比标签
+        :param target_counts: 目标计数（按目标首次出现顺序）
+        :param total: 用户任务总数
+        :return: 目标占比标签
+        """
         counts = list(target_counts.values())
         
         # 计算集中度
@@ -123,37 +207,26 @@ class PersonaTagCalculator:
         
         # 自动选择算法
         if algorithm == 'auto':
-            if concentration['hhi'] > 0.05:
-                # 集中度较高 -> 百分比
-                algorithm = 'percentage'
-            else:
-                # HHI <= 0.05，分散数据，需要进一步区分
-                total_users = self.global_stats.get('total_users', 0) if self.global_stats else 0
-                unique_targets = len(target_counts)
-                
-                # 检查是否有全局统计（TF-IDF和BM25需要）
-                if total_users >= 10 and unique_targets >= 20:
-                    # 多用户多目标 -> TF-IDF（识别用户特有偏好）
-                    algorithm = 'tfidf'
-                elif total_users >= 5 and unique_targets >= 10:
-                    # 计算变异系数判断是否需要BM25
-                    import statistics
-                    mean_count = statistics.mean(counts) if counts else 0
-                    std_count = statistics.stdev(counts) if len(counts) > 1 else 0
-                    cv = (std_count / mean_count) if mean_count > 0 else 0
-                    
-                    if cv > 1.0:
-                        # 高变异系数（数据差异大）-> BM25（饱和控制）
-                        algorithm = 'bm25'
-                    else:
-                        # 中等变异 -> TF-IDF
-                        algorithm = 'tfidf'
-                elif unique_targets >= 5:
-                    # 目标数适中，无需全局统计 -> Z-score（统计检验）
-                    algorithm = 'zscore'
-                else:
-                    # 目标太少 -> 百分比
-                    algorithm = 'percentage'
+            algorithm = self._select_auto_algorithm(counts, concentration['hhi'])
+            self.instrumentation.choice('auto_algorithm', algorithm)
+        
+        return self._target_proportion_with(algorithm, target_counts, total, counts, concentration)
+    
+    def _target_proportion_with(self, algorithm: str, target_counts: Counter, total: int,
+                                counts: List[int] = None, concentration: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        使用指定算法计算侦察目标占比标签
+        :param algorithm: 算法名（percentage/tfidf/bm25/zscore，其他值按percentage处理）
+        :param target_counts: 目标计数（按目标首次出现顺序）
+        :param total: 用户任务总数
+        :param counts: 计数列表（可选，默认取 target_counts 的值）
+        :param concentration: 集中度（可选，默认重新计算）
+        :return: 目标占比标签
+        """
+        if counts is None:
+            counts = list(target_counts.values())
+        if concentration is None:
+            concentration = self._calculate_concentration_index(counts)
         
         # 执行对应算法
         if algorithm == 'percentage':
@@ -168,6 +241,40 @@ class PersonaTagCalculator:
             # 默认使用百分比
             return self._target_proportion_percentage(target_counts, total, concentration)
     
+    def _select_auto_algorithm(self, counts: List[int], hhi: float) -> str:
+        """
+        auto 模式下根据数据特征选择偏好算法
+        :param counts: 用户各目标的计数
+        :param hhi: HHI集中度（保留4位小数）
+        :return: 算法名
+        """
+        if hhi > HHI_THRESHOLD:
+            # 集中度较高 -> 百分比
+            return 'percentage'
+        
+        # HHI <= 阈值，分散数据，需要进一步区分
+        total_users = self.global_stats.get('total_users', 0) if self.global_stats else 0
+        unique_targets = len(counts)
+        tfidf_conditions = ALGORITHM_AUTO_SELECTION['tfidf_conditions']
+        bm25_conditions = ALGORITHM_AUTO_SELECTION['bm25_conditions']
+        
+        # 检查是否有全局统计（TF-IDF和BM25需要）
+        if total_users >= tfidf_conditions['min_users'] and unique_targets >= tfidf_conditions['min_targets']:
+            # 多用户多目标 -> TF-IDF（识别用户特有偏好）
+            return 'tfidf'
+        if total_users >= bm25_conditions['min_users'] and unique_targets >= bm25_conditions['min_targets']:
+            # 计算变异系数判断是否需要BM25
+            mean_count = statistics.mean(counts) if counts else 0
+            std_count = statistics.stdev(counts) if len(counts) > 1 else 0
+            cv = (std_count / mean_count) if mean_count > 0 else 0
+            # 高变异系数（数据差异大）-> BM25（饱和控制），否则 TF-IDF
+            return 'bm25' if cv > CV_THRESHOLD else 'tfidf'
+        if unique_targets >= ALGORITHM_AUTO_SELECTION['zscore_conditions']['min_targets']:
+            # 目标数适中，无需全局统计 -> Z-score（统计检验）
+            return 'zscore'
+        # 目标太少 -> 百分比
+        return ALGORITHM_AUTO_SELECTION['default_algorithm']
+    
     def _target_proportion_percentage(self, target_counts: Counter, total: int, 
                                      concentration: Dict[str, Any]) -> Dict[str, Any]:
         """算法1: 简单百分比Top-N"""
@@ -184,17 +291,16 @@ class PersonaTagCalculator:
     def _target_proportion_zscore(self, target_counts: Counter, total: int, 
                                   counts: List[int], concentration: Dict[str, Any]) -> Dict[str, Any]:
         """算法2: Z-score显著性过滤"""
-        import numpy as np
-        
         mean_count = np.mean(counts)
         std_count = np.std(counts)
         
-        # 找出显著高于平均的目标（Z-score > 1.0）
+        # 找出显著高于平均的目标（Z-score > 阈值）
+        threshold = ZSCORE_CONFIG['threshold']
         significant_targets = []
         for target_id, count in target_counts.items():
             z_score = (count - mean_count) / std_count if std_count > 0 else 0
             
-            if z_score > 1.0:  # 高于平均1个标准差
+            if z_score > threshold:  # 高于平均 threshold 个标准差
                 significant_targets.append({
                     'target_id': target_id,
                     'count': count,
@@ -220,8 +326,6 @@ class PersonaTagCalculator:
     def _target_proportion_tfidf(self, target_counts: Counter, total: int,
                                  concentration: Dict[str, Any]) -> Dict[str, Any]:
         """算法4: TF-IDF算法"""
-        import math
-        
         # 从全局统计获取IDF信息
         target_user_count = self.global_stats.get('target_user_count', {})
         total_users = self.global_stats.get('total_users', 1)
@@ -234,7 +338,8 @@ class PersonaTagCalculator:
             
             # IDF: log(总用户数 / 使用该目标的用户数)
             users_with_target = target_user_count.get(target_id, 1)
-            idf = math.log((total_users + 1) / (users_with_target + 1)) + 1
+            smoothing = TFIDF_CONFIG['smoothing']
+            idf = math.log((total_users + smoothing) / (users_with_target + smoothing)) + 1
             
             # TF-IDF得分
             tfidf_score = tf * idf
@@ -256,16 +361,14 @@ class PersonaTagCalculator:
     def _target_proportion_bm25(self, target_counts: Counter, total: int,
                                 concentration: Dict[str, Any]) -> Dict[str, Any]:
         """算法5: BM25算法"""
-        import math
-        
         # 从全局统计获取信息
         target_user_count = self.global_stats.get('target_user_count', {})
         total_users = self.global_stats.get('total_users', 1)
         avg_mission_count = self.global_stats.get('avg_mission_count', total)
         
         # BM25参数
-        k1 = 1.5  # 控制TF饱和度
-        b = 0.75  # 长度归一化参数
+        k1 = BM25_CONFIG['k1']  # 控制TF饱和度
+        b = BM25_CONFIG['b']  # 长度归一化参数
         
         # 计算BM25得分
         bm25_scores = []
@@ -294,6 +397,10 @@ class PersonaTagCalculator:
     
     def _calculate_region_proportion(self, missions: List[Any], target_dict: Dict[str, Any]) -> Dict[str, Any]:
         """计算侦察区域占比标签 - Top-N区域及占比"""
+        return self._region_proportion_from_counts(self._count_regions(missions, target_dict))
+    
+    def _count_regions(self, missions: List[Any], target_dict: Dict[str, Any]) -> Counter:
+        """统计区域类型计数"""
         region_counts = Counter()
         
         for mission in missions:
@@ -301,6 +408,10 @@ class PersonaTagCalculator:
             if target and hasattr(target, 'target_area_type'):
                 region_counts[target.target_area_type] += 1
         
+        return region_counts
+    
+    def _region_proportion_from_counts(self, region_counts: Counter) -> Dict[str, Any]:
+        """根据区域计数生成Top-N区域及占比"""
         total = sum(region_counts.values())
         if total == 0:
             return []
@@ -318,6 +429,10 @@ class PersonaTagCalculator:
     
     def _calculate_target_category(self, missions: List[Any], target_dict: Dict[str, Any]) -> Dict[str, Any]:
         """计算偏爱目标类别标签 - 统计target_type和target_category组合的Top-N及占比"""
+        return self._target_category_from_counts(self._count_target_categories(missions, target_dict))
+    
+    def _count_target_categories(self, missions: List[Any], target_dict: Dict[str, Any]) -> Counter:
+        """统计目标类型×种类组合计数"""
         category_counts = Counter()
         
         for mission in missions:
@@ -327,6 +442,10 @@ class PersonaTagCalculator:
                 combo = f"{target.target_type}_{target.target_category}"
                 category_counts[combo] += 1
         
+        return category_counts
+    
+    def _target_category_from_counts(self, category_counts: Counter) -> Dict[str, Any]:
+        """根据类别组合计数生成Top-N组合及占比"""
         total = sum(category_counts.values())
         if total == 0:
             return []
@@ -346,34 +465,36 @@ class PersonaTagCalculator:
     
     def _calculate_topic_group(self, missions: List[Any], target_dict: Dict[str, Any]) -> Dict[str, Any]:
         """计算偏爱目标专题与分组标签 - 统计topic_id和group_list组合的Top-N及占比"""
+        return self._topic_group_from_counts(self._count_topic_groups(missions, target_dict))
+    
+    def _count_topic_groups(self, missions: List[Any], target_dict: Dict[str, Any]) -> Counter:
+        """统计专题×分组组合计数，键为 (专题, 分组名)；没有分组的目标计入 NO_GROUP"""
         topic_group_counts = Counter()
+        # 每个目标的分组名只解析一次
+        group_names = {}
         
         for mission in missions:
-            topic_id = mission.topic_id
-            target = target_dict.get(mission.target_id)
-            
-            if target and hasattr(target, 'group_list') and target.group_list:
-                # 遍历目标的所有分组
-                for group in target.group_list:
-                    group_name = group.group_name if hasattr(group, 'group_name') else str(group)
-                    combo = f"{topic_id}_{group_name}"
-                    topic_group_counts[combo] += 1
-            else:
-                # 如果没有group_list，只统计topic_id
-                combo = f"{topic_id}_无分组"
-                topic_group_counts[combo] += 1
-        
+            target_id = mission.target_id
+            names = group_names.get(target_id)
+            if names is None:
+                names = group_names[target_id] = target_group_names(target_dict.get(target_id))
+            for group_name in names:
+                topic_group_counts[(mission.topic_id, group_name)] += 1
+        
+        return topic_group_counts
+    
+    def _topic_group_from_counts(self, topic_group_counts: Counter) -> Dict[str, Any]:
+        """根据专题×分组计数生成Top-N组合及占比"""
         total = sum(topic_group_counts.values())
         if total == 0:
             return []
         
         # 获取Top-N组合及占比
         top_combinations = []
-        for combo, count in topic_group_counts.most_common(self.top_n):
-            parts = combo.split('_', 1)
+        for (topic_id, group_name), count in topic_group_counts.most_common(self.top_n):
             top_combinations.append({
-                'topic_id': parts[0] if len(parts) > 0 else '',
-                'group_name': parts[1] if len(parts) > 1 else '',
+                'topic_id': topic_id,
+                'group_name': group_name,
                 'count': count,
                 'percentage': round(count / total * 100, 2)
             })
@@ -382,6 +503,10 @@ class PersonaTagCalculator:
     
     def _calculate_scout_scenario(self, missions: List[Any]) -> Dict[str, Any]:
         """计算偏爱侦察场景标签 - 统计task_type, scout_type, task_scene, is_precise组合的Top-N及占比"""
+        return self._scout_scenario_from_counts(self._count_scout_scenarios(missions), len(missions))
+    
+    def _count_scout_scenarios(self, missions: List[Any]) -> Counter:
+        """统计侦察场景组合计数"""
         scenario_counts = Counter()
         
         for mission in missions:
@@ -390,7 +515,10 @@ class PersonaTagCalculator:
             combo = f"{mission.task_type}_{mission.scout_type}_{mission.task_scene}_{is_precise_str}"
             scenario_counts[combo] += 1
         
-        total = len(missions)
+        return scenario_counts
+    
+    def _scout_scenario_from_counts(self, scenario_counts: Counter, total: int) -> Dict[str, Any]:
+        """根据侦察场景计数生成Top-N组合及占比"""
         if total == 0:
             return []
         
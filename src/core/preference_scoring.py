@@ -0,0 +1,399 @@
+"""
+目标偏好批量打分
+
+在用户×目标计数的 CSR 矩阵上一次为所有用户打分：
+- auto 模式先对所有用户向量化计算 HHI 与变异系数并选择算法，再按算法分桶批量打分
+- IDF 按目标编码预先算成向量（每个目标只算一次）
+- TF、BM25 饱和项、Z 值与得分在全部非零元上向量化计算
+- 每个用户的 Top-N 按行长度分桶后用 argpartition 选出，只对选中的 N 个元素排序
+- 排序键为 (保留小数后的得分, 首次出现顺序)，与 PersonaTagCalculator 逐用户计算的结果一致；
+  得分落在舍入或阈值边界附近（浮点误差可能改变结果）的少数用户交给逐用户计算
+"""
+
+from collections import Counter
+import math
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from config.algorithm_config import (
+    TFIDF_CONFIG, BM25_CONFIG, ZSCORE_CONFIG, HHI_THRESHOLD, CV_THRESHOLD, ALGORITHM_AUTO_SELECTION
+)
+
+# 得分保留的小数位数（与逐用户计算的 round(score, 4) 一致）
+SCORE_DECIMALS = 4
+# argpartition 分桶时每块的元素数上限
+_BLOCK_ELEMENTS = 1 << 22
+# 距舍入/阈值边界的相对距离小于该值时交给逐用户计算
+_BOUNDARY_TOLERANCE = 1e-9
+
+
+class UserTargetMatrix:
+    """用户×目标计数的 CSR 矩阵（每行额外记录各元素的首次出现位置）"""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray,
+                 first: np.ndarray, num_targets: int):
+        """
+        :param indptr: 行指针，长度为用户数+1
+        :param indices: 目标编码
+        :param data: 计数
+        :param first: 首次出现位置（决定同分时的先后顺序）
+        :param num_targets: 目标编码空间大小
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.first = first
+        self.num_targets = num_targets
+        self._first_rank = None
+
+    @classmethod
+    def from_group_counts(cls, groups: Any, num_users: int, num_targets: int) -> 'UserTargetMatrix':
+        """
+        由 (用户, 目标) 分组计数构建
+        :param groups: GroupCounts（用户编码为 0..num_users-1）
+        :param num_users: 用户数
+        :param num_targets: 目标编码空间大小
+        :return: CSR 矩阵
+        """
+        users = groups.users
+        if len(users) > 1 and np.any(users[1:] < users[:-1]):
+            order = np.argsort(users, kind='stable')
+        else:
+            order = slice(None)
+        users = users[order]
+        indptr = np.searchsorted(users, np.arange(num_users + 1))
+        return cls(indptr, groups.keys[order].astype(np.int64), groups.counts[order].astype(np.int64),
+                   groups.first[order], num_targets)
+
+    @property
+    def num_users(self) -> int:
+        return len(self.indptr) - 1
+
+    def row_of_entries(self) -> np.ndarray:
+        """每个非零元所在的行"""
+        return np.repeat(np.arange(self.num_users), np.diff(self.indptr))
+
+    def first_rank(self) -> np.ndarray:
+        """每个非零元在所在行内按首次出现顺序的名次"""
+        if self._first_rank is None:
+            rows = self.row_of_entries()
+            order = np.lexsort((self.first, rows))
+            self._first_rank = np.empty(len(rows), dtype=np.int64)
+            self._first_rank[order] = np.arange(len(rows)) - self.indptr[rows[order]]
+        return self._first_rank
+
+    def row_in_first_order(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        单行按首次出现顺序排列的目标与计数
+        :return: (目标编码, 计数)
+        """
+        start, stop = self.indptr[row], self.indptr[row + 1]
+        order = np.argsort(self.first[start:stop], kind='stable')
+        return self.indices[start:stop][order], self.data[start:stop][order]
+
+    def take_rows(self, rows: np.ndarray) -> 'UserTargetMatrix':
+        """
+        取部分行组成新矩阵
+        :param rows: 行下标
+        :return: 新矩阵，第 i 行为原矩阵的 rows[i] 行
+        """
+        lengths = np.diff(self.indptr)[rows]
+        indptr = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        entries = np.repeat(self.indptr[rows] - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return UserTargetMatrix(indptr, self.indices[entries], self.data[entries], self.first[entries],
+                                self.num_targets)
+
+
+def users_per_target(global_stats: Dict[str, Any], target_names: Sequence[str]) -> np.ndarray:
+    """
+    全局统计中每个目标的用户数，按目标编码排列（缺失的目标按1计，与逐用户计算一致）
+    :param global_stats: 全局统计
+    :param target_names: 目标编码 -> 目标ID
+    :return: 用户数向量
+    """
+    target_user_count = global_stats.get('target_user_count', {})
+    return np.array([target_user_count.get(name, 1) for name in target_names], dtype=np.int64)
+
+
+def tfidf_idf_vector(global_stats: Dict[str, Any], target_names: Sequence[str]) -> np.ndarray:
+    """TF-IDF 的 IDF 向量：log((N + s) / (n + s)) + 1，s 为 TFIDF_CONFIG['smoothing']"""
+    total_users = global_stats.get('total_users', 1)
+    smoothing = TFIDF_CONFIG['smoothing']
+    # 使用 math.log 逐目标计算，保证与逐用户计算逐位一致
+    return np.array([math.log((total_users + smoothing) / (users + smoothing)) + 1
+                     for users in users_per_target(global_stats, target_names).tolist()], dtype=np.float64)
+
+
+def bm25_idf_vector(global_stats: Dict[str, Any], target_names: Sequence[str]) -> np.ndarray:
+    """BM25 的 IDF 向量：log((N - n + 0.5) / (n + 0.5) + 1)"""
+    total_users = global_stats.get('total_users', 1)
+    return np.array([math.log((total_users - users + 0.5) / (users + 0.5) + 1)
+                     for users in users_per_target(global_stats, target_names).tolist()], dtype=np.float64)
+
+
+def top_n_per_row(indptr: np.ndarray, keys: np.ndarray, top_n: int) -> List[np.ndarray]:
+    """
+    每行键值最大的 N 个元素
+    :param indptr: 行指针
+    :param keys: 每个元素的排序键（行内互不相同，越大越靠前）
+    :param top_n: 每行保留的数量，None 表示全部
+    :return: 每行选中元素的下标（按键降序）
+    """
+    num_rows = len(indptr) - 1
+    lengths = np.diff(indptr)
+    if top_n is None:
+        top_n = int(lengths.max()) if num_rows else 0
+    selected = [np.empty(0, dtype=np.int64)] * num_rows
+    if top_n <= 0 or len(keys) == 0:
+        return selected
+
+    # 按行长度分桶（宽度取不小于行长度的2的幂），每桶拼成稠密块，填充值排在最后
+    widths = np.zeros(num_rows, dtype=np.int64)
+    nonempty = lengths > 0
+    widths[nonempty] = 1 << np.ceil(np.log2(lengths[nonempty])).astype(np.int64)
+    # 取反后仍不溢出
+    padding = np.iinfo(np.int64).min + 1
+    for width in np.unique(widths[nonempty]).tolist():
+        rows = np.flatnonzero(widths == width)
+        block_rows = max(1, _BLOCK_ELEMENTS // width)
+        for block_start in range(0, len(rows), block_rows):
+            block = rows[block_start:block_start + block_rows]
+            starts, row_lengths = indptr[block], lengths[block]
+            columns = np.arange(width)
+            valid = columns[None, :] < row_lengths[:, None]
+            positions = np.where(valid, starts[:, None] + columns[None, :], 0)
+            dense = np.where(valid, keys[positions], padding)
+
+            keep = min(top_n, width)
+            if keep < width:
+                candidates = np.argpartition(dense, width - keep, axis=1)[:, width - keep:]
+            else:
+                candidates = np.broadcast_to(columns, (len(block), width))
+            candidate_keys = np.take_along_axis(dense, candidates, axis=1)
+            order = np.argsort(-candidate_keys, axis=1, kind='stable')
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            counts = np.minimum(row_lengths, keep)
+            for row, start, count, picked in zip(block.tolist(), starts.tolist(), counts.tolist(), candidates):
+                selected[row] = start + picked[:count]
+    return selected
+
+
+def _near_half(values: np.ndarray, decimals: int) -> np.ndarray:
+    """保留 decimals 位小数时是否落在舍入边界附近（浮点误差可能改变舍入结果）"""
+    scaled = values * 10 ** decimals
+    return np.abs(scaled - np.floor(scaled) - 0.5) < _BOUNDARY_TOLERANCE * np.maximum(np.abs(scaled), 1)
+
+
+def _near(values: np.ndarray, threshold: float) -> np.ndarray:
+    """是否落在阈值附近（浮点误差可能改变比较结果）"""
+    return np.abs(values - threshold) < _BOUNDARY_TOLERANCE * max(abs(threshold), 1)
+
+
+def select_algorithms(matrix: UserTargetMatrix, total_users: int,
+                      fallback: Callable[[List[int]], str]) -> np.ndarray:
+    """
+    auto 模式下为所有用户一次选择偏好算法（规则与 PersonaTagCalculator._select_auto_algorithm 一致）
+    :param matrix: 用户×目标计数矩阵
+    :param total_users: 全局用户数
+    :param fallback: 逐用户选择函数（参数为按首次出现顺序排列的计数），
+                     用于 HHI/CV 落在舍入或阈值边界附近的用户
+    :return: 每个用户的算法名
+    """
+    rows = matrix.row_of_entries()
+    lengths = np.diff(matrix.indptr)
+    counts = matrix.data.astype(np.float64)
+    totals = np.bincount(rows, weights=counts, minlength=matrix.num_users)
+    sums_of_squares = np.bincount(rows, weights=counts ** 2, minlength=matrix.num_users)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hhi = sums_of_squares / totals ** 2
+        # 变异系数（样本标准差 / 均值），只有一个目标时为0
+        variance = np.maximum(sums_of_squares - totals ** 2 / lengths, 0) / np.maximum(lengths - 1, 1)
+        cv = np.sqrt(variance) / (totals / lengths)
+
+    tfidf_conditions = ALGORITHM_AUTO_SELECTION['tfidf_conditions']
+    bm25_conditions = ALGORITHM_AUTO_SELECTION['bm25_conditions']
+    concentrated = np.round(hhi, 4) > HHI_THRESHOLD
+    tfidf = ~concentrated & (total_users >= tfidf_conditions['min_users']) & (
+        lengths >= tfidf_conditions['min_targets'])
+    bm25 = ~concentrated & ~tfidf & (total_users >= bm25_conditions['min_users']) & (
+        lengths >= bm25_conditions['min_targets'])
+    zscore = ~concentrated & ~tfidf & ~bm25 & (
+        lengths >= ALGORITHM_AUTO_SELECTION['zscore_conditions']['min_targets'])
+    algorithms = np.select(
+        [concentrated, tfidf, bm25 & (cv > CV_THRESHOLD), bm25, zscore],
+        ['percentage', 'tfidf', 'bm25', 'tfidf', 'zscore'],
+        default=ALGORITHM_AUTO_SELECTION['default_algorithm']
+    ).astype(object)
+
+    uncertain = _near_half(hhi, 4) | (bm25 & _near(cv, CV_THRESHOLD))
+    for row in np.flatnonzero(uncertain).tolist():
+        algorithms[row] = fallback(matrix.row_in_first_order(row)[1].tolist())
+    return algorithms
+
+
+class PreferenceScorer:
+    """目标偏好批量打分（percentage / zscore / tfidf / bm25）"""
+
+    ALGORITHMS = ('percentage', 'zscore', 'tfidf', 'bm25')
+
+    def __init__(self, global_stats: Dict[str, Any], target_names: Sequence[str], top_n: int,
+                 fallback: Callable[[str, Counter, int], List[Dict[str, Any]]] = None):
+        """
+        :param global_stats: 全局统计（target_user_count、total_users、avg_mission_count）
+        :param target_names: 目标编码 -> 目标ID
+        :param top_n: 每个用户输出的目标数
+        :param fallback: 逐用户计算函数 (算法, 按首次出现顺序的目标计数, 任务总数) -> 标签，
+                         用于得分落在舍入或阈值边界附近的用户；未提供时使用向量化结果
+        """
+        self.global_stats = global_stats or {}
+        self.target_names = target_names
+        self.top_n = top_n
+        self.fallback = fallback
+        self._idf = {}
+
+    def idf(self, algorithm: str) -> np.ndarray:
+        """按算法缓存的 IDF 向量"""
+        if algorithm not in self._idf:
+            if algorithm == 'tfidf':
+                self._idf[algorithm] = tfidf_idf_vector(self.global_stats, self.target_names)
+            else:
+                self._idf[algorithm] = bm25_idf_vector(self.global_stats, self.target_names)
+        return self._idf[algorithm]
+
+    def score(self, algorithm: str, matrix: UserTargetMatrix, totals: np.ndarray) -> List[List[Dict[str, Any]]]:
+        """
+        为矩阵中的所有用户打分
+        :param algorithm: 'percentage'、'zscore'、'tfidf' 或 'bm25'
+        :param matrix: 用户×目标计数矩阵
+        :param totals: 每个用户的任务总数
+        :return: 每个用户的目标占比标签（字段与逐用户计算一致）
+        """
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"不支持批量打分的算法: {algorithm}")
+        totals = np.asarray(totals, dtype=np.int64)
+        rows = matrix.row_of_entries()
+        if algorithm == 'percentage':
+            results = self._percentage(matrix, rows, totals)
+            uncertain = np.zeros(matrix.num_users, dtype=bool)
+        elif algorithm == 'zscore':
+            results, uncertain = self._zscore(matrix, rows, totals)
+        else:
+            results, uncertain = self._weighted(algorithm, matrix, rows, totals)
+
+        if self.fallback is not None:
+            for row in np.flatnonzero(uncertain).tolist():
+                targets, counts = matrix.row_in_first_order(row)
+                target_counts = Counter(dict(zip(self.target_names[targets].tolist(), counts.tolist())))
+                results[row] = self.fallback(algorithm, target_counts, int(totals[row]))
+        return results
+
+    def _percentage(self, matrix: UserTargetMatrix, rows: np.ndarray, totals: np.ndarray,
+                    user_rows: np.ndarray = None) -> List[List[Dict[str, Any]]]:
+        """按计数取Top-N（同数时首次出现在前，与 Counter.most_common 一致）"""
+        keys = self._rank_keys(matrix, matrix.data)
+        selected = top_n_per_row(matrix.indptr, keys, self.top_n)
+        if user_rows is not None:
+            selected = [selected[row] for row in user_rows]
+            totals = totals[user_rows]
+        results = []
+        for picked, total in zip(selected, totals.tolist()):
+            results.append([
+                {'target_id': target, 'count': count, 'percentage': round(count / total * 100, 2)}
+                for target, count in zip(self.target_names[matrix.indices[picked]].tolist(),
+                                         matrix.data[picked].tolist())
+            ])
+        return results
+
+    def _zscore(self, matrix: UserTargetMatrix, rows: np.ndarray, totals: np.ndarray):
+        """Z-score 显著性过滤：显著目标按 Z 值降序取Top-N，没有显著目标时按计数取Top-N"""
+        threshold = ZSCORE_CONFIG['threshold']
+        lengths = np.diff(matrix.indptr)
+        counts = matrix.data
+        # 与 np.mean / np.std（总体标准差）一致
+        mean = np.bincount(rows, weights=counts, minlength=matrix.num_users) / np.maximum(lengths, 1)
+        deviation = counts - mean[rows]
+        std = np.sqrt(np.bincount(rows, weights=deviation ** 2, minlength=matrix.num_users) / np.maximum(lengths, 1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_scores = np.where(std[rows] > 0, deviation / std[rows], 0.0)
+        significant = z_scores > threshold
+
+        near = _near_half(z_scores, 2) | _near(z_scores, threshold)
+        uncertain = np.bincount(rows[near], minlength=matrix.num_users) > 0
+
+        # 不显著的目标排在所有显著目标之后，截取后再剔除
+        keys = self._rank_keys(matrix, np.where(significant, np.rint(z_scores * 100), -1).astype(np.int64))
+        selected = top_n_per_row(matrix.indptr, keys, self.top_n)
+        any_significant = np.bincount(rows[significant], minlength=matrix.num_users) > 0
+        fallback_rows = np.flatnonzero(~any_significant)
+        by_count = dict(zip(fallback_rows.tolist(), self._percentage(matrix, rows, totals, fallback_rows)))
+
+        results = []
+        for row, (picked, total) in enumerate(zip(selected, totals.tolist())):
+            if row in by_count:
+                results.append(by_count[row])
+                continue
+            picked = picked[significant[picked]]
+            results.append([
+                {'target_id': target, 'count': count, 'percentage': round(count / total * 100, 2),
+                 'z_score': round(z_score, 2)}
+                for target, count, z_score in zip(self.target_names[matrix.indices[picked]].tolist(),
+                                                  counts[picked].tolist(), z_scores[picked].tolist())
+            ])
+        return results, uncertain
+
+    def _weighted(self, algorithm: str, matrix: UserTargetMatrix, rows: np.ndarray, totals: np.ndarray):
+        """TF-IDF / BM25 打分后取Top-N"""
+        counts = matrix.data
+        idf = self.idf(algorithm)[matrix.indices]
+        row_totals = totals[rows]
+        tf = counts / row_totals
+
+        if algorithm == 'tfidf':
+            scores = tf * idf
+        else:
+            k1, b = BM25_CONFIG['k1'], BM25_CONFIG['b']
+            avg_mission_count = self.global_stats.get('avg_mission_count')
+            # 缺少平均任务数时以用户自身任务数代替（与逐用户计算一致）
+            average = row_totals if avg_mission_count is None else avg_mission_count
+            scores = idf * ((counts * (k1 + 1)) / (counts + k1 * (1 - b + b * (row_totals / average))))
+
+        keys = self._rank_keys(matrix, np.rint(scores * 10 ** SCORE_DECIMALS).astype(np.int64))
+        selected = top_n_per_row(matrix.indptr, keys, self.top_n)
+        uncertain = np.bincount(rows[_near_half(scores, SCORE_DECIMALS)], minlength=matrix.num_users) > 0
+
+        results = []
+        for picked in selected:
+            entries = []
+            for target, count, total, entry_tf, entry_idf, score in zip(
+                    self.target_names[matrix.indices[picked]].tolist(), counts[picked].tolist(),
+                    row_totals[picked].tolist(), tf[picked].tolist(), idf[picked].tolist(), scores[picked].tolist()):
+                if algorithm == 'tfidf':
+                    entries.append({
+                        'target_id': target,
+                        'count': count,
+                        'percentage': round(count / total * 100, 2),
+                        'tf': round(entry_tf, 4),
+                        'idf': round(entry_idf, 4),
+                        'tfidf_score': round(score, SCORE_DECIMALS)
+                    })
+                else:
+                    entries.append({
+                        'target_id': target,
+                        'count': count,
+                        'percentage': round(count / total * 100, 2),
+                        'bm25_score': round(score, SCORE_DECIMALS)
+                    })
+            results.append(entries)
+        return results, uncertain
+
+    @staticmethod
+    def _rank_keys(matrix: UserTargetMatrix, values: np.ndarray) -> np.ndarray:
+        """行内唯一的整数排序键：values 大者优先，相同时首次出现越早越大"""
+        if len(values) == 0:
+            return values.astype(np.int64)
+        width = int(np.diff(matrix.indptr).max())
+        values = values.astype(np.int64)
+        # 使负值（排在最后的项）同样保持相对顺序
+        offset = min(int(values.min()), 0)
+        return (values - offset) * width + (width - 1 - matrix.first_rank())
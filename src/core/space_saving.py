@@ -0,0 +1,158 @@
+"""
+Space-Saving 高频项草图
+
+固定容量的近似计数器，用于持续接入时键空间无界的标签计数（目标、专题×分组、侦察场景组合）：
+- 最多监视 capacity 个键，新键在已满时替换计数最小的键，并继承其计数作为误差
+- 每个监视键的估计计数 count 满足 count - error <= 真实计数 <= count
+- 未被监视的键真实计数不超过 max_error（已满时的最小计数），且 max_error <= total / capacity
+- 估计计数之和恒等于累加的总量，占比的分母与精确计数一致
+- 监视键按 (估计计数, 开始监视顺序) 维护在带位置索引的最小堆中，替换与累加都是 O(log capacity)
+"""
+
+from collections import Counter
+from typing import Any, Dict, Hashable, Iterator, List, Mapping, Tuple
+
+
+class SpaceSavingSketch:
+    """Space-Saving 高频项草图（支持带权累加）"""
+
+    def __init__(self, capacity: int):
+        """
+        :param capacity: 监视的键数上限
+        """
+        if capacity < 1:
+            raise ValueError("草图容量必须大于0")
+        self.capacity = capacity
+        self.total = 0
+        # 键 -> 估计计数，字典顺序为开始监视的顺序（并列时决定排序）
+        self._counts: Dict[Hashable, int] = {}
+        # 键 -> 开始监视时继承的计数（估计的最大高估量）
+        self._errors: Dict[Hashable, int] = {}
+        # 键 -> 开始监视的序号（计数并列时先替换最早监视的键）
+        self._since: Dict[Hashable, int] = {}
+        self._next_since = 0
+        # 按 (估计计数, 开始监视序号) 排列的最小堆，及键在堆中的位置
+        self._heap: List[Hashable] = []
+        self._positions: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._counts
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._counts)
+
+    def add(self, key: Hashable, weight: int = 1):
+        """
+        累加一个键
+        :param key: 键
+        :param weight: 权重（正整数）
+        """
+        self.total += weight
+        if key in self._counts:
+            self._counts[key] += weight
+            self._sift_down(self._positions[key])
+            return
+        if len(self._counts) < self.capacity:
+            self._counts[key] = weight
+            self._errors[key] = 0
+            self._since[key] = self._next_since
+            self._next_since += 1
+            self._positions[key] = len(self._heap)
+            self._heap.append(key)
+            self._sift_up(len(self._heap) - 1)
+            return
+        # 替换计数最小的键（堆顶，并列时为最早监视的），新键占据其堆位置后下沉
+        evicted = self._heap[0]
+        floor = self._counts.pop(evicted)
+        del self._errors[evicted], self._since[evicted], self._positions[evicted]
+        self._counts[key] = floor + weight
+        self._errors[key] = floor
+        self._since[key] = self._next_since
+        self._next_since += 1
+        self._heap[0] = key
+        self._positions[key] = 0
+        self._sift_down(0)
+
+    def update(self, counts: Mapping[Hashable, int]):
+        """按计数字典（如一批任务的 Counter）累加"""
+        for key, weight in counts.items():
+            if weight > 0:
+                self.add(key, weight)
+
+    def clear(self):
+        """清空草图"""
+        self.total = 0
+        self._counts.clear()
+        self._errors.clear()
+        self._since.clear()
+        self._heap.clear()
+        self._positions.clear()
+
+    def count(self, key: Hashable) -> int:
+        """估计计数（未监视的键返回0）"""
+        return self._counts.get(key, 0)
+
+    def error(self, key: Hashable) -> int:
+        """监视键的最大高估量；未监视的键返回其真实计数的上界"""
+        return self._errors[key] if key in self._errors else self.max_error
+
+    @property
+    def max_error(self) -> int:
+        """任一估计计数的最大高估量，也是未监视键真实计数的上界"""
+        if len(self._counts) < self.capacity:
+            return 0
+        return self._counts[self._heap[0]]
+
+    def most_common(self, n: int = None) -> List[Tuple[Hashable, int]]:
+        """按估计计数降序的键（并列时按开始监视顺序）"""
+        return self.to_counter().most_common(n)
+
+    def to_counter(self) -> Counter:
+        """估计计数（Counter，顺序为开始监视的顺序）"""
+        return Counter(self._counts)
+
+    def error_bounds(self) -> Dict[str, Any]:
+        """
+        误差界
+        :return: {'capacity', 'monitored', 'total', 'max_error'}，max_error 不超过 total / capacity
+        """
+        return {
+            'capacity': self.capacity,
+            'monitored': len(self._counts),
+            'total': self.total,
+            'max_error': self.max_error
+        }
+
+    def _less(self, a: Hashable, b: Hashable) -> bool:
+        count_a, count_b = self._counts[a], self._counts[b]
+        return count_a < count_b or (count_a == count_b and self._since[a] < self._since[b])
+
+    def _swap(self, i: int, j: int):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._positions[heap[i]] = i
+        self._positions[heap[j]] = j
+
+    def _sift_up(self, i: int):
+        while i > 0:
+            parent = (i - 1) // 2
+            if not self._less(self._heap[i], self._heap[parent]):
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i: int):
+        heap = self._heap
+        size = len(heap)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < size and self._less(heap[child], heap[smallest]):
+                    smallest = child
+            if smallest == i:
+                return
+            self._swap(i, smallest)
+            i = smallest
@@ -0,0 +1,79 @@
+"""
+共享目标索引与目标分组关联矩阵
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.models.target_info import TargetInfo
+
+
+class TargetIndex:
+    """目标ID到目标信息的共享索引，整个画像任务只构建一次"""
+
+    def __init__(self, targets: Iterable[TargetInfo]):
+        """
+        :param targets: 目标信息列表（目标ID重复时以最后一个为准）
+        """
+        self.target_dict: Dict[str, TargetInfo] = {target.target_id: target for target in targets}
+        self.targets: List[TargetInfo] = list(self.target_dict.values())
+        self.positions: Dict[str, int] = {target_id: position
+                                          for position, target_id in enumerate(self.target_dict)}
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    def __contains__(self, target_id: Any) -> bool:
+        return target_id in self.target_dict
+
+    def get(self, target_id: Any) -> Optional[TargetInfo]:
+        """按目标ID查找目标信息"""
+        return self.target_dict.get(target_id)
+
+    def position(self, target_id: Any) -> Optional[int]:
+        """目标在索引中的位置，不存在时返回None"""
+        return self.positions.get(target_id)
+
+
+# 目标没有分组（或不在目标库中）时使用的分组名
+NO_GROUP = '无分组'
+
+
+def target_group_names(target: Any) -> List[str]:
+    """目标的分组名列表，没有分组时为 [NO_GROUP]"""
+    if target is None or not getattr(target, 'group_list', None):
+        return [NO_GROUP]
+    return [group.group_name if hasattr(group, 'group_name') else str(group) for group in target.group_list]
+
+
+class TargetGroupIncidence:
+    """目标 -> 分组的稀疏关联矩阵（CSR），分组编码 0 固定为 NO_GROUP"""
+
+    def __init__(self, targets: Sequence[Optional[TargetInfo]]):
+        """
+        :param targets: 按目标编码排列的目标信息，None 表示目标不在目标库中
+        """
+        group_mapping = {NO_GROUP: 0}
+        degree = np.empty(len(targets), dtype=np.int64)
+        indices = []
+        for code, target in enumerate(targets):
+            names = target_group_names(target)
+            degree[code] = len(names)
+            indices.extend(group_mapping.setdefault(name, len(group_mapping)) for name in names)
+
+        self.group_names: List[str] = list(group_mapping)
+        self.degree = degree
+        self.indptr = np.concatenate(([0], np.cumsum(degree)))
+        self.indices = np.array(indices, dtype=np.int64)
+
+    def expand(self, target_codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        把每条记录按其目标的分组展开（不构建任何字符串）
+        :param target_codes: 每条记录的目标编码
+        :return: (展开后每项对应的记录下标, 分组编码)，同一记录的分组按 group_list 顺序相邻排列
+        """
+        degree = self.degree[target_codes]
+        records = np.repeat(np.arange(len(target_codes)), degree)
+        starts = np.repeat(self.indptr[target_codes] - (np.cumsum(degree) - degree), degree)
+        return records, self.indices[starts + np.arange(len(records))]
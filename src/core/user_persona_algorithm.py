@@ -1,22 +1,41 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Tuple, Union
 from datetime import datetime
 import logging
+import time
+
+import numpy as np
 
 from src.models.mission import Mission
+from src.models.mission_table import MissionTable, parse_time_bound, parse_time_column
 from src.models.target_info import TargetInfo
 from src.models.user_persona import UserPersona
 from src.core.persona_tag_calculator import PersonaTagCalculator
+from src.core.target_index import TargetIndex
+from src.core.vectorized_tag_engine import VectorizedTagEngine, TAG_FIELDS
+from src.core.parallel_persona import generate_persona_tags_parallel
+from src.core.global_stats_cache import GlobalStatsCache, get_global_stats_cache
+from src.core.windowed_persona import WindowedPersonaIndex, personas_from_tags
+from src.core.instrumentation import PersonaResult, resolve_instrumentation
+from src.core.out_of_core_persona import OutOfCorePersonaGenerator
 
 
 class UserPersonaAlgorithm:
     """用户画像算法主类"""
     
-    def __init__(self):
+    def __init__(self, stats_cache: GlobalStatsCache = None, use_stats_cache: bool = True):
+        """
+        :param stats_cache: 全局统计缓存（可选，默认使用按 PERFORMANCE_CONFIG 创建的进程内共享缓存）
+        :param use_stats_cache: 是否使用全局统计缓存，False 时每次调用都重新计算（忽略 stats_cache）
+        """
         self.logger = self._setup_logger()
+        if not use_stats_cache:
+            self.stats_cache = None
+        else:
+            self.stats_cache = stats_cache if stats_cache is not None else get_global_stats_cache()
     
     def generate_user_persona(self,
                             target_info: List[TargetInfo],
-                            mission: List[Mission],
+                            mission: Union[List[Mission], MissionTable],
                             start_time: str = None,
                             end_time: str = None,
                             algorithm: Dict[str, Any] = None,
@@ -24,7 +43,7 @@ class UserPersonaAlgorithm:
         """
         生成用户画像
         :param target_info: 目标信息数据列表
-        :param mission: 历史需求数据列表
+        :param mission: 历史需求数据列表（List[Mission] 或列式 MissionTable）
         :param start_time: 开始时间（可选，格式：YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS）
         :param end_time: 结束时间（可选，格式：YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS）
         :param algorithm: 算法配置参数（可选）
@@ -43,11 +62,59 @@ class UserPersonaAlgorithm:
                 - 'zscore': Z-score显著性过滤（单用户统计检验）
             - top_n: 输出前N个结果，默认3
         :param params: 扩充参数
-        :return: 用户画像结果列表
+            - engine: 标签计算引擎
+                - 'vectorized': 列式向量化引擎，一次计算所有用户 [默认]
+                - 'python': 逐用户调用 PersonaTagCalculator.generate_persona_tags
+            - workers: 并行进程数（仅向量化引擎），默认1即串行；>1时按用户分片多进程计算，结果与串行一致
+            - user_keys: 只生成指定用户的画像，[(部门, 区组)] 或 [{'req_unit', 'req_group'}]；
+              结果与全量生成后按用户筛选一致。输入为 MissionTable 时按表上缓存的用户行索引取行，
+              只读取这些用户的需求，TF-IDF/BM25/auto 所需的全局统计命中缓存时不再扫描全表
+            - memory_budget: 内存预算（字节），设置后按用户哈希分区写入磁盘、逐分区计算，
+              结果与内存中计算一致；mission 还可以是只扫描一次的数据表批次流（如 iter_mission_batches）
+            - spill_dir: 分区文件目录（仅 memory_budget），默认系统临时目录
+            - num_partitions: 初始分区数（仅 memory_budget），默认按输入规模与预算估算
+            - instrumentation: 埋点，默认关闭（无额外开销）
+                - True: 记录各阶段用时与计数器
+                - {'profile': True, 'trace_memory': True}: 额外开启 cProfile / tracemalloc
+                - 自定义埋点对象（实现 stage/count/choice/start/stop/report）
+        :return: 用户画像结果列表；开启埋点时为 PersonaResult，其 report 属性为结构化报告
         """
-        
-        if params is None:
-            params = {}
+        params = params or {}
+        instrumentation = resolve_instrumentation(params.get('instrumentation'))
+        user_personas = list(self._iter_personas(target_info, mission, start_time, end_time,
+                                                 algorithm, params, instrumentation))
+        if instrumentation.enabled:
+            return PersonaResult(user_personas, instrumentation.report())
+        return user_personas
+    
+    def iter_user_persona(self,
+                          target_info: List[TargetInfo],
+                          mission: Union[List[Mission], MissionTable],
+                          start_time: str = None,
+                          end_time: str = None,
+                          algorithm: Dict[str, Any] = None,
+                          params: Dict[str, Any] = None) -> Iterator[UserPersona]:
+        """
+        逐个产出用户画像（参数与 generate_user_persona 相同），可配合 PersonaWriter 边生成边写出：
+        python 引擎逐用户产出；向量化引擎按用户分块（每块不超过 STREAM_BLOCK_ROWS 行需求）计算，
+        每块算完即产出，workers>1 时所有分片完成后才开始产出；
+        需要埋点报告时传入自定义埋点对象，迭代结束后读取其 report()
+        :return: 用户画像迭代器，顺序与 generate_user_persona 一致
+        """
+        params = params or {}
+        instrumentation = resolve_instrumentation(params.get('instrumentation'))
+        yield from self._iter_personas(target_info, mission, start_time, end_time,
+                                       algorithm, params, instrumentation)
+    
+    def _iter_personas(self,
+                       target_info: List[TargetInfo],
+                       mission: Union[List[Mission], MissionTable],
+                       start_time: str,
+                       end_time: str,
+                       algorithm: Dict[str, Any],
+                       params: Dict[str, Any],
+                       instrumentation) -> Iterator[UserPersona]:
+        """画像生成流水线（生成器），埋点在迭代结束或中止时停止"""
         if algorithm is None:
             algorithm = {}
         
@@ -55,64 +122,259 @@ class UserPersonaAlgorithm:
         
         # 解析算法配置
         preference_algo = algorithm.get('preference_algorithm', 'auto')
+        engine = params.get('engine', 'vectorized')
         self.logger.info(f"偏好计算算法: {preference_algo}")
         
         if start_time or end_time:
             self.logger.info(f"时间范围: {start_time or '不限'} 至 {end_time or '不限'}")
+        if params.get('memory_budget'):
+            yield from self._iter_personas_out_of_core(target_info, mission, start_time, end_time,
+                                                       algorithm, params, instrumentation)
+            return
         self.logger.info(f"输入数据: {len(target_info)} 个目标, {len(mission)} 条历史需求")
         
+        stage = instrumentation.stage
+        instrumentation.start()
+        
         try:
             # 1. 数据预处理和验证
-            self._validate_input_data(target_info, mission)
+            with stage('validate'):
+                self._validate_input_data(target_info, mission)
+            
+            # 向量化引擎只需要计算标签的字段
+            if engine == 'vectorized':
+                with stage('columnar'):
+                    mission = MissionTable.from_missions(mission, fields=TAG_FIELDS)
+            
+            # 全局统计缓存键基于过滤前的数据集与时间范围
+            stats_key = None
+            if self.stats_cache is not None and preference_algo in ['auto', 'tfidf', 'bm25']:
+                with stage('global_stats_key'):
+                    stats_key = self.stats_cache.make_key(mission, start_time, end_time)
+            
+            # 只生成指定用户时，全局统计仍基于全部用户
+            all_mission = mission
+            user_keys = params.get('user_keys')
+            if user_keys is not None:
+                with stage('user_rows'):
+                    mission = self._select_users(mission, user_keys)
+                self.logger.info(f"指定 {len(user_keys)} 个用户, 相关需求 {len(mission)} 条")
+            instrumentation.count('missions_scanned', len(mission))
+            instrumentation.count('targets', len(target_info))
             
             # 2. 根据时间范围过滤任务
-            filtered_mission = self._filter_missions_by_time(mission, start_time, end_time)
+            with stage('time_filter'):
+                filtered_mission = self._filter_missions_by_time(mission, start_time, end_time)
             if len(filtered_mission) < len(mission):
                 self.logger.info(f"时间过滤后保留 {len(filtered_mission)} 条需求")
             mission = filtered_mission
+            instrumentation.count('missions_in_window', len(mission))
             
             # 3. 计算全局统计（用于TF-IDF/BM25算法）
             if preference_algo in ['auto', 'tfidf', 'bm25']:
-                global_stats = self._calculate_global_stats(mission)
+                with stage('global_stats'):
+                    global_stats = self.stats_cache.get(stats_key) if stats_key is not None else None
+                    if global_stats is not None:
+                        instrumentation.count('global_stats_cache_hits')
+                        self.logger.info("全局统计命中缓存")
+                    else:
+                        stats_mission = mission
+                        if user_keys is not None:
+                            stats_mission = self._filter_missions_by_time(all_mission, start_time, end_time)
+                        global_stats = self._calculate_global_stats(stats_mission)
+                        if stats_key is not None:
+                            self.stats_cache.put(stats_key, global_stats)
                 algorithm['global_stats'] = global_stats
                 self.logger.info(f"全局统计: {global_stats['total_users']}个用户, "
                                f"平均每用户{global_stats['avg_mission_count']:.1f}条任务")
             
             # 4. 创建标签计算器（传入算法配置）
             tag_calculator = PersonaTagCalculator(algorithm_config=algorithm)
+            tag_calculator.instrumentation = instrumentation
             
             # 5. 按用户分组处理
-            user_personas = []
-            user_groups = self._group_missions_by_user(mission, target_info)
-            
-            for user_key, (user_id, user_missions, related_targets) in user_groups.items():
-                self.logger.info(f"处理用户 {user_key}, 相关需求数量: {len(user_missions)}")
-                
-                # 6. 使用统计规则生成画像标签
-                persona_tags = tag_calculator.generate_persona_tags(
-                    user_missions, related_targets
+            if engine == 'vectorized':
+                user_personas = self._iter_personas_vectorized(
+                    tag_calculator, target_info, mission, params.get('workers', 1)
                 )
-                
-                self.logger.info(f"用户 {user_key} 画像标签生成完成")
-                
-                # 6. 生成用户画像对象
+            else:
+                user_personas = self._iter_personas_per_user(tag_calculator, target_info, mission)
+            
+            num_personas = 0
+            for user_persona in user_personas:
+                num_personas += 1
+                yield user_persona
+            instrumentation.count('users', num_personas)
+            
+            self.logger.info(f"用户画像生成完成, 共生成 {num_personas} 个画像")
+            
+        except Exception as e:
+            self.logger.error(f"用户画像生成失败: {str(e)}")
+            raise
+        finally:
+            instrumentation.stop()
+    
+    def _iter_personas_out_of_core(self,
+                                   target_info: List[TargetInfo],
+                                   mission: Union[List[Mission], MissionTable, Iterable[MissionTable]],
+                                   start_time: str,
+                                   end_time: str,
+                                   algorithm: Dict[str, Any],
+                                   params: Dict[str, Any],
+                                   instrumentation) -> Iterator[UserPersona]:
+        """超出内存的画像生成：按用户哈希分区落盘后逐分区计算（不使用全局统计缓存）"""
+        if not target_info:
+            raise ValueError("目标信息数据列表不能为空")
+        if hasattr(mission, '__len__') and not len(mission):
+            raise ValueError("历史需求数据列表不能为空")
+        generator = OutOfCorePersonaGenerator(memory_budget=params['memory_budget'],
+                                              spill_dir=params.get('spill_dir'),
+                                              num_partitions=params.get('num_partitions'))
+        generator.instrumentation = instrumentation
+        self.logger.info(f"分区计算: 内存预算 {params['memory_budget']} 字节")
+        
+        instrumentation.start()
+        try:
+            num_personas = 0
+            for user_persona in generator.iter_user_persona(target_info, mission, start_time, end_time,
+                                                            algorithm):
+                num_personas += 1
+                yield user_persona
+            instrumentation.count('users', num_personas)
+            
+            self.logger.info(f"用户画像生成完成, 共生成 {num_personas} 个画像")
+        except Exception as e:
+            self.logger.error(f"用户画像生成失败: {str(e)}")
+            raise
+        finally:
+            instrumentation.stop()
+    
+    def generate_user_persona_windows(self,
+                                      target_info: List[TargetInfo],
+                                      mission: Union[List[Mission], MissionTable],
+                                      windows: List[Tuple[str, str]],
+                                      algorithm: Dict[str, Any] = None) -> List[List[UserPersona]]:
+        """
+        批量生成多个时间窗口的用户画像（一次扫描，按日前缀和回答所有窗口）
+        :param target_info: 目标信息数据列表
+        :param mission: 历史需求数据列表（List[Mission] 或列式 MissionTable）
+        :param windows: 时间窗口列表 [(开始时间, 结束时间)]，边界格式同 generate_user_persona，可为None
+        :param algorithm: 算法配置参数（同 generate_user_persona）
+        :return: 与 windows 一一对应的用户画像列表，每个窗口的结果与单独调用 generate_user_persona 一致
+        """
+        self.logger.info(f"开始批量生成用户画像: {len(windows)} 个时间窗口")
+        self._validate_input_data(target_info, mission)
+        
+        start = time.perf_counter()
+        table = MissionTable.from_missions(mission, fields=TAG_FIELDS)
+        index = WindowedPersonaIndex(table, target_info)
+        self.logger.info(f"构建按日计数索引: {len(table)} 条需求, 用时 {time.perf_counter() - start:.3f} 秒")
+        
+        results = []
+        for start_time, end_time in windows:
+            user_personas = personas_from_tags(index.query(start_time, end_time, algorithm))
+            self.logger.info(f"时间窗口 {start_time or '不限'} 至 {end_time or '不限'}: {len(user_personas)} 个画像")
+            results.append(user_personas)
+        return results
+    
+    def _iter_personas_per_user(self,
+                                tag_calculator: PersonaTagCalculator,
+                                target_info: List[TargetInfo],
+                                mission: Union[List[Mission], MissionTable]) -> Iterator[UserPersona]:
+        """逐用户生成画像"""
+        stage = tag_calculator.instrumentation.stage
+        # 逐用户日志本身有可观的开销，只在DEBUG级别输出
+        log_users = self.logger.isEnabledFor(logging.DEBUG)
+        with stage('grouping'):
+            target_index = TargetIndex(target_info)
+            user_groups = self._group_missions_by_user(mission, target_info, target_index)
+        
+        for user_key, (user_id, user_missions, related_targets) in user_groups.items():
+            if log_users:
+                self.logger.debug(f"处理用户 {user_key}, 相关需求数量: {len(user_missions)}")
+            
+            # 列式数据按用户还原为对象，只在处理该用户期间驻留内存
+            if isinstance(user_missions, MissionTable):
+                with stage('grouping'):
+                    user_missions = user_missions.to_missions()
+            
+            # 6. 使用统计规则生成画像标签
+            persona_tags = tag_calculator.generate_persona_tags(
+                user_missions, related_targets, target_index
+            )
+            
+            # 7. 生成用户画像对象
+            with stage('serialization'):
                 user_persona = UserPersona(
                     user_id=user_id,
                     persona_tags=persona_tags,
                     generation_time=datetime.now().isoformat()
                 )
-                
-                user_personas.append(user_persona)
-                self.logger.info(f"用户 {user_key} 画像生成完成")
-            
-            self.logger.info(f"用户画像生成完成, 共生成 {len(user_personas)} 个画像")
-            return user_personas
             
-        except Exception as e:
-            self.logger.error(f"用户画像生成失败: {str(e)}")
-            raise
+            if log_users:
+                self.logger.debug(f"用户 {user_key} 画像生成完成")
+            yield user_persona
     
-    def _validate_input_data(self, target_info: List[TargetInfo], mission: List[Mission]):
+    def _iter_personas_vectorized(self,
+                                  tag_calculator: PersonaTagCalculator,
+                                  target_info: List[TargetInfo],
+                                  mission: MissionTable,
+                                  workers: int = 1) -> Iterator[UserPersona]:
+        """
+        使用向量化引擎计算画像标签并逐个产出画像：串行时按用户分块计算，每块算完即产出；
+        多进程时所有分片完成后再产出
+        """
+        stage = tag_calculator.instrumentation.stage
+        log_users = self.logger.isEnabledFor(logging.DEBUG)
+        
+        with stage('grouping'):
+            mission.user_index()
+        
+        if workers > 1:
+            start = time.perf_counter()
+            with stage('tag.parallel'):
+                all_persona_tags = generate_persona_tags_parallel(
+                    mission, target_info, tag_calculator.algorithm_config, workers,
+                    tag_calculator.instrumentation
+                )
+            self.logger.info(f"并行生成画像标签: {workers} 个进程, 用时 {time.perf_counter() - start:.3f} 秒")
+        else:
+            all_persona_tags = VectorizedTagEngine(tag_calculator).iter_persona_tags(mission, target_info)
+        
+        for user_id, persona_tags in all_persona_tags:
+            with stage('serialization'):
+                user_persona = UserPersona(
+                    user_id=user_id,
+                    persona_tags=persona_tags,
+                    generation_time=datetime.now().isoformat()
+                )
+            if log_users:
+                self.logger.debug(f"用户 {user_id['req_unit']}_{user_id['req_group']} 画像生成完成, "
+                                  f"相关需求数量: {persona_tags['request_frequency']['total_count']}")
+            yield user_persona
+    
+    def _select_users(self,
+                      missions: Union[List[Mission], MissionTable],
+                      user_keys: List[Any]) -> Union[List[Mission], MissionTable]:
+        """
+        选取指定用户的需求
+        :param missions: 任务列表或列式数据表
+        :param user_keys: [(部门, 区组)] 或 [{'req_unit', 'req_group'}]
+        :return: 这些用户的需求，保持原有顺序；列式数据通过缓存的用户行索引取行
+        """
+        users = set()
+        for user_key in user_keys:
+            if isinstance(user_key, dict):
+                user_key = (user_key.get('req_unit'), user_key.get('req_group'))
+            if not isinstance(user_key, (tuple, list)) or len(user_key) != 2:
+                raise ValueError(f"无效的用户标识: {user_key!r}，应为 (部门, 区组) 或 {{'req_unit', 'req_group'}}")
+            users.add(tuple(user_key))
+        
+        if isinstance(missions, MissionTable):
+            return missions.take(missions.rows_for_users(users))
+        return [mission for mission in missions if (mission.req_unit, mission.req_group) in users]
+    
+    def _validate_input_data(self, target_info: List[TargetInfo], mission: Union[List[Mission], MissionTable]):
         """验证输入数据"""
         if not target_info:
             raise ValueError("目标信息数据列表不能为空")
@@ -120,7 +382,7 @@ class UserPersonaAlgorithm:
         if not mission:
             raise ValueError("历史需求数据列表不能为空")
     
-    def _calculate_global_stats(self, missions: List[Mission]) -> Dict[str, Any]:
+    def _calculate_global_stats(self, missions: Union[List[Mission], MissionTable]) -> Dict[str, Any]:
         """
         计算全局统计信息，用于TF-IDF和BM25算法
         :param missions: 所有用户的任务列表
@@ -128,6 +390,9 @@ class UserPersonaAlgorithm:
         """
         from collections import Counter, defaultdict
         
+        if isinstance(missions, MissionTable):
+            return self._calculate_global_stats_columnar(missions)
+        
         # 统计每个目标被多少个用户使用
         target_user_count = defaultdict(set)
         user_mission_count = defaultdict(int)
@@ -153,10 +418,48 @@ class UserPersonaAlgorithm:
             'avg_mission_count': avg_mission_count         # 平均每用户任务数
         }
     
-    def _group_missions_by_user(self, missions: List[Mission], targets: List[TargetInfo]) -> Dict[str, tuple]:
-        """按用户分组需求数据"""
-        target_dict = {target.target_id: target for target in targets}
+    def _calculate_global_stats_columnar(self, table: MissionTable) -> Dict[str, Any]:
+        """
+        基于列式数据计算全局统计信息（结果与对象列表版本一致）
+        :param table: 列式任务数据表
+        :return: 全局统计字典
+        """
+        user_codes, users = table.user_index()
+        target_codes = table.codes('target_id').astype(np.int64)
+        target_names = table.categories['target_id']
+        
+        # 去重后的 (用户, 目标) 对，再按目标计数即为使用该目标的用户数
+        pairs = np.unique(user_codes * len(target_names) + target_codes)
+        users_per_target = np.bincount(pairs % len(target_names), minlength=len(target_names))
+        used = np.flatnonzero(users_per_target)
+        
+        total_users = len(users)
+        return {
+            'target_user_count': dict(zip(target_names[used].tolist(), users_per_target[used].tolist())),
+            'total_users': total_users,
+            'avg_mission_count': len(table) / total_users if total_users > 0 else 0
+        }
+    
+    def _group_missions_by_user(self,
+                                missions: Union[List[Mission], MissionTable],
+                                targets: List[TargetInfo],
+                                target_index: TargetIndex = None) -> Dict[str, tuple]:
+        """
+        按用户分组需求数据
+        :param missions: 任务列表
+        :param targets: 目标信息列表
+        :param target_index: 共享目标索引（可选，未提供时按targets构建）
+        :return: {用户键: (用户身份信息, 用户任务列表, 相关目标列表)}
+        """
+        if target_index is None:
+            target_index = TargetIndex(targets)
+        
+        if isinstance(missions, MissionTable):
+            return self._group_table_by_user(missions, target_index)
+        
         grouped_missions = {}
+        # 每个用户已收录的目标位置集合，去重为O(1)
+        seen_targets = {}
         
         for mission in missions:
             # 用户标识：部门+区组
@@ -169,46 +472,83 @@ class UserPersonaAlgorithm:
                     'req_group': mission.req_group
                 }
                 grouped_missions[user_key] = (user_id_dict, [], [])
+                seen_targets[user_key] = set()
             
             # 添加任务到用户组
             grouped_missions[user_key][1].append(mission)
             
             # 添加相关目标到用户组（去重）
-            if mission.target_id in target_dict:
-                target = target_dict[mission.target_id]
-                if target not in grouped_missions[user_key][2]:
-                    grouped_missions[user_key][2].append(target)
+            position = target_index.position(mission.target_id)
+            if position is not None and position not in seen_targets[user_key]:
+                seen_targets[user_key].add(position)
+                grouped_missions[user_key][2].append(target_index.targets[position])
+        
+        return grouped_missions
+    
+    def _group_table_by_user(self, table: MissionTable, target_index: TargetIndex) -> Dict[str, tuple]:
+        """
+        按用户分组列式数据，每个用户得到共享字典的子表
+        :param table: 列式任务数据表
+        :param target_index: 共享目标索引
+        :return: 与对象列表版本结构相同的分组字典，用户按首次出现顺序排列
+        """
+        _, users = table.user_index()
+        target_names = table.categories['target_id']
+        
+        # 每个用户的行号保持原有顺序
+        order, bounds, _ = table.user_row_index()
+        
+        grouped_missions = {}
+        for user, (req_unit, req_group) in enumerate(users):
+            rows = order[bounds[user]:bounds[user + 1]]
+            user_missions = table.take(rows)
+            
+            # 相关目标按首次出现顺序去重
+            codes, first_index = np.unique(user_missions.codes('target_id'), return_index=True)
+            related_targets = [
+                target_index.get(target_id)
+                for target_id in target_names[codes[np.argsort(first_index)]].tolist()
+                if target_id in target_index
+            ]
+            
+            user_key = f"{req_unit}_{req_group}"
+            grouped_missions[user_key] = (
+                {'req_unit': req_unit, 'req_group': req_group},
+                user_missions,
+                related_targets
+            )
         
         return grouped_missions
     
     def _filter_missions_by_time(self, 
-                                  missions: List[Mission], 
+                                  missions: Union[List[Mission], MissionTable], 
                                   start_time: str = None, 
-                                  end_time: str = None) -> List[Mission]:
+                                  end_time: str = None) -> Union[List[Mission], MissionTable]:
         """
         根据时间范围过滤任务
         :param missions: 任务列表
         :param start_time: 开始时间（格式：YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS）
-        :param end_time: 结束时间（格式：YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS）
+        :param end_time: 结束时间（格式：YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS，只给日期时包含当天）
         :return: 过滤后的任务列表
         """
         if not start_time and not end_time:
             return missions
         
-        filtered_missions = []
-        for mission in missions:
-            # 获取任务的开始时间
-            mission_time = mission.req_start_time
-            
-            # 检查时间范围
-            if start_time and mission_time < start_time:
-                continue
-            if end_time and mission_time > end_time:
-                continue
-                
-            filtered_missions.append(mission)
+        start_epoch = parse_time_bound(start_time) if start_time else None
+        end_epoch = parse_time_bound(end_time, end=True) if end_time else None
         
-        return filtered_missions
+        if isinstance(missions, MissionTable):
+            # 有序时间索引只在首次查询时构建，之后每次过滤为两次二分查找
+            return missions.take(missions.rows_in_time_range(start_epoch, end_epoch))
+        
+        # 任务列表每次解析一次时间列后按掩码过滤；重复查询同一批任务时传入 MissionTable，有序索引缓存在表上
+        epochs = parse_time_column([m.req_start_time for m in missions])
+        keep = np.ones(len(epochs), dtype=np.bool_)
+        if start_epoch is not None:
+            keep &= epochs >= start_epoch
+        if end_epoch is not None:
+            keep &= epochs <= end_epoch
+        return [missions[row] for row in np.flatnonzero(keep).tolist()]
     
     def _setup_logger(self) -> logging.Logger:
         """设置日志记录器"""
@@ -227,7 +567,7 @@ class UserPersonaAlgorithm:
 
 
 def user_persona_algorithm_api(target_info: List[TargetInfo],
-                              mission: List[Mission],
+                              mission: Union[List[Mission], MissionTable],
                               start_time: str = None,
                               end_time: str = None,
                               algorithm: Dict[str, Any] = None,
@@ -236,7 +576,7 @@ def user_persona_algorithm_api(target_info: List[TargetInfo],
     用户画像算法API入口函数
     
     :param target_info: 目标信息数据列表
-    :param mission: 历史需求数据列表
+    :param mission: 历史需求数据列表（List[Mission] 或列式 MissionTable）
     :param start_time: 开始时间（可选，格式：YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS）
     :param end_time: 结束时间（可选，格式：YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS）
     :param algorithm: 算法配置参数（可选，保留用于兼容性）
@@ -249,3 +589,20 @@ def user_persona_algorithm_api(target_info: List[TargetInfo],
     return persona_algorithm.generate_user_persona(
         target_info, mission, start_time, end_time, algorithm, params
     )
+
+
+def user_persona_windows_api(target_info: List[TargetInfo],
+                             mission: Union[List[Mission], MissionTable],
+                             windows: List[Tuple[str, str]],
+                             algorithm: Dict[str, Any] = None) -> List[List[UserPersona]]:
+    """
+    多时间窗口用户画像API入口函数
+    
+    :param target_info: 目标信息数据列表
+    :param mission: 历史需求数据列表（List[Mission] 或列式 MissionTable）
+    :param windows: 时间窗口列表 [(开始时间, 结束时间)]
+    :param algorithm: 算法配置参数（可选）
+    :return: 与 windows 一一对应的用户画像列表
+    """
+    persona_algorithm = UserPersonaAlgorithm()
+    return persona_algorithm.generate_user_persona_windows(target_info, mission, windows, algorithm)
@@ -0,0 +1,485 @@
+"""
+向量化画像标签引擎
+
+一次性计算所有用户的全部画像标签：
+- 任务字段使用 MissionTable 的整数编码
+- 目标属性（区域类型、类型×种类）预先展开为按目标编码索引的特征数组，
+  目标 -> 分组为稀疏关联矩阵（CSR），专题×分组按关联矩阵展开后计数，不构建组合字符串；
+  展开后的记录数为 任务数×平均分组数，按用户分块展开计数，每块只保留各用户的Top-N
+- 各标签通过 (用户, 键) 组合编码做一次 np.unique 分组计数
+- Top-N 按 (用户, 计数降序, 首次出现顺序) 排序截取，与 Counter.most_common 的并列顺序一致
+- 提报时间分布由缓存的小时/星期/月份列按 用户×区间 一次 bincount 得到，需求时长按用户分段归约
+"""
+
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+import numpy as np
+
+from src.models.mission_table import NAT_EPOCH, MissionTable
+from src.models.target_info import TargetInfo
+from src.core.persona_tag_calculator import PersonaTagCalculator, REQUEST_TIME_BINS
+from src.core.target_index import TargetIndex, TargetGroupIncidence, NO_GROUP
+from src.core.preference_scoring import PreferenceScorer, UserTargetMatrix, select_algorithms
+
+
+# 计算画像标签所需的任务字段
+TAG_FIELDS = (
+    'req_unit', 'req_group', 'req_start_time', 'req_end_time', 'topic_id', 'target_id',
+    'task_type', 'scout_type', 'task_scene', 'is_precise'
+)
+
+# 专题×分组按用户分块计数时每块展开的记录数上限
+TOPIC_GROUP_BLOCK_RECORDS = 1 << 22
+# 逐块产出画像时每块包含的需求行数上限（按用户切分，单个用户的需求不跨块）
+STREAM_BLOCK_ROWS = 1 << 18
+
+
+class GroupCounts:
+    """按 (用户, 键) 分组的计数结果"""
+
+    def __init__(self, users: np.ndarray, keys: np.ndarray, counts: np.ndarray, first: np.ndarray,
+                 totals: np.ndarray = None):
+        """
+        :param users: 用户编码
+        :param keys: 键编码
+        :param counts: 计数
+        :param first: 首次出现位置（决定并列时的先后顺序，只在同一用户内比较）
+        :param totals: 每个用户的记录总数（只保留了部分分组时必须提供）
+        """
+        self.users = users
+        self.keys = keys
+        self.counts = counts
+        self.first = first
+        self.totals = totals
+
+    @classmethod
+    def count(cls, users: np.ndarray, keys: np.ndarray, num_keys: int) -> 'GroupCounts':
+        """
+        对 (用户, 键) 组合做分组计数
+        :param users: 每条记录的用户编码
+        :param keys: 每条记录的键编码
+        :param num_keys: 键空间大小
+        :return: 分组计数结果
+        """
+        num_keys = max(int(num_keys), 1)
+        composite = users.astype(np.int64) * num_keys + keys.astype(np.int64)
+        uniques, first, counts = np.unique(composite, return_index=True, return_counts=True)
+        return cls(uniques // num_keys, uniques % num_keys, counts, first)
+
+    def top_n(self, top_n: int) -> np.ndarray:
+        """
+        每个用户的Top-N分组
+        :param top_n: 每个用户保留的数量，None表示全部
+        :return: 分组下标，按用户、计数降序、首次出现顺序排列
+        """
+        order = np.lexsort((self.first, -self.counts, self.users))
+        if top_n is None:
+            return order
+        sorted_users = self.users[order]
+        rank = np.arange(len(order)) - np.searchsorted(sorted_users, sorted_users, side='left')
+        return order[rank < top_n]
+
+    def user_totals(self, num_users: int) -> np.ndarray:
+        """每个用户的记录总数"""
+        if self.totals is not None:
+            return self.totals
+        return np.bincount(self.users, weights=self.counts, minlength=num_users).astype(np.int64)
+
+    def in_first_order(self) -> np.ndarray:
+        """分组下标，按用户、首次出现顺序排列"""
+        return np.lexsort((self.first, self.users))
+
+
+class RequestTimes:
+    """各用户的提报时间分布（用户×区间计数矩阵）与需求时长（总秒数、最短、最长、有效任务数）"""
+
+    def __init__(self, histograms: Dict[str, np.ndarray],
+                 durations: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]):
+        """
+        :param histograms: {'hour_of_day' / 'weekday' / 'month': 用户×区间计数矩阵}
+        :param durations: (总秒数, 最短秒数, 最长秒数, 有效时长任务数) 四个按用户排列的数组，
+                          没有结束时间列时为None；任务数为0的用户不输出时长
+        """
+        self.histograms = histograms
+        self.durations = durations
+
+    @classmethod
+    def count(cls, table: MissionTable) -> 'RequestTimes':
+        """
+        统计数据表中各用户的提报时间（缺失时间的处理与 PersonaTagCalculator._count_request_times 一致）
+        :param table: 列式任务数据表（用户编码取自 table.user_index()）
+        :return: 按用户编码排列的统计结果
+        """
+        user_codes, users = table.user_index()
+        num_users = len(users)
+        # 缺失或无法解析的提报时间不计入分布
+        parts = table.time_parts('req_start_time')
+        valid = parts[0] >= 0
+        codes = user_codes
+        if not valid.all():
+            codes, parts = user_codes[valid], [part[valid] for part in parts]
+        histograms = {
+            name: np.bincount(codes * size + part, minlength=num_users * size).reshape(num_users, size)
+            for (name, size), part in zip(REQUEST_TIME_BINS, parts)
+        }
+        durations = None
+        if 'req_end_time' in table.columns and num_users:
+            order, bounds, _ = table.user_row_index()
+            starts, ends = table.columns['req_start_time'][order], table.columns['req_end_time'][order]
+            seconds = ends - starts
+            counts = np.diff(bounds)
+            valid = (starts != NAT_EPOCH) & (ends != NAT_EPOCH)
+            if not valid.all():
+                # 时长只统计开始、结束时间都有效的任务，去掉无效行后有效行数为0的用户区间为空
+                seconds = seconds[valid]
+                counts = np.bincount(user_codes[order][valid], minlength=num_users)
+                bounds = np.concatenate(([0], np.cumsum(counts)))
+            durations = cls._reduce_durations(seconds, bounds, counts)
+        return cls(histograms, durations)
+
+    @staticmethod
+    def _reduce_durations(seconds: np.ndarray, bounds: np.ndarray,
+                          counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """按用户分段归约时长（只对非空区间 reduceat，空区间的总和、最短、最长为0）"""
+        nonempty = counts > 0
+        starts = bounds[:-1][nonempty]
+        total, shortest, longest = (np.zeros(len(counts), dtype=np.int64) for _ in range(3))
+        if len(starts):
+            total[nonempty] = np.add.reduceat(seconds, starts)
+            shortest[nonempty] = np.minimum.reduceat(seconds, starts)
+            longest[nonempty] = np.maximum.reduceat(seconds, starts)
+        return total, shortest, longest, counts
+
+    def tags(self, totals: List[int]) -> List[Dict[str, Any]]:
+        """
+        生成各用户的需求频率标签（与 PersonaTagCalculator._request_frequency_from_counts 一致）
+        :param totals: 每个用户的任务数
+        :return: 需求频率标签列表
+        """
+        names = [name for name, _ in REQUEST_TIME_BINS]
+        columns = [totals] + [self.histograms[name].tolist() for name in names]
+        tags = [
+            {'total_count': total, 'time_distribution': dict(zip(names, histograms))}
+            for total, *histograms in zip(*columns)
+        ]
+        if self.durations is None:
+            return tags
+        for tag, seconds, shortest, longest, count in zip(tags, *(values.tolist() for values in self.durations)):
+            if count:
+                tag['duration_hours'] = {'mean': round(seconds / count / 3600, 2),
+                                         'min': round(shortest / 3600, 2),
+                                         'max': round(longest / 3600, 2)}
+        return tags
+
+
+class TargetFeatures:
+    """按任务表目标编码索引的目标特征数组"""
+
+    def __init__(self, table: MissionTable, target_info: List[TargetInfo]):
+        """
+        :param table: 列式任务数据表
+        :param target_info: 目标信息列表
+        """
+        target_index = TargetIndex(target_info)
+        targets = [target_index.get(target_id) for target_id in table.categories['target_id'].tolist()]
+        num_targets = len(targets)
+
+        # 区域类型
+        region_mapping = {}
+        self.region_codes = np.full(num_targets, -1, dtype=np.int64)
+        # 目标类型×种类组合
+        category_mapping = {}
+        self.category_codes = np.full(num_targets, -1, dtype=np.int64)
+        # 分组（CSR：target -> groups），无目标或无分组的目标对应 NO_GROUP
+        self.group_incidence = TargetGroupIncidence(targets)
+
+        for code, target in enumerate(targets):
+            if target is None:
+                continue
+            if hasattr(target, 'target_area_type'):
+                self.region_codes[code] = region_mapping.setdefault(target.target_area_type, len(region_mapping))
+            combo = f"{target.target_type}_{target.target_category}"
+            self.category_codes[code] = category_mapping.setdefault(combo, len(category_mapping))
+
+        self.regions = list(region_mapping)
+        self.category_combos = list(category_mapping)
+
+
+class VectorizedTagEngine:
+    """向量化画像标签引擎 - 输出与 PersonaTagCalculator.generate_persona_tags 逐用户计算结果一致"""
+
+    def __init__(self, tag_calculator: PersonaTagCalculator):
+        """
+        :param tag_calculator: 标签计算器（提供 top_n、偏好算法与全局统计配置）
+        """
+        self.tag_calculator = tag_calculator
+        self.top_n = tag_calculator.top_n
+
+    def generate_all_persona_tags(self,
+                                  table: MissionTable,
+                                  target_info: List[TargetInfo]) -> List[Tuple[Dict[str, str], Dict[str, Any]]]:
+        """
+        计算所有用户的画像标签
+        :param table: 列式任务数据表
+        :param target_info: 目标信息列表
+        :return: [(用户身份信息, 画像标签字典)]，用户按首次出现顺序排列
+        """
+        user_codes, users = table.user_index()
+        if not users:
+            return []
+
+        with self.tag_calculator.instrumentation.stage('tag.counting'):
+            features = TargetFeatures(table, target_info)
+            records = self.dimension_records(table, features, expand_topic_groups=False)
+            groups = {
+                dimension: GroupCounts.count(user_codes[rows], keys, num_keys)
+                for dimension, (rows, keys, num_keys, _) in records.items()
+                if rows is not None
+            }
+            groups['preferred_topic_group'] = self.count_topic_groups(table, features)
+            request_times = RequestTimes.count(table)
+        totals = np.bincount(user_codes, minlength=len(users)).tolist()
+        user_ids = [{'req_unit': req_unit, 'req_group': req_group} for req_unit, req_group in users]
+        return list(zip(user_ids, self.assemble_tags(table, records, groups, totals, request_times)))
+
+    def iter_persona_tags(self,
+                          table: MissionTable,
+                          target_info: List[TargetInfo],
+                          block_rows: int = None) -> Iterator[Tuple[Dict[str, str], Dict[str, Any]]]:
+        """
+        按用户分块计算画像标签，每块算完即产出，结果与 generate_all_persona_tags 一致
+        （依赖全局统计的算法使用 tag_calculator 中已计算好的全局统计）
+        :param table: 列式任务数据表
+        :param target_info: 目标信息列表
+        :param block_rows: 每块的需求行数上限，默认 STREAM_BLOCK_ROWS
+        :return: (用户身份信息, 画像标签字典) 迭代器，用户按首次出现顺序排列
+        """
+        block_rows = block_rows or STREAM_BLOCK_ROWS
+        if len(table) <= block_rows:
+            yield from self.generate_all_persona_tags(table, target_info)
+            return
+
+        order, bounds, _ = table.user_row_index()
+        num_users = len(bounds) - 1
+        first = 0
+        while first < num_users:
+            # 至少包含一个用户；用户按首次出现顺序编号，各块依次拼接即全局顺序
+            last = int(np.searchsorted(bounds, bounds[first] + block_rows, side='right')) - 1
+            last = min(max(last, first + 1), num_users)
+            rows = np.sort(order[bounds[first]:bounds[last]])
+            yield from self.generate_all_persona_tags(table.take(rows), target_info)
+            first = last
+
+    def dimension_records(self,
+                          table: MissionTable,
+                          features: TargetFeatures,
+                          expand_topic_groups: bool = True) -> Dict[str, Tuple[np.ndarray, np.ndarray, int, Any]]:
+        """
+        展开各标签维度的计数记录
+        :param table: 列式任务数据表
+        :param features: 目标特征数组
+        :param expand_topic_groups: 是否展开专题×分组记录；为False时该维度的行号与键编码为None，
+                                    由 count_topic_groups 按用户分块计数
+        :return: {维度: (记录对应的行号, 键编码, 键空间大小, 键编码 -> 标签描述字段的函数)}，
+                 记录按行号非递减排列，记录下标的先后即首次出现顺序
+        """
+        rows = np.arange(len(table))
+        target_codes = table.codes('target_id').astype(np.int64)
+        records = {'target_proportion': (rows, target_codes, len(table.categories['target_id']), None)}
+
+        # 侦察区域
+        region_codes = features.region_codes[target_codes]
+        valid = region_codes >= 0
+        records['region_proportion'] = (
+            rows[valid], region_codes[valid], len(features.regions),
+            lambda key: {'region': features.regions[key]}
+        )
+
+        # 目标类别
+        category_codes = features.category_codes[target_codes]
+        valid = category_codes >= 0
+        records['preferred_target_category'] = (
+            rows[valid], category_codes[valid], len(features.category_combos),
+            lambda key: self._split_category(features.category_combos[key])
+        )
+
+        # 专题与分组（按目标 -> 分组关联矩阵展开），键为 专题编码 × 分组数 + 分组编码
+        group_names = features.group_incidence.group_names
+        num_groups = len(group_names)
+        topic_names = table.categories['topic_id']
+        mission_rows = topic_group_keys = None
+        if expand_topic_groups:
+            mission_rows, topic_group_keys = self._topic_group_records(table, features, rows)
+        records['preferred_topic_group'] = (
+            mission_rows,
+            topic_group_keys,
+            len(topic_names) * num_groups,
+            lambda key: {'topic_id': str(topic_names[key // num_groups]),
+                         'group_name': group_names[key % num_groups]}
+        )
+
+        # 侦察场景
+        scenario_fields = ('task_type', 'scout_type', 'task_scene')
+        sizes = [len(table.categories[field]) for field in scenario_fields] + [2]
+        scenario_keys = np.zeros(len(table), dtype=np.int64)
+        for field, size in zip(scenario_fields, sizes):
+            scenario_keys = scenario_keys * size + table.codes(field)
+        scenario_keys = scenario_keys * 2 + table.columns['is_precise'].astype(np.int64)
+        records['preferred_scout_scenario'] = (
+            rows, scenario_keys, int(np.prod(sizes)),
+            lambda key: self._decode_scenario(table, key, sizes)
+        )
+        return records
+
+    def count_topic_groups(self, table: MissionTable, features: TargetFeatures) -> GroupCounts:
+        """
+        按用户分块展开并计数专题×分组，每块只保留各用户的Top-N，峰值内存与分块大小相关
+        :param table: 列式任务数据表
+        :param features: 目标特征数组
+        :return: 只含各用户Top-N分组的计数结果（带每个用户的记录总数）
+        """
+        user_codes, users = table.user_index()
+        order, bounds, _ = table.user_row_index()
+        num_keys = len(table.categories['topic_id']) * len(features.group_incidence.group_names)
+        degree = features.group_incidence.degree[table.codes('target_id')]
+        totals = np.bincount(user_codes, weights=degree, minlength=len(users)).astype(np.int64)
+
+        # 按展开后的记录数切分用户区间，单个用户超过上限时独占一块
+        cumulative = np.concatenate(([0], np.cumsum(totals)))
+        block_starts = [0]
+        while block_starts[-1] < len(users):
+            start = block_starts[-1]
+            stop = int(np.searchsorted(cumulative, cumulative[start] + TOPIC_GROUP_BLOCK_RECORDS, side='right')) - 1
+            block_starts.append(min(max(stop, start + 1), len(users)))
+
+        parts = []
+        for start, stop in zip(block_starts[:-1], block_starts[1:]):
+            # 块内各用户的行保持原有顺序，记录下标的先后即该用户内的首次出现顺序
+            rows = order[bounds[start]:bounds[stop]]
+            record_rows, keys = self._topic_group_records(table, features, rows)
+            groups = GroupCounts.count(user_codes[record_rows], keys, num_keys)
+            selected = groups.top_n(self.top_n)
+            parts.append((groups.users[selected], groups.keys[selected], groups.counts[selected],
+                          groups.first[selected]))
+        selected_users, keys, counts, first = (np.concatenate(columns) for columns in zip(*parts))
+        return GroupCounts(selected_users, keys, counts, first, totals=totals)
+
+    @staticmethod
+    def _topic_group_records(table: MissionTable, features: TargetFeatures,
+                             rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        把指定行按目标 -> 分组关联矩阵展开为专题×分组记录
+        :return: (记录对应的行号, 键编码)，记录顺序与 rows 一致，同一行的分组按 group_list 顺序排列
+        """
+        incidence = features.group_incidence
+        positions, group_codes = incidence.expand(table.codes('target_id')[rows])
+        record_rows = rows[positions]
+        keys = table.codes('topic_id')[record_rows].astype(np.int64) * len(incidence.group_names) + group_codes
+        return record_rows, keys
+
+    def assemble_tags(self,
+                      table: MissionTable,
+                      records: Dict[str, Tuple[np.ndarray, np.ndarray, int, Any]],
+                      groups: Dict[str, GroupCounts],
+                      totals: List[int],
+                      request_times: RequestTimes) -> List[Dict[str, Any]]:
+        """
+        由各维度的分组计数生成画像标签
+        :param table: 列式任务数据表（提供目标字典）
+        :param records: dimension_records 的结果（提供标签描述函数）
+        :param groups: {维度: 分组计数}，用户编码为 0..len(totals)-1
+        :param totals: 每个用户的任务数
+        :param request_times: 各用户的提报时间统计（用户编码同上）
+        :return: 各用户的画像标签字典
+        """
+        stage = self.tag_calculator.instrumentation.stage
+        with stage('tag.request_frequency'):
+            tags = [{'request_frequency': request_frequency} for request_frequency in request_times.tags(totals)]
+        with stage('tag.target_proportion'):
+            self._fill_target_proportion(tags, table.categories['target_id'], groups['target_proportion'], totals)
+        for tag_name in ('region_proportion', 'preferred_target_category',
+                         'preferred_topic_group', 'preferred_scout_scenario'):
+            with stage(f'tag.{tag_name}'):
+                self._fill_top_n(tags, tag_name, groups[tag_name], records[tag_name][3])
+        return tags
+
+    def _fill_target_proportion(self, tags: List[Dict[str, Any]], target_names: np.ndarray,
+                                groups: GroupCounts, totals: List[int]):
+        """
+        目标占比依赖偏好算法：在用户×目标矩阵上批量打分；
+        auto 模式先一次为所有用户选择算法，再按算法分桶打分
+        """
+        calculator = self.tag_calculator
+        matrix = UserTargetMatrix.from_group_counts(groups, len(totals), len(target_names))
+        totals = np.asarray(totals, dtype=np.int64)
+        scorer = PreferenceScorer(calculator.global_stats, target_names, self.top_n,
+                                  fallback=calculator._target_proportion_with)
+
+        algorithm = calculator.preference_algorithm
+        if algorithm != 'auto':
+            # 未知算法与逐用户计算一样按百分比处理
+            if algorithm not in PreferenceScorer.ALGORITHMS:
+                algorithm = 'percentage'
+            for user_tags, target_proportion in zip(tags, scorer.score(algorithm, matrix, totals)):
+                user_tags['target_proportion'] = target_proportion
+            return
+
+        total_users = calculator.global_stats.get('total_users', 0) if calculator.global_stats else 0
+        choices = select_algorithms(
+            matrix, total_users,
+            lambda counts: calculator._select_auto_algorithm(
+                counts, calculator._calculate_concentration_index(counts)['hhi'])
+        )
+        for algorithm in dict.fromkeys(choices.tolist()):
+            rows = np.flatnonzero(choices == algorithm)
+            calculator.instrumentation.choice('auto_algorithm', algorithm, len(rows))
+            results = scorer.score(algorithm, matrix.take_rows(rows), totals[rows])
+            for row, target_proportion in zip(rows.tolist(), results):
+                tags[row]['target_proportion'] = target_proportion
+
+    def _fill_top_n(self, tags: List[Dict[str, Any]], tag_name: str, groups: GroupCounts, describe):
+        """
+        按用户截取Top-N并生成带占比的标签列表
+        :param tags: 各用户的标签字典
+        :param tag_name: 标签名
+        :param groups: 分组计数结果
+        :param describe: 键编码 -> 标签描述字段的函数
+        """
+        for user_tags in tags:
+            user_tags[tag_name] = []
+
+        user_totals = groups.user_totals(len(tags))
+        selected = groups.top_n(self.top_n)
+        for user, key, count in zip(groups.users[selected].tolist(),
+                                    groups.keys[selected].tolist(),
+                                    groups.counts[selected].tolist()):
+            entry = describe(key)
+            entry['count'] = count
+            entry['percentage'] = round(count / int(user_totals[user]) * 100, 2)
+            tags[user][tag_name].append(entry)
+
+    @staticmethod
+    def _split_category(combo: str) -> Dict[str, str]:
+        """拆分目标类型×种类组合"""
+        type_category = combo.split('_', 1)
+        return {
+            'target_type': type_category[0] if len(type_category) > 0 else '',
+            'target_category': type_category[1] if len(type_category) > 1 else ''
+        }
+
+    @staticmethod
+    def _decode_scenario(table: MissionTable, key: int, sizes: List[int]) -> Dict[str, str]:
+        """由组合编码还原侦察场景"""
+        key, precise = divmod(key, sizes[3])
+        key, task_scene = divmod(key, sizes[2])
+        task_type, scout_type = divmod(key, sizes[1])
+        is_precise_str = '精确' if precise else '非精确'
+        combo = (f"{table.categories['task_type'][task_type]}_{table.categories['scout_type'][scout_type]}_"
+                 f"{table.categories['task_scene'][task_scene]}_{is_precise_str}")
+        parts = combo.rsplit('_', 3)
+        return {
+            'task_type': parts[0] if len(parts) > 0 else '',
+            'scout_type': parts[1] if len(parts) > 1 else '',
+            'task_scene': parts[2] if len(parts) > 2 else '',
+            'is_precise': parts[3] if len(parts) > 3 else ''
+        }
@@ -0,0 +1,267 @@
+"""
+多时间窗口画像批量查询
+
+一次扫描任务表，按 (用户, 维度键, 日) 聚合计数并做前缀和：
+- 按整日对齐的时间窗口通过两次二分查找与前缀和相减得到每个 (用户, 键) 的计数，
+  代价与 (用户, 键) 组合数相关，与任务条数无关
+- 窗口内首次出现位置由按日最小位置做区间最小值得到，保证并列顺序与逐窗口全量计算一致
+- 提报时间分布按 (用户×区间, 日) 同样做前缀和；需求时长按 (用户, 日) 保存总和与任务数的前缀和、
+  每日最短/最长，窗口内的最短/最长为区间最小/最大值
+- 未按整日对齐的窗口退化为对窗口内的子表直接计数
+- 每个窗口的全局统计（TF-IDF/BM25/auto）由窗口内目标计数直接得到
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.models.mission_table import NAT_EPOCH, MissionTable, parse_time_bound
+from src.models.target_info import TargetInfo
+from src.models.user_persona import UserPersona
+from src.core.persona_tag_calculator import PersonaTagCalculator, REQUEST_TIME_BINS
+from src.core.vectorized_tag_engine import GroupCounts, RequestTimes, TargetFeatures, VectorizedTagEngine
+
+SECONDS_PER_DAY = 86400
+
+
+class _DailyCounts:
+    """单个维度按 (用户×键, 日) 聚合的计数与前缀和"""
+
+    def __init__(self, pairs: np.ndarray, days: np.ndarray, num_days: int):
+        """
+        :param pairs: 每条记录的 (用户×键) 组合编码
+        :param days: 每条记录的日偏移
+        :param num_days: 日偏移范围
+        """
+        self.num_days = num_days
+        composite = pairs * num_days + days
+        self.entries, first, counts = np.unique(composite, return_index=True, return_counts=True)
+        self.pairs = np.unique(self.entries // num_days)
+        self.cumulative = np.concatenate(([0], np.cumsum(counts)))
+        # 末尾哨兵，保证区间右端等于长度时 reduceat 下标合法
+        self.first = np.append(first, np.iinfo(np.int64).max)
+
+    def window(self, first_day: int, last_day: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        日偏移闭区间 [first_day, last_day] 内的计数
+        :return: (组合编码, 计数, 窗口内首次出现位置)，只含计数大于0的组合
+        """
+        base = self.pairs * self.num_days
+        lo = np.searchsorted(self.entries, base + first_day, side='left')
+        hi = np.searchsorted(self.entries, base + last_day, side='right')
+        counts = self.cumulative[hi] - self.cumulative[lo]
+        nonzero = counts > 0
+        lo, hi = lo[nonzero], hi[nonzero]
+        # 交替放入区间左右端，偶数位结果即各区间最小值
+        bounds = np.empty(2 * len(lo), dtype=np.int64)
+        bounds[0::2] = lo
+        bounds[1::2] = hi
+        first = np.minimum.reduceat(self.first, bounds)[0::2] if len(lo) else np.empty(0, dtype=np.int64)
+        return self.pairs[nonzero], counts[nonzero], first
+
+
+class _DailyDurations:
+    """按 (用户, 日) 聚合的需求时长：总和与任务数的前缀和、每日最短/最长"""
+
+    def __init__(self, users: np.ndarray, days: np.ndarray, seconds: np.ndarray, num_days: int):
+        """
+        :param users: 每条任务的用户编码（只含开始、结束时间都有效的任务）
+        :param days: 每条任务的日偏移
+        :param seconds: 每条任务的时长（秒）
+        :param num_days: 日偏移范围
+        """
+        self.num_days = num_days
+        composite = users * num_days + days
+        order = np.argsort(composite, kind='stable')
+        composite, seconds = composite[order], seconds[order]
+        starts = np.flatnonzero(np.concatenate(([True], composite[1:] != composite[:-1])))
+        self.entries = composite[starts]
+        sums, shortest, longest = (np.zeros(len(starts), dtype=np.int64) for _ in range(3))
+        if len(starts):
+            sums = np.add.reduceat(seconds, starts)
+            shortest = np.minimum.reduceat(seconds, starts)
+            longest = np.maximum.reduceat(seconds, starts)
+        self.cumulative = np.concatenate(([0], np.cumsum(sums)))
+        self.cumulative_counts = np.concatenate(([0], np.cumsum(np.diff(np.append(starts, len(composite))))))
+        # 末尾哨兵，保证区间右端等于长度时 reduceat 下标合法
+        self.shortest = np.append(shortest, 0)
+        self.longest = np.append(longest, 0)
+
+    def window(self, users: np.ndarray, first_day: int,
+               last_day: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        日偏移闭区间 [first_day, last_day] 内各用户的时长统计
+        :return: (总秒数, 最短秒数, 最长秒数, 有效时长任务数)，与 users 一一对应；任务数为0时其余取值无意义
+        """
+        if not len(users):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty, empty
+        base = users * self.num_days
+        lo = np.searchsorted(self.entries, base + first_day, side='left')
+        hi = np.searchsorted(self.entries, base + last_day, side='right')
+        bounds = np.empty(2 * len(lo), dtype=np.int64)
+        bounds[0::2] = lo
+        bounds[1::2] = hi
+        return (self.cumulative[hi] - self.cumulative[lo],
+                np.minimum.reduceat(self.shortest, bounds)[0::2],
+                np.maximum.reduceat(self.longest, bounds)[0::2],
+                self.cumulative_counts[hi] - self.cumulative_counts[lo])
+
+
+class WindowedPersonaIndex:
+    """多时间窗口画像索引 - 每个窗口的结果与对该窗口调用 generate_user_persona 一致"""
+
+    def __init__(self, table: MissionTable, target_info: List[TargetInfo]):
+        """
+        :param table: 列式任务数据表（需包含画像标签字段与 req_start_time）
+        :param target_info: 目标信息列表
+        """
+        self.table = table
+        self.features = TargetFeatures(table, target_info)
+        self.engine = VectorizedTagEngine(PersonaTagCalculator())
+        self.user_codes, self.users = table.user_index()
+        self.records = self.engine.dimension_records(table, self.features)
+
+        # 日偏移从1开始，缺失提报时间的任务放在日偏移0（只出现在不限开始时间的窗口中，与按行过滤一致）
+        starts = table.columns['req_start_time']
+        valid_start = starts != NAT_EPOCH
+        days = starts // SECONDS_PER_DAY
+        self.first_day = int(days[valid_start].min()) if valid_start.any() else 0
+        num_days = int(days[valid_start].max()) - self.first_day + 2 if valid_start.any() else 1
+        days = np.where(valid_start, days - self.first_day + 1, 0)
+
+        self.daily = {}
+        for dimension, (rows, keys, num_keys, _) in self.records.items():
+            pairs = self.user_codes[rows] * max(num_keys, 1) + keys
+            self.daily[dimension] = _DailyCounts(pairs, days[rows], num_days)
+
+        # 提报时间分布与需求时长
+        self.time_daily = {
+            name: _DailyCounts((self.user_codes * size + part)[valid_start], days[valid_start], num_days)
+            for (name, size), part in zip(REQUEST_TIME_BINS, table.time_parts('req_start_time'))
+        }
+        self.durations = None
+        if 'req_end_time' in table.columns:
+            ends = table.columns['req_end_time']
+            valid = valid_start & (ends != NAT_EPOCH)
+            self.durations = _DailyDurations(self.user_codes[valid], days[valid], (ends - starts)[valid], num_days)
+
+    def query(self,
+              start_time: str = None,
+              end_time: str = None,
+              algorithm: Dict[str, Any] = None) -> List[Tuple[Dict[str, str], Dict[str, Any]]]:
+        """
+        查询单个时间窗口的画像标签
+        :param start_time: 开始时间（可选，格式：YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS）
+        :param end_time: 结束时间（可选，格式同上，只给日期时包含当天）
+        :param algorithm: 算法配置参数（preference_algorithm、top_n）
+        :return: [(用户身份信息, 画像标签字典)]，用户按窗口内首次出现顺序排列
+        """
+        algorithm = dict(algorithm or {})
+        start_epoch = parse_time_bound(start_time) if start_time else None
+        end_epoch = parse_time_bound(end_time, end=True) if end_time else None
+
+        aligned = ((start_epoch is None or start_epoch % SECONDS_PER_DAY == 0)
+                   and (end_epoch is None or (end_epoch + 1) % SECONDS_PER_DAY == 0))
+        if aligned:
+            users, groups, totals, request_times = self._count_by_days(start_epoch, end_epoch)
+            table, records = self.table, self.records
+        else:
+            table = self.table.take(self.table.rows_in_time_range(start_epoch, end_epoch))
+            users, groups, totals, records, request_times = self._count_rows(table)
+        if not users:
+            return []
+
+        if algorithm.get('preference_algorithm', 'auto') in ['auto', 'tfidf', 'bm25']:
+            algorithm['global_stats'] = self._global_stats(groups['target_proportion'], len(users), sum(totals))
+        engine = VectorizedTagEngine(PersonaTagCalculator(algorithm_config=algorithm))
+        tags = engine.assemble_tags(table, records, groups, totals, request_times)
+        user_ids = [{'req_unit': req_unit, 'req_group': req_group} for req_unit, req_group in users]
+        return list(zip(user_ids, tags))
+
+    def query_windows(self,
+                      windows: Sequence[Tuple[Optional[str], Optional[str]]],
+                      algorithm: Dict[str, Any] = None) -> List[List[Tuple[Dict[str, str], Dict[str, Any]]]]:
+        """
+        批量查询多个时间窗口
+        :param windows: [(开始时间, 结束时间)]
+        :param algorithm: 算法配置参数
+        :return: 与 windows 一一对应的画像标签列表
+        """
+        return [self.query(start_time, end_time, algorithm) for start_time, end_time in windows]
+
+    def _count_by_days(self, start_epoch: Optional[int], end_epoch: Optional[int]):
+        """由按日前缀和计算整日对齐窗口的分组计数"""
+        first_day = 0 if start_epoch is None else max(start_epoch // SECONDS_PER_DAY - self.first_day + 1, 1)
+        last_day = self.daily['target_proportion'].num_days - 1
+        if end_epoch is not None:
+            last_day = min(last_day, max((end_epoch + 1) // SECONDS_PER_DAY - self.first_day, 0))
+        if last_day < first_day:
+            return [], {}, [], None
+
+        windowed = {dimension: daily.window(first_day, last_day) for dimension, daily in self.daily.items()}
+
+        # 每条任务恰好对应一条目标记录，目标维度的首次出现位置即行号，由此确定窗口内用户顺序
+        pairs, counts, first = windowed['target_proportion']
+        num_targets = max(self.records['target_proportion'][2], 1)
+        user_first = np.full(len(self.users), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(user_first, pairs // num_targets, first)
+        active = np.flatnonzero(user_first < np.iinfo(np.int64).max)
+        active = active[np.argsort(user_first[active], kind='stable')]
+        rank = np.full(len(self.users), -1, dtype=np.int64)
+        rank[active] = np.arange(len(active))
+
+        groups = {}
+        for dimension, (pairs, counts, first) in windowed.items():
+            num_keys = max(self.records[dimension][2], 1)
+            groups[dimension] = GroupCounts(rank[pairs // num_keys], pairs % num_keys, counts, first)
+        totals = np.bincount(groups['target_proportion'].users, weights=groups['target_proportion'].counts,
+                             minlength=len(active)).astype(np.int64).tolist()
+
+        histograms = {}
+        for name, size in REQUEST_TIME_BINS:
+            pairs, counts, _ = self.time_daily[name].window(first_day, last_day)
+            histograms[name] = np.zeros((len(active), size), dtype=np.int64)
+            histograms[name][rank[pairs // size], pairs % size] = counts
+        durations = None
+        if self.durations is not None:
+            durations = self.durations.window(active, first_day, last_day)
+        request_times = RequestTimes(histograms, durations)
+        return [self.users[user] for user in active.tolist()], groups, totals, request_times
+
+    def _count_rows(self, table: MissionTable):
+        """对窗口子表直接分组计数（未按整日对齐的窗口）"""
+        if len(table) == 0:
+            return [], {}, [], {}, None
+        user_codes, users = table.user_index()
+        records = self.engine.dimension_records(table, self.features)
+        groups = {
+            dimension: GroupCounts.count(user_codes[rows], keys, num_keys)
+            for dimension, (rows, keys, num_keys, _) in records.items()
+        }
+        totals = np.bincount(user_codes, minlength=len(users)).tolist()
+        return users, groups, totals, records, RequestTimes.count(table)
+
+    def _global_stats(self, target_groups: GroupCounts, total_users: int, total_missions: int) -> Dict[str, Any]:
+        """由窗口内 (用户, 目标) 计数得到全局统计（与 UserPersonaAlgorithm._calculate_global_stats 一致）"""
+        target_names = self.table.categories['target_id']
+        users_per_target = np.bincount(target_groups.keys, minlength=len(target_names))
+        used = np.flatnonzero(users_per_target)
+        return {
+            'target_user_count': dict(zip(target_names[used].tolist(), users_per_target[used].tolist())),
+            'total_users': total_users,
+            'avg_mission_count': total_missions / total_users if total_users > 0 else 0
+        }
+
+
+def personas_from_tags(all_persona_tags: List[Tuple[Dict[str, str], Dict[str, Any]]]) -> List[UserPersona]:
+    """
+    将 (用户身份信息, 画像标签) 列表包装为画像对象
+    :param all_persona_tags: 画像标签列表
+    :return: 用户画像列表
+    """
+    return [
+        UserPersona(user_id=user_id, persona_tags=persona_tags, generation_time=datetime.now().isoformat())
+        for user_id, persona_tags in all_persona_tags
+    ]
@@ -3,11 +3,13 @@
 """
 
 from .mission import Mission
+from .mission_table import MissionTable
 from .target_info import TargetInfo, Group, Trajectory
 from .user_persona import UserPersona
 
 __all__ = [
     'Mission',
+    'MissionTable',
     'TargetInfo',
     'Group', 
     'Trajectory',
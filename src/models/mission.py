@@ -1,4 +1,12 @@
 class Mission:
+    # 使用 __slots__ 去掉每个实例的 __dict__，百万级任务对象可显著节省内存
+    __slots__ = (
+        'req_id', 'topic_id', 'req_unit', 'req_group', 'req_start_time', 'req_end_time',
+        'task_type', 'target_id', 'country_name', 'target_priority', 'is_emcon',
+        'is_precise', 'scout_type', 'task_scene', 'resolution', 'req_cycle',
+        'req_cycle_time', 'req_times', 'mission_play_type'
+    )
+
     def __init__(self,
                  req_id: str,
                  topic_id: str,
@@ -0,0 +1,432 @@
+"""
+列式历史需求数据表
+
+将 List[Mission] 按列存放到 NumPy 数组中：
+- 分类字段（部门、区组、侦察类型等）做字典编码，列中只保存整数编码，字典保留原始取值
+- 时间字段保存为 int64 时间戳（秒），可零拷贝地视为 datetime64[s]
+- 数值字段保存为定长数值数组
+"""
+
+from datetime import datetime
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+from operator import attrgetter
+
+import numpy as np
+
+from src.models.mission import Mission
+
+
+# 字段顺序与 Mission 构造参数一致
+MISSION_FIELDS = (
+    'req_id', 'topic_id', 'req_unit', 'req_group', 'req_start_time', 'req_end_time',
+    'task_type', 'target_id', 'country_name', 'target_priority', 'is_emcon',
+    'is_precise', 'scout_type', 'task_scene', 'resolution', 'req_cycle',
+    'req_cycle_time', 'req_times', 'mission_play_type'
+)
+
+# 字典编码字段
+CATEGORICAL_FIELDS = (
+    'req_id', 'topic_id', 'req_unit', 'req_group', 'task_type', 'target_id',
+    'country_name', 'is_emcon', 'scout_type', 'task_scene', 'req_cycle',
+    'req_cycle_time', 'mission_play_type'
+)
+
+# 时间字段（int64 时间戳，秒）
+TIME_FIELDS = ('req_start_time', 'req_end_time')
+
+# 数值字段
+FLOAT_FIELDS = ('target_priority', 'resolution')
+INT_FIELDS = ('req_times',)
+BOOL_FIELDS = ('is_precise',)
+
+# 缺失或无法解析的时间（NaT 的 int64 表示）
+NAT_EPOCH = int(np.datetime64('NaT', 's').astype(np.int64))
+# 宽松解析的时间格式：年-月-日[ 时:分[:秒]]，日期分隔符可为 - / .
+_LENIENT_TIME = re.compile(r'(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?:[ T](\d{1,2}):(\d{1,2})(?::(\d{1,2}))?)?')
+
+# 还原为 Mission 时使用的分块大小
+_ITER_CHUNK_SIZE = 8192
+
+
+def encode_categorical(values: Iterable[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    字典编码
+    :param values: 原始取值序列
+    :return: (编码数组, 字典数组)，字典按首次出现顺序排列
+    """
+    values = values if isinstance(values, list) else list(values)
+    mapping = {value: code for code, value in enumerate(dict.fromkeys(values))}
+    codes = np.fromiter(map(mapping.__getitem__, values),
+                        dtype=code_dtype(len(mapping)), count=len(values))
+    return codes, category_array(mapping)
+
+
+def category_array(values: Iterable[Any]) -> np.ndarray:
+    """
+    字典数组：取值全为字符串时为定长字符串数组，否则为保留原始取值（如整数编号）的object数组
+    :param values: 字典取值序列（已去重）
+    :return: 字典数组
+    """
+    values = list(values)
+    if all(isinstance(value, str) for value in values):
+        return np.array(values, dtype=str)
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def code_dtype(num_categories: int) -> np.dtype:
+    """
+    按字典大小选择最窄的编码类型
+    :param num_categories: 字典大小
+    :return: uint8 / uint16 / int32
+    """
+    if num_categories <= np.iinfo(np.uint8).max:
+        return np.dtype(np.uint8)
+    if num_categories <= np.iinfo(np.uint16).max:
+        return np.dtype(np.uint16)
+    return np.dtype(np.int32)
+
+
+def parse_time_column(values: Iterable[str]) -> np.ndarray:
+    """
+    将时间字符串解析为int64时间戳（秒）
+    缺失（None、空串）或无法解析的取值记为 NAT_EPOCH，不影响其余行
+    :param values: 时间字符串序列（格式：YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS，日期分隔符也可为 / 或 .）
+    :return: int64时间戳数组
+    """
+    values = values if isinstance(values, list) else list(values)
+    try:
+        return np.array(values, dtype='datetime64[s]').astype(np.int64)
+    except (ValueError, TypeError):
+        return np.fromiter(map(_parse_time_value, values), dtype=np.int64, count=len(values))
+
+
+def _parse_time_value(value: Any) -> int:
+    """逐个解析时间取值（ISO 格式之外的日期分隔符、不补零的月日时分），无法解析时返回 NAT_EPOCH"""
+    try:
+        return int(np.datetime64(value, 's').astype(np.int64))
+    except (ValueError, TypeError):
+        pass
+    match = _LENIENT_TIME.fullmatch(value.strip()) if isinstance(value, str) else None
+    if match is None:
+        return NAT_EPOCH
+    try:
+        moment = datetime(*(int(part) for part in match.groups(default='0')))
+    except ValueError:
+        return NAT_EPOCH
+    return int(np.datetime64(moment, 's').astype(np.int64))
+
+
+def parse_time_bound(value: str, end: bool = False) -> int:
+    """
+    解析时间范围边界
+    :param value: 时间字符串（格式：YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS）
+    :param end: 是否为结束边界；只给日期的结束边界包含当天全部时间
+    :return: int64时间戳（秒，闭区间边界）
+    """
+    moment = np.datetime64(value.strip(), 's')
+    if end and np.datetime64(value.strip()).dtype == np.dtype('datetime64[D]'):
+        moment = moment + np.timedelta64(1, 'D') - np.timedelta64(1, 's')
+    return int(moment.astype(np.int64))
+
+
+def sorted_time_index(epochs: np.ndarray) -> Tuple[Union[np.ndarray, None], np.ndarray]:
+    """
+    时间戳的有序索引
+    :param epochs: int64时间戳数组
+    :return: (按时间稳定排序的行号, 排序后的时间戳)；已按时间有序时行号为None
+    """
+    if np.all(epochs[1:] >= epochs[:-1]):
+        return None, epochs
+    order = np.argsort(epochs, kind='stable')
+    return order, epochs[order]
+
+
+def rows_in_sorted_range(order: Union[np.ndarray, None],
+                         sorted_epochs: np.ndarray,
+                         start: int = None,
+                         end: int = None) -> Union[slice, np.ndarray]:
+    """
+    在有序时间索引上取时间范围内的行（两次二分查找）
+    :param order: sorted_time_index 返回的行号（None 表示数据已有序）
+    :param sorted_epochs: 排序后的时间戳
+    :param start: 开始时间戳（含），None表示不限
+    :param end: 结束时间戳（含），None表示不限
+    :return: 数据按时间有序时返回切片，否则返回按原顺序排列的行号
+    """
+    lo = 0 if start is None else int(np.searchsorted(sorted_epochs, start, side='left'))
+    hi = len(sorted_epochs) if end is None else int(np.searchsorted(sorted_epochs, end, side='right'))
+    hi = max(lo, hi)
+    if order is None:
+        return slice(lo, hi)
+    # 保持原有行顺序，用户首次出现顺序与并列顺序不受影响
+    return np.sort(order[lo:hi])
+
+
+def time_parts(epochs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    拆分时间戳的小时、星期与月份
+    :param epochs: int64时间戳数组（秒）
+    :return: (小时 0-23, 星期 0-6（周一为0）, 月份 0-11)，均为int8数组；缺失时间（NAT_EPOCH）的行为 -1
+    """
+    epochs = np.asarray(epochs, dtype=np.int64)
+    missing = epochs == NAT_EPOCH
+    if missing.any():
+        epochs = np.where(missing, 0, epochs)
+    moments = epochs.view('datetime64[s]')
+    days = moments.astype('datetime64[D]')
+    hours = (moments - days) // np.timedelta64(1, 'h')
+    # 1970-01-01 为周四
+    weekdays = (days.view(np.int64) + 3) % 7
+    months = moments.astype('datetime64[M]').view(np.int64) % 12
+    parts = hours.astype(np.int8), weekdays.astype(np.int8), months.astype(np.int8)
+    for part in parts:
+        part[missing] = -1
+    return parts
+
+
+def format_time_column(epochs: np.ndarray) -> np.ndarray:
+    """
+    将int64时间戳格式化为 YYYY-MM-DD HH:MM:SS 字符串
+    :param epochs: int64时间戳数组
+    :return: 时间字符串数组
+    """
+    text = np.datetime_as_string(np.asarray(epochs, dtype=np.int64).astype('datetime64[s]'), unit='s')
+    return np.char.replace(text, 'T', ' ')
+
+
+class MissionTable:
+    """列式历史需求数据表，可在任何接受 List[Mission] 的地方使用"""
+
+    def __init__(self,
+                 columns: Dict[str, np.ndarray],
+                 categories: Dict[str, np.ndarray]):
+        """
+        :param columns: 列数组字典，分类字段为编码数组，时间字段为int64时间戳
+        :param categories: 分类字段的字典数组
+        """
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"列长度不一致: {sorted(lengths)}")
+
+        self.columns = columns
+        self.categories = categories
+        self._length = lengths.pop() if lengths else 0
+        self._cache = {}
+
+    @classmethod
+    def from_missions(cls,
+                      missions: Iterable[Mission],
+                      fields: Sequence[str] = MISSION_FIELDS) -> 'MissionTable':
+        """
+        由 Mission 对象序列构建数据表
+        :param missions: 历史需求数据列表
+        :param fields: 需要保留的字段（默认全部字段），只投影部分字段时转换更快
+        :return: 列式数据表
+        """
+        if isinstance(missions, MissionTable):
+            return missions
+        missions = list(missions)
+
+        columns = {}
+        categories = {}
+        for field in fields:
+            values = list(map(attrgetter(field), missions))
+            if field in CATEGORICAL_FIELDS:
+                columns[field], categories[field] = encode_categorical(values)
+            elif field in TIME_FIELDS:
+                columns[field] = parse_time_column(values)
+            elif field in FLOAT_FIELDS:
+                columns[field] = np.array(values, dtype=np.float64)
+            elif field in INT_FIELDS:
+                columns[field] = np.array(values, dtype=np.int64)
+            elif field in BOOL_FIELDS:
+                columns[field] = np.fromiter(map(bool, values), dtype=np.bool_, count=len(values))
+            else:
+                raise ValueError(f"未知的任务字段: {field}")
+
+        return cls(columns, categories)
+
+    @classmethod
+    def concat(cls, tables: Sequence['MissionTable']) -> 'MissionTable':
+        """
+        按行拼接多个数据表（字段需一致），分类字段的字典按首次出现顺序合并
+        :param tables: 数据表列表
+        :return: 拼接后的数据表
+        """
+        tables = list(tables)
+        if not tables:
+            return cls({}, {})
+        fields = list(tables[0].columns)
+        if any(list(table.columns) != fields for table in tables):
+            raise ValueError("拼接的数据表字段不一致")
+
+        columns = {}
+        categories = {}
+        for field in fields:
+            if field not in tables[0].categories:
+                columns[field] = np.concatenate([table.columns[field] for table in tables])
+                continue
+            mapping = {}
+            remapped = []
+            for table in tables:
+                values = table.categories[field].tolist()
+                lookup = np.fromiter((mapping.setdefault(value, len(mapping)) for value in values),
+                                     dtype=np.int64, count=len(values))
+                remapped.append(lookup[table.columns[field]] if len(values) else
+                                np.empty(0, dtype=np.int64))
+            columns[field] = np.concatenate(remapped).astype(code_dtype(len(mapping)))
+            categories[field] = category_array(mapping)
+        return cls(columns, categories)
+
+    def to_missions(self) -> List[Mission]:
+        """还原为 Mission 对象列表"""
+        return list(self)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Mission]:
+        for start in range(0, self._length, _ITER_CHUNK_SIZE):
+            stop = min(start + _ITER_CHUNK_SIZE, self._length)
+            # 未投影的字段还原为None
+            values = [self.column(field)[start:stop].tolist() if field in self.columns
+                      else [None] * (stop - start)
+                      for field in MISSION_FIELDS]
+            for row in zip(*values):
+                yield Mission(*row)
+
+    def __getitem__(self, item: Union[int, slice, np.ndarray]) -> Union[Mission, 'MissionTable']:
+        if isinstance(item, (int, np.integer)):
+            index = int(item)
+            if index < 0:
+                index += self._length
+            if not 0 <= index < self._length:
+                raise IndexError("MissionTable 索引越界")
+            return next(iter(self.take(np.array([index]))))
+        return self.take(item)
+
+    def __repr__(self) -> str:
+        return f"MissionTable(rows={self._length}, nbytes={self.nbytes})"
+
+    def take(self, indices: Union[slice, np.ndarray]) -> 'MissionTable':
+        """
+        按行选取子表（与原表共享字典）
+        :param indices: 切片、行号数组或布尔掩码
+        :return: 子表
+        """
+        columns = {field: column[indices] for field, column in self.columns.items()}
+        return MissionTable(columns, self.categories)
+
+    def codes(self, field: str) -> np.ndarray:
+        """获取分类字段的编码数组"""
+        return self.columns[field]
+
+    def column(self, field: str) -> np.ndarray:
+        """
+        获取解码后的列
+        :param field: 字段名
+        :return: 分类字段返回字典取值数组，时间字段返回时间字符串数组，其余返回数值数组
+        """
+        column = self.columns[field]
+        if field in self.categories:
+            return self.categories[field][column]
+        if field in TIME_FIELDS:
+            return format_time_column(column)
+        return column
+
+    @property
+    def nbytes(self) -> int:
+        """列数组与字典占用的字节数"""
+        return (sum(column.nbytes for column in self.columns.values())
+                + sum(values.nbytes for values in self.categories.values()))
+
+    def datetime_column(self, field: str = 'req_start_time') -> np.ndarray:
+        """时间字段的 datetime64[s] 视图（与int64时间戳共享内存）"""
+        return self.columns[field].view('datetime64[s]')
+
+    def time_parts(self, field: str = 'req_start_time') -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        时间字段的小时、星期与月份（首次调用时计算并缓存）
+        :param field: 时间字段
+        :return: (小时 0-23, 星期 0-6（周一为0）, 月份 0-11)
+        """
+        key = ('time_parts', field)
+        if key not in self._cache:
+            self._cache[key] = time_parts(self.columns[field])
+        return self._cache[key]
+
+    def time_index(self, field: str = 'req_start_time') -> Tuple[Union[np.ndarray, None], np.ndarray]:
+        """
+        时间字段的有序索引（首次调用时构建并缓存）
+        :param field: 时间字段
+        :return: (按时间稳定排序的行号, 排序后的时间戳)；数据已按时间有序时行号为None
+        """
+        key = ('time_index', field)
+        if key not in self._cache:
+            self._cache[key] = sorted_time_index(self.columns[field])
+        return self._cache[key]
+
+    def rows_in_time_range(self,
+                           start: int = None,
+                           end: int = None,
+                           field: str = 'req_start_time') -> Union[slice, np.ndarray]:
+        """
+        时间范围内的行（两次二分查找）
+        :param start: 开始时间戳（含），None表示不限
+        :param end: 结束时间戳（含），None表示不限
+        :param field: 时间字段
+        :return: 数据按时间有序时返回切片（take 后为零拷贝视图），否则返回按原顺序排列的行号
+        """
+        return rows_in_sorted_range(*self.time_index(field), start, end)
+
+    def user_index(self) -> Tuple[np.ndarray, List[Tuple[str, str]]]:
+        """
+        用户（部门+区组）编码
+        :return: (每行的用户编码, 用户列表)，用户按首次出现顺序编号
+        """
+        if 'user_index' not in self._cache:
+            units = self.codes('req_unit').astype(np.int64)
+            groups = self.codes('req_group').astype(np.int64)
+            combined = units * len(self.categories['req_group']) + groups
+
+            uniques, first_index, inverse = np.unique(combined, return_index=True, return_inverse=True)
+            order = np.argsort(first_index, kind='stable')
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+
+            unit_names = self.categories['req_unit']
+            group_names = self.categories['req_group']
+            first_rows = first_index[order]
+            users = list(zip(unit_names[units[first_rows]].tolist(),
+                             group_names[groups[first_rows]].tolist()))
+            self._cache['user_index'] = (rank[inverse.reshape(-1)], users)
+        return self._cache['user_index']
+
+    def user_row_index(self) -> Tuple[np.ndarray, np.ndarray, Dict[Tuple[str, str], int]]:
+        """
+        按用户分组的行索引（首次调用时构建并缓存，之后按用户取行无需扫描全表）
+        :return: (按用户编码稳定排序的行号, 各用户的行区间边界, {(部门, 区组): 用户编码})，
+                 用户 u 的行为 order[bounds[u]:bounds[u + 1]]，按原有行顺序排列
+        """
+        if 'user_row_index' not in self._cache:
+            user_codes, users = self.user_index()
+            order = np.argsort(user_codes, kind='stable')
+            bounds = np.searchsorted(user_codes[order], np.arange(len(users) + 1))
+            positions = {user: code for code, user in enumerate(users)}
+            self._cache['user_row_index'] = (order, bounds, positions)
+        return self._cache['user_row_index']
+
+    def rows_for_users(self, users: Iterable[Tuple[str, str]]) -> np.ndarray:
+        """
+        指定用户的全部行
+        :param users: (部门, 区组) 序列，表中不存在的用户忽略
+        :return: 按原有行顺序排列的行号，用户之间的首次出现顺序与全表一致
+        """
+        order, bounds, positions = self.user_row_index()
+        codes = sorted({positions[user] for user in users if user in positions})
+        if not codes:
+            return np.empty(0, dtype=np.int64)
+        rows = np.concatenate([order[bounds[code]:bounds[code + 1]] for code in codes])
+        return np.sort(rows)
@@ -1,4 +1,20 @@
+from typing import Union
+
+
+def _to_float(value):
+    """将数值字段存为float；无法转换的取值（空串、None、非数值文本等）保持原值"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
 class TargetInfo:
+    __slots__ = (
+        'target_id', 'target_name', 'target_type', 'target_category',
+        'target_priority', 'target_area_type', 'group_list', 'trajectory_list'
+    )
+
     def __init__(self,
                  target_id: str,
                  target_name: str,
@@ -29,6 +45,8 @@ class TargetInfo:
         self.trajectory_list = trajectory_list
 
 class Group:
+    __slots__ = ('group_name', 'source', 'status')
+
     def __init__(self,
                  group_name: str,
                  source: str,
@@ -44,32 +62,34 @@ class Group:
         self.status = status
 
 class Trajectory:
+    __slots__ = ('lon', 'lat', 'alt', 'point_time', 'speed', 'heading', 'seq', 'elect_silence')
+
     def __init__(self,
-                 lon: str,
-                 lat: str,
-                 alt: str,
+                 lon: Union[str, float],
+                 lat: Union[str, float],
+                 alt: Union[str, float],
                  point_time: str,
-                 speed: str,
-                 heading: str,
+                 speed: Union[str, float],
+                 heading: Union[str, float],
                  seq: str,
                  elect_silence: str):
         """
         目标轨迹数据列表
-        :param lon: 经度
-        :param lat: 纬度
-        :param alt: 高度
+        :param lon: 经度（数值存为float，无法转换时保持原值）
+        :param lat: 纬度（数值存为float，无法转换时保持原值）
+        :param alt: 高度（数值存为float，无法转换时保持原值）
         :param point_time: 时间点
-        :param speed: 轨迹速度
-        :param heading: 轨迹航向
+        :param speed: 轨迹速度（数值存为float，无法转换时保持原值）
+        :param heading: 轨迹航向（数值存为float，无法转换时保持原值）
         :param seq: 序号
         :param elect_silence: 电子静默
         """
-        self.lon = lon
-        self.lat = lat
-        self.alt = alt
+        self.lon = _to_float(lon)
+        self.lat = _to_float(lat)
+        self.alt = _to_float(alt)
         self.point_time = point_time
-        self.speed = speed
-        self.heading = heading
+        self.speed = _to_float(speed)
+        self.heading = _to_float(heading)
         self.seq = seq
         self.elect_silence = elect_silence
 
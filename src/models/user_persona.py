@@ -1,4 +1,6 @@
 class UserPersona:
+    __slots__ = ('user_id', 'persona_tags', 'generation_time')
+
     def __init__(self,
                  user_id: dict,
                  persona_tags: dict,
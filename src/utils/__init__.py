@@ -9,11 +9,35 @@ from .data_generator import (
     save_data_to_files,
     print_data_statistics
 )
+from .data_loader import (
+    load_targets_from_file,
+    iter_mission_batches,
+    iter_missions_from_file,
+    load_mission_table
+)
+from .binary_dataset import (
+    save_dataset_binary,
+    load_dataset_binary
+)
+from .persona_writer import (
+    PersonaWriter,
+    write_personas_ndjson,
+    iter_personas_ndjson
+)
 
 __all__ = [
     'generate_sample_data',
     'generate_target_info',
     'generate_smart_data',
     'save_data_to_files',
-    'print_data_statistics'
+    'print_data_statistics',
+    'load_targets_from_file',
+    'iter_mission_batches',
+    'iter_missions_from_file',
+    'load_mission_table',
+    'save_dataset_binary',
+    'load_dataset_binary',
+    'PersonaWriter',
+    'write_personas_ndjson',
+    'iter_personas_ndjson'
 ]
@@ -0,0 +1,165 @@
+"""
+二进制列式数据集
+
+与 save_data_to_files 写出的 TSV 对应的二进制格式，目录结构：
+    manifest.json                 格式名、版本、行数与各列文件
+    missions/<字段>.npy           列数组（分类字段为整数编码，时间字段为int64时间戳）
+    missions/<字段>.dict.npy      分类字段的字符串字典（定长Unicode数组）
+    targets.json                  目标信息（含分组与轨迹）
+
+加载时以 np.load(mmap_mode='r') 只读映射各列，启动几乎不做解析；
+多个进程映射同一目录时共享操作系统页缓存，不会重复占用内存。
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.models.mission import Mission
+from src.models.mission_table import MissionTable, MISSION_FIELDS
+from src.models.target_info import TargetInfo, Group, Trajectory
+
+# 格式名与版本（不兼容的改动需递增版本）
+FORMAT_NAME = 'persona-columnar'
+FORMAT_VERSION = 1
+
+MANIFEST_FILE = 'manifest.json'
+TARGET_FILE = 'targets.json'
+MISSION_DIR = 'missions'
+
+
+def save_dataset_binary(target_info: List[TargetInfo],
+                        missions: Union[List[Mission], MissionTable],
+                        directory: str) -> Dict[str, Any]:
+    """
+    保存为二进制列式数据集（清单最后写入，清单存在即表示数据完整）
+    :param target_info: 目标信息列表
+    :param missions: 任务列表或列式数据表
+    :param directory: 输出目录
+    :return: 清单内容
+    """
+    table = MissionTable.from_missions(missions)
+    # 字典以不含 pickle 的 .npy 保存，只支持字符串取值
+    object_fields = [field for field, values in table.categories.items() if values.dtype.hasobject]
+    if object_fields:
+        raise ValueError(f"二进制数据集只支持字符串取值的分类字段: {object_fields}")
+    os.makedirs(os.path.join(directory, MISSION_DIR), exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    columns = {}
+    for field, column in table.columns.items():
+        entry = {
+            'file': f"{MISSION_DIR}/{field}.npy",
+            'dtype': column.dtype.str,
+            'shape': list(column.shape)
+        }
+        np.save(os.path.join(directory, entry['file']), np.ascontiguousarray(column))
+        if field in table.categories:
+            entry['dictionary'] = f"{MISSION_DIR}/{field}.dict.npy"
+            np.save(os.path.join(directory, entry['dictionary']), table.categories[field])
+        columns[field] = entry
+
+    with open(os.path.join(directory, TARGET_FILE), 'w', encoding='utf-8') as f:
+        json.dump([_target_to_dict(target) for target in target_info], f, ensure_ascii=False)
+
+    manifest = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'num_missions': len(table),
+        'num_targets': len(target_info),
+        'targets': TARGET_FILE,
+        'columns': columns
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def load_dataset_binary(directory: str,
+                        fields: Sequence[str] = None,
+                        mmap: bool = True) -> Tuple[List[TargetInfo], MissionTable]:
+    """
+    加载二进制列式数据集
+    :param directory: 数据集目录
+    :param fields: 需要加载的任务字段（默认全部已保存字段），未加载的列不会被打开
+    :param mmap: 是否以只读内存映射方式加载（False 时读入内存）
+    :return: (目标信息列表, 列式数据表)
+    """
+    manifest = read_manifest(directory)
+    saved = manifest['columns']
+    if fields is None:
+        fields = [field for field in MISSION_FIELDS if field in saved]
+    missing = [field for field in fields if field not in saved]
+    if missing:
+        raise ValueError(f"数据集中没有这些字段: {missing}")
+
+    mmap_mode = 'r' if mmap else None
+    columns = {}
+    categories = {}
+    for field in fields:
+        entry = saved[field]
+        column = np.load(os.path.join(directory, entry['file']), mmap_mode=mmap_mode, allow_pickle=False)
+        if column.dtype.str != entry['dtype'] or list(column.shape) != entry['shape']:
+            raise ValueError(f"字段 {field} 的数据文件与清单不一致")
+        columns[field] = column
+        if 'dictionary' in entry:
+            categories[field] = np.load(os.path.join(directory, entry['dictionary']),
+                                        mmap_mode=mmap_mode, allow_pickle=False)
+
+    with open(os.path.join(directory, manifest['targets']), 'r', encoding='utf-8') as f:
+        target_info = [_target_from_dict(item) for item in json.load(f)]
+    return target_info, MissionTable(columns, categories)
+
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    """
+    读取并校验清单
+    :param directory: 数据集目录
+    :return: 清单内容
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"数据集清单不存在: {manifest_path}")
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_NAME:
+        raise ValueError(f"未知的数据集格式: {manifest.get('format')}")
+    if manifest.get('version', 0) > FORMAT_VERSION:
+        raise ValueError(f"数据集版本 {manifest.get('version')} 高于支持的版本 {FORMAT_VERSION}")
+    return manifest
+
+
+def _target_to_dict(target: TargetInfo) -> Dict[str, Any]:
+    """目标信息转换为可序列化字典"""
+    return {
+        'target_id': target.target_id,
+        'target_name': target.target_name,
+        'target_type': target.target_type,
+        'target_category': target.target_category,
+        'target_priority': target.target_priority,
+        'target_area_type': target.target_area_type,
+        'group_list': [[group.group_name, group.source, group.status] for group in target.group_list or []],
+        'trajectory_list': [
+            [point.lon, point.lat, point.alt, point.point_time, point.speed,
+             point.heading, point.seq, point.elect_silence]
+            for point in target.trajectory_list or []
+        ]
+    }
+
+
+def _target_from_dict(item: Dict[str, Any]) -> TargetInfo:
+    """由字典还原目标信息"""
+    return TargetInfo(
+        target_id=item['target_id'],
+        target_name=item['target_name'],
+        target_type=item['target_type'],
+        target_category=item['target_category'],
+        target_priority=item['target_priority'],
+        target_area_type=item['target_area_type'],
+        group_list=[Group(*group) for group in item['group_list']],
+        trajectory_list=[Trajectory(*point) for point in item['trajectory_list']]
+    )
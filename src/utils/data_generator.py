@@ -10,18 +10,23 @@
 import random
 import time
 from datetime import datetime, timedelta
-from typing import List, Tuple, Optional
+from typing import Any, Callable, Dict, List, Tuple, Optional, Union
+
+import numpy as np
 
 from src.models.mission import Mission
+from src.models.mission_table import MissionTable, code_dtype
 from src.models.target_info import TargetInfo, Group, Trajectory
 
 
-def generate_target_info(num_targets: int) -> List[TargetInfo]:
+def generate_target_info(num_targets: int, rng: random.Random = None) -> List[TargetInfo]:
     """
     生成目标信息数据
     :param num_targets: 生成目标数量
+    :param rng: 随机数生成器（可选，默认使用 random 模块的全局状态）
     :return: 目标信息列表
     """
+    rng = rng or random
     target_info = []
     
     # 根据目标数量选择不同的数据丰富度
@@ -44,27 +49,27 @@ def generate_target_info(num_targets: int) -> List[TargetInfo]:
         target = TargetInfo(
             target_id=f"TGT{i+1:03d}",
             target_name=f"目标{i+1}",
-            target_type=random.choice(target_types),
-            target_category=random.choice(target_categories),
-            target_priority=round(random.uniform(0.1, 1.0), 1),
-            target_area_type=random.choice(area_types),
+            target_type=rng.choice(target_types),
+            target_category=rng.choice(target_categories),
+            target_priority=round(rng.uniform(0.1, 1.0), 1),
+            target_area_type=rng.choice(area_types),
             group_list=[
                 Group(
                     group_name=f"技术组{chr(65+(i%26))}",
-                    source=random.choice(sources),
-                    status=random.choice(statuses)
+                    source=rng.choice(sources),
+                    status=rng.choice(statuses)
                 )
             ],
             trajectory_list=[
                 Trajectory(
-                    lon=str(round(random.uniform(100.0, 130.0), 2)),
-                    lat=str(round(random.uniform(20.0, 50.0), 2)),
-                    alt=str(random.randint(10, 200)),
-                    point_time=f"2024-{random.randint(1,12):02d}-{random.randint(1,28):02d} {random.randint(0,23):02d}:00:00",
-                    speed=str(random.randint(10, 80)),
-                    heading=str(random.randint(0, 359)),
+                    lon=str(round(rng.uniform(100.0, 130.0), 2)),
+                    lat=str(round(rng.uniform(20.0, 50.0), 2)),
+                    alt=str(rng.randint(10, 200)),
+                    point_time=f"2024-{rng.randint(1,12):02d}-{rng.randint(1,28):02d} {rng.randint(0,23):02d}:00:00",
+                    speed=str(rng.randint(10, 80)),
+                    heading=str(rng.randint(0, 359)),
                     seq=str(i+1),
-                    elect_silence=random.choice(["是", "否"])
+                    elect_silence=rng.choice(["是", "否"])
                 )
             ]
         )
@@ -74,27 +79,44 @@ def generate_target_info(num_targets: int) -> List[TargetInfo]:
 
 
 def generate_smart_data(num_targets: int = 2, num_missions: int = 100, 
-                       enable_rf_users: bool = False) -> Tuple[List[TargetInfo], List[Mission]]:
+                       enable_rf_users: bool = False,
+                       bulk: bool = False,
+                       seed: Optional[int] = None) -> Tuple[List[TargetInfo], Union[List[Mission], MissionTable]]:
     """
     智能数据生成器 - 支持小规模到超大规模的灵活生成
     :param num_targets: 目标数量
     :param num_missions: 任务数量
     :param enable_rf_users: 是否启用随机森林用户（创建>5000任务的用户）
-    :return: (目标信息列表, 任务列表)
+    :param bulk: 是否使用NumPy批量生成模式（各列整体采样，直接输出列式 MissionTable）
+    :param seed: 随机种子（相同种子生成完全相同的数据；None 时逐条模式使用 random 模块的全局状态）
+    :return: (目标信息列表, 任务列表)，批量模式下任务为 MissionTable
     """
     scale = "超大规模" if num_missions >= 100000 else "大规模" if num_missions >= 10000 else "中规模" if num_missions >= 1000 else "小规模"
     print(f"=== 生成{scale}数据 ({num_missions:,}条) ===\n")
     
-    if num_missions >= 10000:
+    if bulk:
+        print("🔄 开始批量生成数据...")
+    elif num_missions >= 10000:
         print("🔄 开始生成数据，这可能需要几分钟时间...")
     else:
         print("🔄 开始生成数据...")
     
     start_time = time.time()
     
+    # 批量模式的所有随机数都来自同一种子
+    if bulk:
+        rng = np.random.default_rng(seed)
+        randint = lambda low, high: int(rng.integers(low, high + 1))
+        target_rng = random.Random(int(rng.integers(2 ** 32)))
+    else:
+        # 逐条模式：给定种子时使用独立的随机数生成器，不影响 random 模块的全局状态
+        py_rng = random if seed is None else random.Random(seed)
+        randint = py_rng.randint
+        target_rng = None if seed is None else py_rng
+    
     # 生成目标信息
     print(f"📍 生成目标信息 ({num_targets}个)...")
-    target_info = generate_target_info(num_targets)
+    target_info = generate_target_info(num_targets, target_rng)
     print(f"✅ 生成了 {len(target_info)} 个目标信息")
     
     # 定义基础数据
@@ -175,7 +197,7 @@ def generate_smart_data(num_targets: int = 2, num_missions: int = 100,
                 if i == len(remaining_users) - 1:
                     tasks = remaining_tasks - avg_tasks * (len(remaining_users) - 1)
                 else:
-                    tasks = avg_tasks + random.randint(-10, 10)
+                    tasks = avg_tasks + randint(-10, 10)
                 user_allocation.append((unit, group, max(1, tasks)))
         else:
             # 大规模：随机分配
@@ -183,8 +205,8 @@ def generate_smart_data(num_targets: int = 2, num_missions: int = 100,
                 if i == len(remaining_users) - 1:
                     tasks = remaining_tasks - sum(allocation[2] for allocation in user_allocation[len(user_allocation):])
                 else:
-                    max_tasks = min(4000, remaining_tasks // (len(remaining_users) - i))
-                    tasks = random.randint(100, max_tasks)
+                    max_tasks = max(100, min(4000, remaining_tasks // (len(remaining_users) - i)))
+                    tasks = randint(100, max_tasks)
                     remaining_tasks -= tasks
                 user_allocation.append((unit, group, max(10, tasks)))
     
@@ -211,64 +233,72 @@ def generate_smart_data(num_targets: int = 2, num_missions: int = 100,
     
     # 生成任务数据
     print(f"\n🚀 开始生成 {num_missions:,} 条任务数据...")
-    missions = []
-    base_time = datetime(2024, 1, 1, 0, 0, 0)
+    if bulk:
+        missions = _generate_missions_bulk(rng, user_allocation, num_targets, vocabulary={
+            'task_types': task_types, 'countries': countries, 'emcon_options': emcon_options,
+            'scout_types': scout_types, 'task_scenes': task_scenes, 'req_cycles': req_cycles,
+            'mission_play_types': mission_play_types
+        })
+        total_generated = len(missions)
+    else:
+        missions = []
+        base_time = datetime(2024, 1, 1, 0, 0, 0)
     
-    batch_size = max(1000, num_missions // 100)  # 动态批次大小
-    total_generated = 0
+        batch_size = max(1000, num_missions // 100)  # 动态批次大小
+        total_generated = 0
     
-    for unit, group, task_count in user_allocation:
-        if num_missions >= 10000:
-            print(f"   生成 {unit}_{group} 的 {task_count:,} 条任务...")
+        for unit, group, task_count in user_allocation:
+            if num_missions >= 10000:
+                print(f"   生成 {unit}_{group} 的 {task_count:,} 条任务...")
         
-        for i in range(task_count):
-            # 生成时间（分布在一年内）
-            days_offset = random.randint(0, 365)
-            hours_offset = random.randint(0, 23)
-            minutes_offset = random.randint(0, 59)
-            req_time = base_time + timedelta(days=days_offset, hours=hours_offset, minutes=minutes_offset)
+            for i in range(task_count):
+                # 生成时间（分布在一年内）
+                days_offset = py_rng.randint(0, 365)
+                hours_offset = py_rng.randint(0, 23)
+                minutes_offset = py_rng.randint(0, 59)
+                req_time = base_time + timedelta(days=days_offset, hours=hours_offset, minutes=minutes_offset)
             
-            # 生成新字段数据
-            req_cycle_val = random.choice(req_cycles)
-            if req_cycle_val == "周期性":
-                cycle_time = random.randint(1, 30)
-                req_times_val = random.randint(2, 10)
-            elif req_cycle_val == "连续":
-                cycle_time = 1
-                req_times_val = random.randint(10, 100)
-            else:  # 单次
-                cycle_time = 0
-                req_times_val = 1
+                # 生成新字段数据
+                req_cycle_val = py_rng.choice(req_cycles)
+                if req_cycle_val == "周期性":
+                    cycle_time = py_rng.randint(1, 30)
+                    req_times_val = py_rng.randint(2, 10)
+                elif req_cycle_val == "连续":
+                    cycle_time = 1
+                    req_times_val = py_rng.randint(10, 100)
+                else:  # 单次
+                    cycle_time = 0
+                    req_times_val = 1
             
-            mission = Mission(
-                req_id=f"REQ{len(missions)+1:06d}",
-                topic_id=f"TP{len(missions)+1:06d}",
-                req_unit=unit,
-                req_group=group,
-                req_start_time=req_time.strftime("%Y-%m-%d %H:%M:%S"),
-                req_end_time=(req_time + timedelta(hours=random.randint(1, 24))).strftime("%Y-%m-%d %H:%M:%S"),
-                task_type=random.choice(task_types),
-                target_id=f"TGT{random.randint(1, num_targets):03d}",
-                country_name=random.choice(countries),
-                target_priority=round(random.uniform(0.1, 1.0), 1),
-                is_emcon=random.choice(emcon_options),
-                is_precise=random.choice([True, False]),
-                scout_type=random.choice(scout_types),
-                task_scene=random.choice(task_scenes),
-                resolution=round(random.uniform(0.5, 1.0), 2),
-                req_cycle=req_cycle_val,
-                req_cycle_time=str(cycle_time),
-                req_times=req_times_val,
-                mission_play_type=random.choice(mission_play_types)
-            )
-            missions.append(mission)
-            total_generated += 1
+                mission = Mission(
+                    req_id=f"REQ{len(missions)+1:06d}",
+                    topic_id=f"TP{len(missions)+1:06d}",
+                    req_unit=unit,
+                    req_group=group,
+                    req_start_time=req_time.strftime("%Y-%m-%d %H:%M:%S"),
+                    req_end_time=(req_time + timedelta(hours=py_rng.randint(1, 24))).strftime("%Y-%m-%d %H:%M:%S"),
+                    task_type=py_rng.choice(task_types),
+                    target_id=f"TGT{py_rng.randint(1, num_targets):03d}",
+                    country_name=py_rng.choice(countries),
+                    target_priority=round(py_rng.uniform(0.1, 1.0), 1),
+                    is_emcon=py_rng.choice(emcon_options),
+                    is_precise=py_rng.choice([True, False]),
+                    scout_type=py_rng.choice(scout_types),
+                    task_scene=py_rng.choice(task_scenes),
+                    resolution=round(py_rng.uniform(0.5, 1.0), 2),
+                    req_cycle=req_cycle_val,
+                    req_cycle_time=str(cycle_time),
+                    req_times=req_times_val,
+                    mission_play_type=py_rng.choice(mission_play_types)
+                )
+                missions.append(mission)
+                total_generated += 1
             
-            # 显示进度（仅大规模数据）
-            if num_missions >= 10000 and total_generated % batch_size == 0:
-                elapsed = time.time() - start_time
-                progress = (total_generated / num_missions) * 100
-                print(f"     进度: {total_generated:,}/{num_missions:,} ({progress:.1f}%) - 用时: {elapsed:.1f}秒")
+                # 显示进度（仅大规模数据）
+                if num_missions >= 10000 and total_generated % batch_size == 0:
+                    elapsed = time.time() - start_time
+                    progress = (total_generated / num_missions) * 100
+                    print(f"     进度: {total_generated:,}/{num_missions:,} ({progress:.1f}%) - 用时: {elapsed:.1f}秒")
     
     elapsed_time = time.time() - start_time
     print(f"\n✅ 数据生成完成！")
@@ -280,6 +310,81 @@ def generate_smart_data(num_targets: int = 2, num_missions: int = 100,
     return target_info, missions
 
 
+def _generate_missions_bulk(rng: np.random.Generator,
+                            user_allocation: List[Tuple[str, str, int]],
+                            num_targets: int,
+                            vocabulary: Dict[str, List[str]]) -> MissionTable:
+    """
+    批量生成任务数据（各列整体采样，取值分布与逐条生成一致）
+    :param rng: NumPy随机数生成器
+    :param user_allocation: 用户任务分配 [(部门, 区组, 任务数)]
+    :param num_targets: 目标数量
+    :param vocabulary: 各分类字段的取值列表
+    :return: 列式任务数据表
+    """
+    task_counts = np.array([count for _, _, count in user_allocation], dtype=np.int64)
+    num_missions = int(task_counts.sum())
+    user_codes = np.repeat(np.arange(len(user_allocation)), task_counts)
+
+    columns = {}
+    categories = {}
+
+    def categorical(field: str, codes: np.ndarray, values: List[Any]):
+        categories[field] = np.array([str(value) for value in values], dtype=str)
+        columns[field] = codes.astype(code_dtype(len(values)))
+
+    def choice(field: str, values: List[Any]):
+        categorical(field, rng.integers(len(values), size=num_missions), values)
+
+    # 需求与专题标识号按生成顺序编号
+    sequence = np.char.zfill(np.arange(1, num_missions + 1).astype(str), 6)
+    categorical('req_id', np.arange(num_missions), np.char.add('REQ', sequence).tolist())
+    categorical('topic_id', np.arange(num_missions), np.char.add('TP', sequence).tolist())
+
+    # 部门与区组按分配方案展开
+    units = list(dict.fromkeys(unit for unit, _, _ in user_allocation))
+    groups = list(dict.fromkeys(group for _, group, _ in user_allocation))
+    categorical('req_unit', np.array([units.index(unit) for unit, _, _ in user_allocation],
+                                     dtype=np.int64)[user_codes], units)
+    categorical('req_group', np.array([groups.index(group) for _, group, _ in user_allocation],
+                                      dtype=np.int64)[user_codes], groups)
+
+    # 时间分布在一年内，结束时间为开始后1-24小时
+    base_epoch = int(np.datetime64('2024-01-01T00:00:00', 's').astype(np.int64))
+    start = (base_epoch + rng.integers(0, 366, size=num_missions) * 86400
+             + rng.integers(0, 24, size=num_missions) * 3600
+             + rng.integers(0, 60, size=num_missions) * 60)
+    columns['req_start_time'] = start
+    columns['req_end_time'] = start + rng.integers(1, 25, size=num_missions) * 3600
+
+    choice('task_type', vocabulary['task_types'])
+    categorical('target_id', rng.integers(num_targets, size=num_missions),
+                [f"TGT{i + 1:03d}" for i in range(num_targets)])
+    choice('country_name', vocabulary['countries'])
+    columns['target_priority'] = np.round(rng.uniform(0.1, 1.0, size=num_missions), 1)
+    choice('is_emcon', vocabulary['emcon_options'])
+    columns['is_precise'] = rng.random(num_missions) < 0.5
+    choice('scout_type', vocabulary['scout_types'])
+    choice('task_scene', vocabulary['task_scenes'])
+    columns['resolution'] = np.round(rng.uniform(0.5, 1.0, size=num_missions), 2)
+
+    # 需求周期决定周期次数与需求次数
+    req_cycles = vocabulary['req_cycles']
+    cycle_codes = rng.integers(len(req_cycles), size=num_missions)
+    categorical('req_cycle', cycle_codes, req_cycles)
+    periodic = cycle_codes == req_cycles.index("周期性")
+    continuous = cycle_codes == req_cycles.index("连续")
+    cycle_time = np.where(periodic, rng.integers(1, 31, size=num_missions), np.where(continuous, 1, 0))
+    categorical('req_cycle_time', cycle_time, list(range(31)))
+    columns['req_times'] = np.where(
+        periodic, rng.integers(2, 11, size=num_missions),
+        np.where(continuous, rng.integers(10, 101, size=num_missions), 1)
+    ).astype(np.int64)
+    choice('mission_play_type', vocabulary['mission_play_types'])
+
+    return MissionTable(columns, categories)
+
+
 def save_data_to_files(target_info: List[TargetInfo], missions: List[Mission], 
                       target_file: str = "targets.txt", 
                       mission_file: str = "missions.txt"):
@@ -396,12 +501,15 @@ def generate_sample_data(num_targets: int = 2, num_missions: int = 100) -> Tuple
     return generate_smart_data(num_targets, num_missions, enable_rf_users=False)
 
 
-def generate_500k_data() -> Tuple[List[TargetInfo], List[Mission]]:
+def generate_500k_data(bulk: bool = True,
+                       seed: Optional[int] = None) -> Tuple[List[TargetInfo], Union[List[Mission], MissionTable]]:
     """
     兼容性函数 - 生成500K数据
+    :param bulk: 是否使用NumPy批量生成模式（默认开启，输出 MissionTable）
+    :param seed: 随机种子
     :return: (目标信息列表, 任务列表)
     """
-    return generate_smart_data(num_targets=50, num_missions=500000, enable_rf_users=True)
+    return generate_smart_data(num_targets=50, num_missions=500000, enable_rf_users=True, bulk=bulk, seed=seed)
 
 
 def main():
@@ -0,0 +1,168 @@
+"""
+数据文件加载
+
+读取 save_data_to_files 写出的 TSV 文件：
+- 任务文件以只读内存映射打开，按固定字节块切分（块边界对齐到行尾）后逐块解码
+- 只转换需要的列，按固定行数输出 MissionTable 批次，内存占用与文件大小无关
+- 也可逐条输出 Mission 对象，或一次性拼接为完整的 MissionTable
+"""
+
+import mmap
+from typing import Iterator, List, Sequence
+
+import numpy as np
+
+from src.models.mission import Mission
+from src.models.mission_table import (
+    MissionTable, MISSION_FIELDS, CATEGORICAL_FIELDS, TIME_FIELDS, FLOAT_FIELDS, INT_FIELDS, BOOL_FIELDS,
+    encode_categorical, parse_time_column
+)
+from src.models.target_info import TargetInfo
+from src.core.vectorized_tag_engine import TAG_FIELDS
+
+# 任务文件的列顺序（与 save_data_to_files 一致）
+MISSION_FILE_COLUMNS = MISSION_FIELDS
+# 目标文件的列数（目标ID、名称、类型、种类、优先级、区域类型）
+TARGET_FILE_COLUMNS = 6
+
+# 默认每批行数
+DEFAULT_CHUNK_ROWS = 16384
+# 每次从内存映射中解码的字节数
+DEFAULT_BLOCK_BYTES = 1024 * 1024
+
+
+def load_targets_from_file(target_file: str) -> List[TargetInfo]:
+    """
+    读取目标信息文件（TSV 中没有分组与轨迹，加载后为空列表）
+    :param target_file: 目标信息文件名
+    :return: 目标信息列表
+    """
+    targets = []
+    with open(target_file, 'r', encoding='utf-8') as f:
+        next(f, None)
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line:
+                continue
+            parts = line.split('\t')
+            if len(parts) != TARGET_FILE_COLUMNS:
+                raise ValueError(f"目标文件列数错误: 期望 {TARGET_FILE_COLUMNS} 列, 实际 {len(parts)} 列")
+            target_id, target_name, target_type, target_category, target_priority, target_area_type = parts
+            targets.append(TargetInfo(target_id, target_name, target_type, target_category,
+                                      float(target_priority), target_area_type, [], []))
+    return targets
+
+
+def iter_mission_lines(mission_file: str, block_bytes: int = DEFAULT_BLOCK_BYTES) -> Iterator[List[str]]:
+    """
+    以内存映射逐块读取任务文件的数据行（跳过表头）
+    :param mission_file: 任务信息文件名
+    :param block_bytes: 每块字节数，块边界向后对齐到行尾
+    :return: 每次产出一块中的数据行列表
+    """
+    with open(mission_file, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            header_end = mm.find(b'\n')
+            header = mm[:header_end if header_end >= 0 else size].decode('utf-8').rstrip('\r').split('\t')
+            if len(header) != len(MISSION_FILE_COLUMNS):
+                raise ValueError(f"任务文件列数错误: 期望 {len(MISSION_FILE_COLUMNS)} 列, 实际 {len(header)} 列")
+
+            position = size if header_end < 0 else header_end + 1
+            while position < size:
+                end = min(position + block_bytes, size)
+                if end < size:
+                    newline = mm.rfind(b'\n', position, end)
+                    if newline < 0:
+                        # 单行超过块大小时延伸到该行结尾
+                        newline = mm.find(b'\n', end)
+                    end = size if newline < 0 else newline + 1
+                lines = mm[position:end].decode('utf-8').split('\n')
+                # 已解码的页不再需要，释放映射页使常驻内存不随文件增长
+                released = position - position % mmap.PAGESIZE
+                if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+                    mm.madvise(mmap.MADV_DONTNEED, released, end - released)
+                position = end
+                yield [line.rstrip('\r') for line in lines if line and line != '\r']
+
+
+def _rows_to_table(rows: List[List[str]], fields: Sequence[str]) -> MissionTable:
+    """将已切分的数据行转换为列式数据表，只转换投影字段"""
+    columns = {}
+    categories = {}
+    for field in fields:
+        index = MISSION_FILE_COLUMNS.index(field)
+        values = [row[index] for row in rows]
+        if field in CATEGORICAL_FIELDS:
+            columns[field], categories[field] = encode_categorical(values)
+        elif field in TIME_FIELDS:
+            columns[field] = parse_time_column(values)
+        elif field in FLOAT_FIELDS:
+            columns[field] = np.array(values, dtype=np.float64)
+        elif field in INT_FIELDS:
+            columns[field] = np.array(values, dtype=np.int64)
+        elif field in BOOL_FIELDS:
+            columns[field] = np.array(values) == 'True'
+        else:
+            raise ValueError(f"未知的任务字段: {field}")
+    return MissionTable(columns, categories)
+
+
+def iter_mission_batches(mission_file: str,
+                         fields: Sequence[str] = TAG_FIELDS,
+                         chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                         block_bytes: int = DEFAULT_BLOCK_BYTES) -> Iterator[MissionTable]:
+    """
+    流式读取任务文件，按固定行数产出列式批次
+    :param mission_file: 任务信息文件名
+    :param fields: 需要保留的字段（默认只保留画像标签计算所需字段）
+    :param chunk_rows: 每批行数（最后一批可能更少）
+    :param block_bytes: 每次从内存映射中解码的字节数
+    :return: MissionTable 批次迭代器，每批使用各自的分类字典
+    """
+    if chunk_rows < 1:
+        raise ValueError("每批行数必须大于0")
+    width = max(MISSION_FILE_COLUMNS.index(field) for field in fields) + 1 if fields else 0
+
+    pending: List[List[str]] = []
+    for lines in iter_mission_lines(mission_file, block_bytes):
+        for line in lines:
+            # 只切分到最后一个投影字段
+            row = line.split('\t', width)
+            if len(row) < width:
+                raise ValueError(f"任务文件行列数不足: {line[:80]}")
+            pending.append(row)
+            if len(pending) == chunk_rows:
+                yield _rows_to_table(pending, fields)
+                pending = []
+    if pending:
+        yield _rows_to_table(pending, fields)
+
+
+def iter_missions_from_file(mission_file: str,
+                            fields: Sequence[str] = MISSION_FIELDS,
+                            chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Mission]:
+    """
+    流式读取任务文件，逐条产出 Mission 对象
+    :param mission_file: 任务信息文件名
+    :param fields: 需要保留的字段（未投影字段为None），默认全部字段
+    :param chunk_rows: 每批行数
+    :return: Mission 迭代器
+    """
+    for batch in iter_mission_batches(mission_file, fields, chunk_rows):
+        yield from batch
+
+
+def load_mission_table(mission_file: str,
+                       fields: Sequence[str] = TAG_FIELDS,
+                       chunk_rows: int = DEFAULT_CHUNK_ROWS) -> MissionTable:
+    """
+    流式读取任务文件并拼接为完整的列式数据表（只驻留列式批次，不创建 Mission 对象）
+    :param mission_file: 任务信息文件名
+    :param fields: 需要保留的字段
+    :param chunk_rows: 每批行数
+    :return: 列式数据表
+    """
+    return MissionTable.concat(iter_mission_batches(mission_file, fields, chunk_rows))
@@ -0,0 +1,130 @@
+"""
+画像结果流式输出
+
+以 NDJSON（每行一个 JSON 对象）逐个写出画像：
+- 每个画像序列化后立即写出，输出侧内存与用户数无关
+- 文件名以 .gz 结尾（或指定 compress=True）时以 gzip 压缩写出
+- 每写出 flush_every 个画像刷新一次缓冲区（gzip 为同步刷新），下游可在生成结束前开始读取
+"""
+
+import gzip
+import io
+import json
+import sys
+from typing import Any, Dict, IO, Iterable, Iterator, Union
+
+from src.models.user_persona import UserPersona
+
+# 默认每写出多少个画像刷新一次
+DEFAULT_FLUSH_EVERY = 256
+
+
+def _is_gzip_path(path: str) -> bool:
+    return path.endswith('.gz')
+
+
+class PersonaWriter:
+    """NDJSON 画像写出器（支持上下文管理器）"""
+
+    def __init__(self,
+                 output: Union[str, IO[str]],
+                 compress: bool = None,
+                 flush_every: int = DEFAULT_FLUSH_EVERY):
+        """
+        :param output: 输出文件名，'-' 表示标准输出；也可传入已打开的文本流（由调用方负责关闭）
+        :param compress: 是否 gzip 压缩，默认按文件名是否以 .gz 结尾判断
+        :param flush_every: 每写出多少个画像刷新一次，0 表示只在关闭时刷新
+        """
+        if flush_every < 0:
+            raise ValueError("刷新间隔不能为负数")
+        self.flush_every = flush_every
+        self.count = 0
+        self._owns_stream = isinstance(output, str) and output != '-'
+        if output == '-':
+            self._stream = sys.stdout
+        elif isinstance(output, str):
+            if compress is None:
+                compress = _is_gzip_path(output)
+            if compress:
+                self._stream = io.TextIOWrapper(gzip.open(output, 'wb'), encoding='utf-8')
+            else:
+                self._stream = open(output, 'w', encoding='utf-8')
+        else:
+            self._stream = output
+
+    def write(self, persona: Union[UserPersona, Dict[str, Any]]):
+        """
+        写出一个画像
+        :param persona: 用户画像对象或已转换的字典
+        """
+        record = persona.to_dict() if isinstance(persona, UserPersona) else persona
+        self._stream.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self._stream.write('\n')
+        self.count += 1
+        if self.flush_every and self.count % self.flush_every == 0:
+            self.flush()
+
+    def write_all(self, personas: Iterable[Union[UserPersona, Dict[str, Any]]]) -> int:
+        """
+        逐个写出画像（可直接传入 UserPersonaAlgorithm.iter_user_persona 的结果）
+        :param personas: 画像迭代器
+        :return: 本次写出的画像数
+        """
+        written = 0
+        for persona in personas:
+            self.write(persona)
+            written += 1
+        return written
+
+    def flush(self):
+        """刷新缓冲区（gzip 输出会同步刷新压缩流，已写出的画像可被读取）"""
+        self._stream.flush()
+
+    def close(self):
+        """刷新并关闭（传入的文本流只刷新不关闭）"""
+        if self._stream is None:
+            return
+        if self._owns_stream:
+            self._stream.close()
+        else:
+            self._stream.flush()
+        self._stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def write_personas_ndjson(personas: Iterable[Union[UserPersona, Dict[str, Any]]],
+                          output: Union[str, IO[str]],
+                          compress: bool = None,
+                          flush_every: int = DEFAULT_FLUSH_EVERY) -> int:
+    """
+    将画像逐个写出为 NDJSON
+    :param personas: 画像迭代器
+    :param output: 输出文件名或文本流（参见 PersonaWriter）
+    :param compress: 是否 gzip 压缩，默认按文件名判断
+    :param flush_every: 刷新间隔
+    :return: 写出的画像数
+    """
+    with PersonaWriter(output, compress=compress, flush_every=flush_every) as writer:
+        return writer.write_all(personas)
+
+
+def iter_personas_ndjson(path: str, compress: bool = None) -> Iterator[Dict[str, Any]]:
+    """
+    逐行读取 NDJSON 画像文件
+    :param path: 文件名
+    :param compress: 是否 gzip 压缩，默认按文件名判断
+    :return: 画像字典迭代器
+    """
+    if compress is None:
+        compress = _is_gzip_path(path)
+    opener = gzip.open if compress else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
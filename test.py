@@ -10,6 +10,10 @@ import io
 from datetime import datetime
 from src.core.user_persona_algorithm import UserPersonaAlgorithm
 from src.utils.data_generator import generate_sample_data
+from src.utils.persona_writer import PersonaWriter
+
+# 画像结果文件（NDJSON，每行一个画像；以 .gz 结尾时压缩写出）
+RESULT_FILE = 'test_result.ndjson'
 
 # 设置输出编码
 if sys.platform == 'win32':
@@ -32,12 +36,12 @@ def main():
     for mission in missions:
         users.add(f"{mission.req_unit}_{mission.req_group}")
     
-    # 2. 初始化算法并生成用户画像
+    # 2. 初始化算法，逐个生成用户画像
     algorithm = UserPersonaAlgorithm()
     
     # 可选：指定时间范围（留空表示不限制）
     # 示例：start_time='2024-01-01', end_time='2024-12-31'
-    personas = algorithm.generate_user_persona(
+    personas = algorithm.iter_user_persona(
         target_info=targets,
         mission=missions,
         start_time=None,  # 不限制开始时间
@@ -45,31 +49,22 @@ def main():
         algorithm={'preference_algorithm': 'percentage'}
     )
     
-    # 3. 构建JSON结果
-    result = {
-        "info": {
-            "num_targets": len(targets),
-            "num_missions": len(missions),
-            "num_users": len(users),
-            "date": datetime.now().isoformat()
-        },
-        "personas": [],
-        "statistics": {
-            "total_personas": len(personas)
-        }
+    # 3. 输出基本信息
+    info = {
+        "num_targets": len(targets),
+        "num_missions": len(missions),
+        "num_users": len(users),
+        "date": datetime.now().isoformat()
     }
+    print(json.dumps({"info": info}, ensure_ascii=False))
     
-    # 添加用户画像数据
-    for persona in personas:
-        result["personas"].append(persona.to_dict())
-    
-    # 4. 输出JSON结果
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    # 4. 边生成边写出 NDJSON（每行一个画像），不在内存中拼接完整结果
+    with PersonaWriter(RESULT_FILE) as writer:
+        total_personas = writer.write_all(personas)
     
-    # 5. 保存结果到文件
-    with open('test_result.json', 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
-    print("\n结果已保存到: test_result.json")
+    # 5. 输出统计信息
+    print(json.dumps({"statistics": {"total_personas": total_personas}}, ensure_ascii=False))
+    print(f"\n结果已保存到: {RESULT_FILE}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,55 @@
+"""
+向量化引擎与逐用户引擎的结果一致（各偏好算法、并列计数与 auto 选择的边界情况）
+"""
+
+import copy
+import logging
+
+import pytest
+
+from src.core.user_persona_algorithm import UserPersonaAlgorithm
+from src.utils.data_generator import generate_smart_data
+
+PREFERENCE_ALGORITHMS = ('auto', 'percentage', 'zscore', 'tfidf', 'bm25', 'unknown')
+
+
+def _crafted_user(template, unit, target_counts):
+    """按 {目标编号: 任务数} 构造一个用户的任务"""
+    missions = []
+    for number, count in target_counts.items():
+        for _ in range(count):
+            mission = copy.copy(template)
+            mission.req_unit, mission.req_group = unit, '边界组'
+            mission.target_id = f"TGT{number:03d}"
+            missions.append(mission)
+    return missions
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    logging.getLogger('UserPersonaAlgorithm').disabled = True
+    target_info, missions = generate_smart_data(num_targets=40, num_missions=2000, seed=2)
+    template = missions[0]
+    # 各目标计数全部并列
+    missions += _crafted_user(template, '并列部', {number: 2 for number in range(1, 6)})
+    # HHI = 82 / 1600 = 0.05125，保留4位小数时落在舍入边界
+    missions += _crafted_user(template, '舍入边界部', {number: 3 if number <= 7 else 1 for number in range(1, 27)})
+    # HHI 恰为阈值 0.05（20个目标各1次）
+    missions += _crafted_user(template, '阈值部', {number: 1 for number in range(1, 21)})
+    return target_info, missions
+
+
+@pytest.mark.parametrize('preference_algorithm', PREFERENCE_ALGORITHMS)
+@pytest.mark.parametrize('top_n', [1, 3, 100])
+def test_vectorized_matches_python(dataset, preference_algorithm, top_n):
+    target_info, missions = dataset
+    config = {'preference_algorithm': preference_algorithm, 'top_n': top_n}
+    results = {}
+    for engine in ('python', 'vectorized'):
+        algorithm = UserPersonaAlgorithm(use_stats_cache=False)
+        personas = algorithm.generate_user_persona(target_info, missions, None, None, dict(config),
+                                                   {'engine': engine, 'instrumentation': True})
+        results[engine] = ([(persona.user_id, persona.persona_tags) for persona in personas],
+                           personas.report['choices'])
+
+    assert results['vectorized'] == results['python']
@@ -0,0 +1,74 @@
+"""
+用户分组与专题×分组展开的代价随 (任务数 + 目标-分组关联数) 线性增长
+"""
+
+import gc
+import math
+import random
+import time
+
+import pytest
+
+from benchmarks.bench_grouping_scaling import MISSIONS_PER_TARGET, build_dataset
+from src.core.persona_tag_calculator import PersonaTagCalculator
+from src.core.target_index import TargetGroupIncidence
+from src.core.user_persona_algorithm import UserPersonaAlgorithm
+from src.core.vectorized_tag_engine import VectorizedTagEngine
+from src.models.mission_table import MissionTable
+from src.models.target_info import Group
+
+# 耗时-规模双对数斜率上限：线性为1，列表去重退化为平方时为2
+MAX_SCALING_EXPONENT = 1.5
+
+
+def _multi_group_dataset(num_targets: int):
+    """每个目标关联1-2个分组，分组数随目标库规模增长"""
+    targets, missions = build_dataset(num_targets)
+    rng = random.Random(num_targets)
+    for target in targets:
+        target.group_list = [Group(f"分组{rng.randrange(num_targets // 10)}", "电子侦察", "活跃")
+                             for _ in range(rng.randint(1, 2))]
+    return targets, missions
+
+
+@pytest.mark.parametrize('num_targets', [1000, 10000])
+def test_topic_group_expansion_is_linear_in_links(monkeypatch, num_targets):
+    targets, missions = _multi_group_dataset(num_targets)
+    expand = TargetGroupIncidence.expand
+    expanded = []
+
+    def counting_expand(self, target_codes):
+        positions, group_codes = expand(self, target_codes)
+        expanded.append(len(group_codes))
+        return positions, group_codes
+
+    monkeypatch.setattr(TargetGroupIncidence, 'expand', counting_expand)
+    VectorizedTagEngine(PersonaTagCalculator()).generate_all_persona_tags(MissionTable.from_missions(missions),
+                                                                         targets)
+
+    degree = {target.target_id: len(target.group_list) for target in targets}
+    links = sum(degree[mission.target_id] for mission in missions)
+    # 每条任务只按其目标的分组展开一次，与分组总数无关
+    assert sum(expanded) == links <= 2 * len(missions)
+
+
+def test_user_grouping_time_is_linear_in_catalog_size():
+    algorithm = UserPersonaAlgorithm(use_stats_cache=False)
+    sizes = [2000, 20000]
+    timings = []
+    for num_targets in sizes:
+        targets, missions = build_dataset(num_targets)
+        assert len(missions) == num_targets * MISSIONS_PER_TARGET
+        gc.disable()
+        try:
+            elapsed = float('inf')
+            for _ in range(3):
+                start = time.perf_counter()
+                algorithm._group_missions_by_user(missions, targets)
+                elapsed = min(elapsed, time.perf_counter() - start)
+        finally:
+            gc.enable()
+        timings.append(elapsed)
+
+    exponent = math.log(timings[1] / timings[0]) / math.log(sizes[1] / sizes[0])
+    assert exponent < MAX_SCALING_EXPONENT
@@ -0,0 +1,72 @@
+"""
+增量画像存储：批次校验失败时存储保持不变
+"""
+
+import copy
+
+import pytest
+
+from src.core.incremental_persona_store import IncrementalPersonaStore
+from src.utils.data_generator import generate_smart_data
+
+
+def _snapshot(store):
+    """存储的可比较状态（不含画像生成时间）"""
+    return (len(store),
+            copy.deepcopy(store.global_stats),
+            [(persona.user_id, persona.persona_tags) for persona in store.get_personas()])
+
+
+@pytest.fixture
+def store_and_missions():
+    target_info, missions = generate_smart_data(num_targets=10, num_missions=200, seed=7)
+    store = IncrementalPersonaStore(target_info, {'preference_algorithm': 'tfidf'})
+    store.add_missions(missions[:100])
+    return store, missions
+
+
+def test_add_batch_with_existing_req_id_leaves_store_unchanged(store_and_missions):
+    store, missions = store_and_missions
+    before = _snapshot(store)
+
+    with pytest.raises(ValueError):
+        store.add_missions(missions[100:110] + [missions[0]])
+    assert _snapshot(store) == before
+
+    store.add_missions(missions[100:110])
+    assert len(store) == 110
+
+
+def test_add_batch_with_duplicate_req_id_leaves_store_unchanged(store_and_missions):
+    store, missions = store_and_missions
+    before = _snapshot(store)
+
+    with pytest.raises(ValueError):
+        store.add_missions(missions[100:110] + [missions[105]])
+    assert _snapshot(store) == before
+
+
+def test_remove_batch_with_unknown_req_id_leaves_store_unchanged(store_and_missions):
+    store, missions = store_and_missions
+    before = _snapshot(store)
+
+    with pytest.raises(KeyError):
+        store.remove_missions([mission.req_id for mission in missions[:10]] + ['unknown'])
+    assert _snapshot(store) == before
+    with pytest.raises(KeyError):
+        store.remove_missions([missions[0].req_id, missions[0].req_id])
+    assert _snapshot(store) == before
+
+    store.remove_missions([mission.req_id for mission in missions[:10]])
+    assert len(store) == 90
+
+
+def test_approximate_mode_keeps_exact_target_user_count():
+    target_info, missions = generate_smart_data(num_targets=30, num_missions=3000, seed=1)
+    exact = IncrementalPersonaStore(target_info, {'preference_algorithm': 'tfidf'})
+    approximate = IncrementalPersonaStore(target_info, {'preference_algorithm': 'tfidf'}, sketch_capacity=4)
+    for start in range(0, len(missions), 300):
+        exact.add_missions(missions[start:start + 300])
+        approximate.add_missions(missions[start:start + 300])
+
+    assert approximate.global_stats == exact.global_stats
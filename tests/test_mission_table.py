@@ -0,0 +1,40 @@
+"""
+列式数据表：字典编码保留原始取值
+"""
+
+import logging
+
+from src.core.user_persona_algorithm import UserPersonaAlgorithm
+from src.models.mission_table import MissionTable, encode_categorical
+from src.utils.data_generator import generate_smart_data
+
+
+def test_encode_categorical_keeps_original_values():
+    codes, categories = encode_categorical(['b', 'a', 'b'])
+    assert codes.tolist() == [0, 1, 0] and categories.tolist() == ['b', 'a']
+
+    codes, categories = encode_categorical([5, 'TGT005', None, 5])
+    assert codes.tolist() == [0, 1, 2, 0]
+    assert categories.dtype == object and categories.tolist() == [5, 'TGT005', None]
+
+
+def test_integer_target_ids_match_python_engine():
+    logging.getLogger('UserPersonaAlgorithm').disabled = True
+    target_info, missions = generate_smart_data(num_targets=8, num_missions=400, seed=3)
+    for target in target_info:
+        target.target_id = int(target.target_id[3:])
+    for mission in missions:
+        mission.target_id = int(mission.target_id[3:])
+    table = MissionTable.from_missions(missions)
+    assert table.column('target_id').tolist() == [mission.target_id for mission in missions]
+
+    algorithm = UserPersonaAlgorithm(use_stats_cache=False)
+    for preference_algorithm in ('percentage', 'tfidf'):
+        config = {'preference_algorithm': preference_algorithm}
+        expected = [(persona.user_id, persona.persona_tags) for persona in
+                    algorithm.generate_user_persona(target_info, missions, None, None, config, {'engine': 'python'})]
+        for mission_input, params in ((table, {}), (missions, {}), (table, {'workers': 2}),
+                                      (missions, {'memory_budget': 50_000})):
+            personas = algorithm.generate_user_persona(target_info, mission_input, None, None, config, params)
+            assert [(persona.user_id, persona.persona_tags) for persona in personas] == expected
+        assert all(isinstance(item['target_id'], int) for _, tags in expected for item in tags['target_proportion'])
@@ -0,0 +1,42 @@
+"""
+分区落盘的画像生成与内存内结果一致，并在结束后删除溢出目录
+"""
+
+import logging
+
+import pytest
+
+from src.core.user_persona_algorithm import UserPersonaAlgorithm
+from src.utils.data_generator import generate_smart_data
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    logging.getLogger('UserPersonaAlgorithm').disabled = True
+    return generate_smart_data(num_targets=40, num_missions=20000, bulk=True, seed=13)
+
+
+@pytest.mark.parametrize('preference_algorithm', ['auto', 'tfidf', 'bm25', 'percentage', 'zscore'])
+def test_out_of_core_matches_in_memory(dataset, tmp_path, preference_algorithm):
+    target_info, table = dataset
+    config = {'preference_algorithm': preference_algorithm}
+    algorithm = UserPersonaAlgorithm(use_stats_cache=False)
+    expected = algorithm.generate_user_persona(target_info, table, '2024-02-01', '2024-11-30 12:00:00', dict(config))
+    personas = algorithm.generate_user_persona(target_info, table, '2024-02-01', '2024-11-30 12:00:00', dict(config),
+                                               {'memory_budget': 200_000, 'spill_dir': str(tmp_path),
+                                                'instrumentation': True})
+
+    assert personas.report['counters']['partitions'] > 1
+    assert [(p.user_id, p.persona_tags) for p in personas] == [(p.user_id, p.persona_tags) for p in expected]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spill_directory_removed_when_iteration_stops_early(dataset, tmp_path):
+    target_info, table = dataset
+    personas = UserPersonaAlgorithm(use_stats_cache=False).iter_user_persona(
+        target_info, table, algorithm={'preference_algorithm': 'percentage'},
+        params={'memory_budget': 200_000, 'spill_dir': str(tmp_path)})
+    next(personas)
+    assert list(tmp_path.iterdir())
+    personas.close()
+    assert list(tmp_path.iterdir()) == []
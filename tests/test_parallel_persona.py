@@ -0,0 +1,32 @@
+"""
+多进程画像生成与单进程结果一致
+"""
+
+import logging
+
+import pytest
+
+from src.core.user_persona_algorithm import UserPersonaAlgorithm
+from src.utils.data_generator import generate_smart_data
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    logging.getLogger('UserPersonaAlgorithm').disabled = True
+    return generate_smart_data(num_targets=40, num_missions=20000, bulk=True, seed=5)
+
+
+@pytest.mark.parametrize('preference_algorithm', ['auto', 'tfidf', 'percentage'])
+def test_parallel_workers_match_in_memory(dataset, preference_algorithm):
+    target_info, table = dataset
+    config = {'preference_algorithm': preference_algorithm}
+    algorithm = UserPersonaAlgorithm(use_stats_cache=False)
+    expected = algorithm.generate_user_persona(target_info, table, '2024-02-01', '2024-10-31', dict(config),
+                                               {'instrumentation': True})
+    parallel = algorithm.generate_user_persona(target_info, table, '2024-02-01', '2024-10-31', dict(config),
+                                               {'instrumentation': True, 'workers': 2})
+
+    assert 'tag.parallel' in parallel.report['stages']
+    assert [(p.user_id, p.persona_tags) for p in parallel] == [(p.user_id, p.persona_tags) for p in expected]
+    assert parallel.report['choices'] == expected.report['choices']
+    assert parallel.report['counters'] == expected.report['counters']
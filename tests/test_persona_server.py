@@ -0,0 +1,47 @@
+"""
+画像查询服务：窗口键归一化与按窗口的并发计算
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.core.persona_server import PersonaQueryEngine
+from src.utils.data_generator import generate_smart_data
+
+
+@pytest.fixture(scope='module')
+def engine():
+    target_info, missions = generate_smart_data(num_targets=10, num_missions=500, seed=3)
+    return PersonaQueryEngine(target_info, missions)
+
+
+def test_equivalent_time_bounds_share_a_window(engine):
+    personas = engine.personas('2024-03-01', '2024-03-31', 'percentage')
+    assert engine.personas('2024-03-01 00:00:00', '2024-03-31 23:59:59', 'percentage') is personas
+    assert engine.personas('2024-03-01', '2024-03-30', 'percentage') is not personas
+
+
+def test_concurrent_cold_queries_compute_each_window_once(engine, monkeypatch):
+    query = engine.index.query
+    calls = []
+    release = threading.Event()
+
+    def slow_query(start_time, end_time, algorithm):
+        calls.append(start_time)
+        if start_time == '2024-05-01':
+            assert release.wait(10)
+        return query(start_time, end_time, algorithm)
+
+    monkeypatch.setattr(engine.index, 'query', slow_query)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        blocked = [pool.submit(engine.personas, '2024-05-01', '2024-05-31', 'tfidf') for _ in range(3)]
+        # 另一个窗口的冷查询不被正在计算的窗口阻塞
+        other = engine.personas('2024-06-01', '2024-06-30', 'tfidf')
+        assert not any(future.done() for future in blocked)
+        release.set()
+        results = [future.result(timeout=10) for future in blocked]
+
+    assert calls.count('2024-05-01') == 1 and calls.count('2024-06-01') == 1
+    assert all(result is results[0] for result in results) and other is not results[0]
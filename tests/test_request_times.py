@@ -0,0 +1,64 @@
+"""
+提报时间标签：缺失、空白或无法解析的时间在两种引擎中处理一致
+"""
+
+import logging
+import random
+import warnings
+
+import pytest
+
+from src.core.user_persona_algorithm import UserPersonaAlgorithm
+from src.models.mission_table import NAT_EPOCH, parse_time_column
+from src.utils.data_generator import generate_smart_data
+
+
+def _personas(target_info, missions, engine):
+    algorithm = UserPersonaAlgorithm(use_stats_cache=False)
+    personas = algorithm.generate_user_persona(target_info, missions, None, None,
+                                               {'preference_algorithm': 'percentage'}, {'engine': engine})
+    return {(persona.user_id['req_unit'], persona.user_id['req_group']): persona.persona_tags['request_frequency']
+            for persona in personas}
+
+
+@pytest.fixture
+def damaged_data():
+    logging.getLogger('UserPersonaAlgorithm').disabled = True
+    target_info, missions = generate_smart_data(num_targets=6, num_missions=600, seed=5)
+    rng = random.Random(5)
+    for mission in missions:
+        roll = rng.random()
+        if roll < 0.1:
+            mission.req_end_time = None
+        elif roll < 0.2:
+            mission.req_start_time = ''
+        elif roll < 0.25:
+            mission.req_start_time = mission.req_start_time.replace('-', '/')
+        elif roll < 0.3:
+            mission.req_end_time = 'unknown'
+    first_user = (missions[0].req_unit, missions[0].req_group)
+    for mission in missions:
+        if (mission.req_unit, mission.req_group) == first_user:
+            mission.req_end_time = ''
+    return target_info, missions, first_user
+
+
+def test_parse_time_column_treats_bad_values_as_missing():
+    epochs = parse_time_column(['2024-03-01 10:00:00', '2024/03/01 10:00:00', '2024-3-1 10:00', '', None, 'x'])
+    assert epochs[0] == epochs[1] == epochs[2]
+    assert epochs[3:].tolist() == [NAT_EPOCH] * 3
+
+
+def test_engines_agree_on_missing_and_unparseable_times(damaged_data):
+    target_info, missions, first_user = damaged_data
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        python = _personas(target_info, missions, 'python')
+        vectorized = _personas(target_info, missions, 'vectorized')
+    assert vectorized == python
+
+    user_missions = [m for m in missions if (m.req_unit, m.req_group) == first_user]
+    assert 'duration_hours' not in python[first_user]
+    assert sum(python[first_user]['time_distribution']['hour_of_day']) == sum(
+        m.req_start_time != '' for m in user_missions)
+    assert all(0 < tags['duration_hours']['mean'] <= 24 for user, tags in python.items() if user != first_user)
@@ -0,0 +1,35 @@
+"""
+Space-Saving 草图：误差界与替换顺序
+"""
+
+import random
+from collections import Counter
+
+from src.core.space_saving import SpaceSavingSketch
+
+
+def test_estimates_stay_within_error_bounds():
+    rng = random.Random(0)
+    sketch = SpaceSavingSketch(16)
+    true_counts = Counter()
+    for _ in range(20000):
+        key = int(rng.paretovariate(1.1))
+        weight = rng.randint(1, 3)
+        sketch.add(key, weight)
+        true_counts[key] += weight
+
+    assert sum(count for _, count in sketch.most_common()) == sketch.total == sum(true_counts.values())
+    assert sketch.max_error <= sketch.total / sketch.capacity
+    for key in true_counts:
+        if key in sketch:
+            assert sketch.count(key) - sketch.error(key) <= true_counts[key] <= sketch.count(key)
+        else:
+            assert true_counts[key] <= sketch.max_error
+
+
+def test_evicts_earliest_monitored_key_among_ties():
+    sketch = SpaceSavingSketch(2)
+    sketch.update(Counter({'a': 1, 'b': 1}))
+    sketch.add('c')
+    assert list(sketch) == ['b', 'c']
+    assert sketch.count('c') == 2 and sketch.error('c') == 1
@@ -0,0 +1,45 @@
+"""
+多时间窗口索引与逐窗口调用 generate_user_persona 的结果一致
+"""
+
+import logging
+
+import pytest
+
+from src.core.user_persona_algorithm import UserPersonaAlgorithm
+from src.models.mission_table import NAT_EPOCH
+from src.utils.data_generator import generate_smart_data
+
+WINDOWS = [
+    (None, None),
+    ('2024-03-01', '2024-03-31'),                    # 整日对齐
+    ('2024-02-10', None),
+    (None, '2024-06-30'),
+    ('2024-05-01 06:00:00', '2024-05-20'),           # 未对齐，按行过滤
+    ('2024-05-01', '2024-05-20 12:30:00'),
+    ('2024-04-04', '2024-04-04'),
+    (None, '2023-06-30'),                            # 早于全部数据：只剩缺失提报时间的任务
+    ('2030-01-01', '2030-02-01'),                    # 空窗口
+]
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    logging.getLogger('UserPersonaAlgorithm').disabled = True
+    target_info, table = generate_smart_data(num_targets=40, num_missions=20000, bulk=True, seed=9)
+    # 少量任务缺失提报时间
+    table.columns['req_start_time'][::997] = NAT_EPOCH
+    return target_info, table
+
+
+@pytest.mark.parametrize('preference_algorithm', ['auto', 'tfidf', 'bm25', 'percentage', 'zscore'])
+def test_windowed_index_matches_per_window_calls(dataset, preference_algorithm):
+    target_info, table = dataset
+    config = {'preference_algorithm': preference_algorithm, 'top_n': 4}
+    algorithm = UserPersonaAlgorithm(use_stats_cache=False)
+
+    batched = algorithm.generate_user_persona_windows(target_info, table, WINDOWS, dict(config))
+    for (start_time, end_time), personas in zip(WINDOWS, batched):
+        expected = algorithm.generate_user_persona(target_info, table, start_time, end_time, dict(config))
+        assert [(p.user_id, p.persona_tags) for p in personas] == [(p.user_id, p.persona_tags) for p in expected]
+    assert batched[0] and batched[-2] and not batched[-1]